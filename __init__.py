@@ -58,6 +58,7 @@ if "bpy" in locals():
     importlib.reload(colorspace)
     importlib.reload(world)
     importlib.reload(normal)
+    importlib.reload(linkutils)
     importlib.reload(link)
     importlib.reload(proportion)
     importlib.reload(iconutils)
@@ -107,6 +108,7 @@ from . import hair
 from . import colorspace
 from . import world
 from . import normal
+from . import linkutils
 from . import link
 from . import proportion
 from . import iconutils
@@ -273,6 +275,18 @@ def register():
         bpy.app.handlers.load_pre.append(link.disconnect)
     if link.reconnect not in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.append(link.reconnect)
+    if link.reset_actor_index not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(link.reset_actor_index)
+    if link.invalidate_actor_index not in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.append(link.invalidate_actor_index)
+    if link.invalidate_actor_index not in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.append(link.invalidate_actor_index)
+    if link.actor_index_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(link.actor_index_depsgraph_update)
+    if link.frame_change_sync not in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.append(link.frame_change_sync)
+    if link.material_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(link.material_depsgraph_update)
 
     bpy.app.timers.register(link.reconnect, first_interval=0.5, persistent=False)
 
@@ -300,4 +314,16 @@ def unregister():
         bpy.app.handlers.load_pre.remove(link.disconnect)
     if link.reconnect in bpy.app.handlers.load_post:
         bpy.app.handlers.load_post.remove(link.reconnect)
+    if link.reset_actor_index in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(link.reset_actor_index)
+    if link.invalidate_actor_index in bpy.app.handlers.undo_post:
+        bpy.app.handlers.undo_post.remove(link.invalidate_actor_index)
+    if link.invalidate_actor_index in bpy.app.handlers.redo_post:
+        bpy.app.handlers.redo_post.remove(link.invalidate_actor_index)
+    if link.actor_index_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(link.actor_index_depsgraph_update)
+    if link.frame_change_sync in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(link.frame_change_sync)
+    if link.material_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(link.material_depsgraph_update)
 
@@ -1,16 +1,17 @@
 import bpy #, bpy_extras
 from bpy.app.handlers import persistent
 #import bpy_extras.view3d_utils as v3d
-from enum import IntEnum
 import atexit
-import os, socket, time, select, struct, json, copy, shutil, tempfile
+import os, socket, time, select, struct, json, copy, tempfile, queue
 #import subprocess
 from mathutils import Vector, Quaternion, Matrix, Color, Euler
 from . import (rlx, importer, exporter, facerig, bones, geom, colorspace,
                world, rigging, rigutils, drivers, modifiers,
-               cc, jsonutils, utils, vars)
+               cc, jsonutils, utils, vars, linkutils, shaders, basic, params, nodeutils)
+from .linkutils import OpCodes, pack_string
 from typing import Tuple, List
 import textwrap
+import numpy as np
 
 BLENDER_PORT = 9333
 UNITY_PORT = 9334
@@ -27,46 +28,26 @@ USE_PING = False
 USE_KEEPALIVE = False
 SOCKET_TIMEOUT = 5.0
 INCLUDE_POSE_MESHES = False
-
-class OpCodes(IntEnum):
-    NONE = 0
-    HELLO = 1
-    PING = 2
-    STOP = 10
-    DISCONNECT = 11
-    DEBUG = 15
-    NOTIFY = 50
-    INVALID = 55
-    SAVE = 60
-    FILE = 75
-    FPS = 80
-    MORPH = 90
-    MORPH_UPDATE = 91
-    MESH = 92
-    REPLACE_MESH = 95
-    MATERIALS = 96
-    CHARACTER = 100
-    CHARACTER_UPDATE = 101
-    PROP = 102
-    STAGING = 104
-    LIGHTS_UPDATE = 105
-    CAMERA = 106
-    CAMERA_UPDATE = 107
-    UPDATE_REPLACE = 108
-    RIGIFY = 110
-    TEMPLATE = 200
-    POSE = 210
-    POSE_FRAME = 211
-    SEQUENCE = 220
-    SEQUENCE_FRAME = 221
-    SEQUENCE_END = 222
-    SEQUENCE_ACK = 223
-    LIGHTING = 230
-    CAMERA_SYNC = 231
-    FRAME_SYNC = 232
-    MOTION = 240
-    REQUEST = 250
-    CONFIRM = 251
+RECV_TIME_BUDGET = 0.02
+USE_IO_THREAD = True
+MAX_INBOUND_QUEUE = 64
+MAX_OUTBOUND_QUEUE = 256
+COMPRESSION_LEVELS = { "FAST": 1, "BALANCED": 6, "BEST": 9 }
+FILE_REQUEST_TIMEOUT = 10.0
+# sequence frames sent per timer loop without flow control
+SEQUENCE_SEND_COUNT = 5
+# pose and sequence frames, for the telemetry arrival to applied times
+FRAME_OP_CODES = [ OpCodes.POSE_FRAME, OpCodes.POSE_FRAME_COMPACT,
+                   OpCodes.SEQUENCE_FRAME, OpCodes.SEQUENCE_DELTA, OpCodes.SEQUENCE_COMPACT,
+                   OpCodes.SEQUENCE_FRAMES ]
+SEQUENCE_FRAME_OP_CODES = [ OpCodes.SEQUENCE_FRAME, OpCodes.SEQUENCE_DELTA, OpCodes.SEQUENCE_COMPACT,
+                            OpCodes.SEQUENCE_FRAMES ]
+# connection and file transfer messages are not replayed from recorded sessions
+REPLAY_SKIP_OP_CODES = [ OpCodes.HELLO, OpCodes.PING, OpCodes.STOP, OpCodes.DISCONNECT,
+                         OpCodes.FILE, OpCodes.FILE_MANIFEST, OpCodes.FILE_REQUEST, OpCodes.SEQUENCE_ACK ]
+# messages that are not held back behind a pending file request
+UNHELD_OP_CODES = [ OpCodes.HELLO, OpCodes.PING, OpCodes.STOP, OpCodes.DISCONNECT,
+                    OpCodes.FILE_REQUEST, OpCodes.SEQUENCE_ACK ]
 
 
 VISEME_NAME_MAP = {
@@ -136,6 +117,8 @@ class LinkActor():
         self.cache = None
         self.alias = []
         self.shape_keys = {}
+        self.shape_key_plan = None
+        self.quantise = None
         self.ik_store = None
         self.rigify_ik_fk: float = 0.0
         self.action_store_id: str = ""
@@ -202,10 +185,13 @@ class LinkActor():
             if not actor_link_id:
                 utils.log_info(f"Assigning actor link_id: {actor_cache.get_name()}: {link_id}")
                 actor_cache.set_link_id(link_id)
+                get_actor_index().invalidate()
                 return
             if link_id not in self.alias and actor_link_id != link_id:
                 utils.log_info(f"Assigning actor alias: {actor_cache.get_name()}: {link_id}")
                 self.alias.append(link_id)
+                get_actor_index().add_alias(link_id, actor_link_id)
+                get_link_data().sequence_index = None
                 return
 
     @staticmethod
@@ -234,17 +220,16 @@ class LinkActor():
 
         utils.log_detail(f"Looking for LinkActor: {search_name} {link_id} {search_type}")
         actor: LinkActor = None
+        actor_index = get_actor_index()
 
-        for obj in bpy.data.objects:
-            if obj.type == "LIGHT" or obj.type == "CAMERA":
-                if not search_type or (obj.type == search_type):
-                    obj_link_id = utils.get_rl_link_id(obj)
-                    if obj_link_id is not None and link_id is not None and link_id == obj_link_id:
-                        actor = LinkActor(obj)
-                        utils.log_detail(f"Staging (Light/Camera) found by link_id: {actor.name} / {link_id}")
-                        return actor
+        if not search_type or search_type == "LIGHT" or search_type == "CAMERA":
+            obj = actor_index.find_object(link_id)
+            if obj and (not search_type or obj.type == search_type):
+                actor = LinkActor(obj)
+                utils.log_detail(f"Staging (Light/Camera) found by link_id: {actor.name} / {link_id}")
+                return actor
 
-        chr_cache = props.find_character_by_link_id(link_id)
+        chr_cache = actor_index.find_character(link_id)
         if chr_cache:
             if not search_type or LinkActor.chr_cache_type(chr_cache) == search_type:
                 actor = LinkActor(chr_cache)
@@ -255,7 +240,7 @@ class LinkActor():
         # try to find the character by name if the link id finds nothing
         # character id's change after every reload in iClone/CC4 so these can change.
         if search_name:
-            chr_cache = props.find_character_by_name(search_name)
+            chr_cache = actor_index.find_character_by_name(search_name)
             if chr_cache:
                 if not search_type or LinkActor.chr_cache_type(chr_cache) == search_type:
                     utils.log_detail(f"Chr found by name: {chr_cache.get_name()} / {chr_cache.link_id} -> {link_id}")
@@ -344,6 +329,7 @@ class LinkActor():
         self.expressions = actor_data.get("expressions")
         self.visemes = self.remap_visemes(actor_data.get("visemes"))
         self.morphs = actor_data.get("morphs")
+        self.quantise = actor_data.get("quantise")
         skin_meshes = {}
         if vars.DEV:
             if self.get_type() == "AVATAR" or self.get_type() == "PROP":
@@ -356,6 +342,68 @@ class LinkActor():
                 obj: bpy.types.Object = bpy.data.objects[id_def["name"]]
                 skin_meshes[id] = [obj, Vector((0,0,0)), Quaternion((1,0,0,0)), Vector((1,1,1))]
         self.skin_meshes = skin_meshes
+        self.build_shape_key_plan()
+
+    def build_shape_key_plan(self):
+        """Maps the expression and viseme weight indices to the key blocks they drive, on each mesh,
+           so the live preview can set all the shape keys of a mesh in one bulk write."""
+        self.shape_key_plan = []
+        objects = self.get_mesh_objects()
+        if not objects:
+            return
+        for obj in objects:
+            if not (obj.data.shape_keys and obj.data.shape_keys.key_blocks):
+                continue
+            key_blocks = obj.data.shape_keys.key_blocks
+            key_index = { key.name: i for i, key in enumerate(key_blocks) }
+            plan = { "object": obj, "key": obj.data.shape_keys, "key_blocks": key_blocks }
+            for channel, names in [ ("expressions", self.expressions), ("visemes", self.visemes) ]:
+                source = [ i for i, name in enumerate(names or []) if name in key_index ]
+                target = [ key_index[names[i]] for i in source ]
+                plan[channel] = (np.array(source, dtype=np.int32), np.array(target, dtype=np.int32))
+            if not (len(plan["expressions"][0]) or len(plan["visemes"][0])):
+                continue
+            count = len(key_blocks)
+            # setting the values in bulk skips the slider range clamping of key.value
+            plan["values"] = np.empty(count, dtype=np.float32)
+            plan["min"] = np.empty(count, dtype=np.float32)
+            plan["max"] = np.empty(count, dtype=np.float32)
+            key_blocks.foreach_get("slider_min", plan["min"])
+            key_blocks.foreach_get("slider_max", plan["max"])
+            self.shape_key_plan.append(plan)
+
+    def shape_key_plan_valid(self):
+        if self.shape_key_plan is None:
+            return False
+        try:
+            for plan in self.shape_key_plan:
+                if len(plan["key_blocks"]) != len(plan["values"]):
+                    return False
+        except ReferenceError:
+            # mesh or shape keys deleted
+            return False
+        return True
+
+    def apply_shape_key_weights(self, expression_weights, viseme_weights, visemes=True):
+        """Sets the expression (and viseme) weights into the shape keys of all the meshes,
+           one bulk read and (if anything changed) one bulk write per mesh."""
+        if not self.shape_key_plan_valid():
+            self.build_shape_key_plan()
+        channels = [ ("expressions", np.asarray(expression_weights, dtype=np.float32)) ]
+        if visemes:
+            channels.append(("visemes", np.asarray(viseme_weights, dtype=np.float32)))
+        for plan in self.shape_key_plan:
+            key_blocks = plan["key_blocks"]
+            values: np.ndarray = plan["values"]
+            key_blocks.foreach_get("value", values)
+            current = values.copy()
+            for channel, weights in channels:
+                source, target = plan[channel]
+                if len(source):
+                    values[target] = np.clip(weights[source], plan["min"][target], plan["max"][target])
+            if not np.array_equal(values, current):
+                key_blocks.foreach_set("value", values)
+                plan["key"].update_tag()
 
     def set_id_tree(self, bones, ids, id_tree):
         arm = self.get_armature()
@@ -409,6 +457,8 @@ class LinkActor():
         if actor_cache:
             utils.log_info(f"Assigning new link_id: {actor_cache.get_name()}: {new_link_id}")
             actor_cache.set_link_id(new_link_id)
+            get_actor_index().invalidate()
+            get_link_data().sequence_index = None
 
     def ready(self, require_cache=True):
         if require_cache and not self.cache:
@@ -455,13 +505,131 @@ class LinkActor():
                 return chr_cache.get_armature() is not None
         return False
 
+class LinkActorIndex():
+    """Lookup of light/camera objects and characters by link_id, alias and name.
+
+       Only object names and import_cache indices are kept, never bpy references (which undo
+       invalidates), and every hit is checked against the scene, rebuilding the index if it is stale.
+    """
+    valid: bool = False
+    # link_id: light/camera object name
+    objects: dict = None
+    # link_id / name: import_cache index
+    characters: dict = None
+    names: dict = None
+    # alias link_id: character link_id
+    aliases: dict = None
+    object_count: int = 0
+    cache_count: int = 0
+
+    def __init__(self):
+        self.aliases = {}
+        self.invalidate()
+
+    def invalidate(self):
+        self.valid = False
+
+    def reset(self):
+        self.aliases.clear()
+        self.invalidate()
+
+    def rebuild(self):
+        props = vars.props()
+        self.objects = {}
+        self.characters = {}
+        self.names = {}
+        for obj in bpy.data.objects:
+            if obj.type == "LIGHT" or obj.type == "CAMERA":
+                obj_link_id = utils.get_rl_link_id(obj)
+                if obj_link_id is not None:
+                    self.objects.setdefault(obj_link_id, obj.name)
+        for i, chr_cache in enumerate(props.import_cache):
+            if not chr_cache.disabled:
+                if chr_cache.link_id:
+                    self.characters.setdefault(chr_cache.link_id, i)
+                name = chr_cache.get_name()
+                if name:
+                    self.names.setdefault(name, i)
+        self.object_count = len(bpy.data.objects)
+        self.cache_count = len(props.import_cache)
+        self.valid = True
+
+    def check(self):
+        props = vars.props()
+        if (not self.valid or
+            self.object_count != len(bpy.data.objects) or
+            self.cache_count != len(props.import_cache)):
+            self.rebuild()
+
+    def add_alias(self, alias, link_id):
+        self.aliases[alias] = link_id
+
+    def get_object(self, link_id):
+        name = self.objects.get(link_id)
+        obj = bpy.data.objects.get(name) if name is not None else None
+        if obj and utils.get_rl_link_id(obj) == link_id:
+            return obj
+        return None
+
+    def get_character(self, index: dict, key, get_key):
+        props = vars.props()
+        i = index.get(key)
+        if i is not None and i < len(props.import_cache):
+            chr_cache = props.import_cache[i]
+            if not chr_cache.disabled and get_key(chr_cache) == key:
+                return chr_cache
+        return None
+
+    def find_object(self, link_id) -> bpy.types.Object:
+        if link_id is None:
+            return None
+        self.check()
+        if link_id not in self.objects:
+            return None
+        obj = self.get_object(link_id)
+        if not obj:
+            # stale: the scene has changed since the index was built
+            self.rebuild()
+            obj = self.get_object(link_id)
+        return obj
+
+    def find_character(self, link_id):
+        if not link_id:
+            return None
+        self.check()
+        if link_id not in self.characters:
+            link_id = self.aliases.get(link_id)
+            if link_id not in self.characters:
+                return None
+        chr_cache = self.get_character(self.characters, link_id, lambda c: c.link_id)
+        if not chr_cache:
+            self.rebuild()
+            chr_cache = self.get_character(self.characters, link_id, lambda c: c.link_id)
+        return chr_cache
+
+    def find_character_by_name(self, name):
+        if not name:
+            return None
+        self.check()
+        if name not in self.names:
+            return None
+        chr_cache = self.get_character(self.names, name, lambda c: c.get_name())
+        if not chr_cache:
+            self.rebuild()
+            chr_cache = self.get_character(self.names, name, lambda c: c.get_name())
+        return chr_cache
+
+
 class LinkData():
     actors: list = []
     # Sequence/Pose Props
     sequence_current_frame: int = 0
     sequence_start_frame: int = 0
     sequence_end_frame: int = 0
-    sequence_actors: list = None
+    _sequence_actors: list = None
+    # link_id / alias: sequence actor
+    sequence_index: dict = None
+    actor_index: LinkActorIndex = None
     sequence_type: str = None
     sequence_selection: List[bpy.types.Object] = None
     scene_current_frame: int = 0
@@ -474,23 +642,33 @@ class LinkData():
     remote_path: str = None
     remote_exe: str = None
     #
-    ack_rate: float = 0.0
-    ack_time: float = 0.0
-    #
     motion_prefix: str = ""
     use_fake_user: bool = False
     set_keyframes: bool = True
     #
     link_fps: int = 0
+    # sequence frames received with fast record
+    fast_record_count: int = 0
+    # frames buffered by fast record since the last fully applied frame
+    fast_record_buffered: bool = False
 
     def __init__(self):
-        return
+        self.actor_index = LinkActorIndex()
 
     def reset(self):
         self.actors = []
         self.sequence_actors = None
         self.sequence_type = None
 
+    @property
+    def sequence_actors(self):
+        return self._sequence_actors
+
+    @sequence_actors.setter
+    def sequence_actors(self, actors):
+        self._sequence_actors = actors
+        self.sequence_index = None
+
     def is_cc(self):
         if self.remote_app == "Character Creator":
             return True
@@ -498,13 +676,15 @@ class LinkData():
             return False
 
     def find_sequence_actor(self, link_id) -> LinkActor:
-        for actor in self.sequence_actors:
-            if actor.get_link_id() == link_id:
-                return actor
-        for actor in self.sequence_actors:
-            if link_id in actor.alias:
-                return actor
-        return None
+        if self.sequence_index is None:
+            self.sequence_index = {}
+            # link_ids take precedence over aliases
+            for actor in self.sequence_actors:
+                for alias in actor.alias:
+                    self.sequence_index[alias] = actor
+            for actor in self.sequence_actors:
+                self.sequence_index[actor.get_link_id()] = actor
+        return self.sequence_index.get(link_id)
 
     def set_action_settings(self, prefix: str, fake_user, set_keyframes):
         self.motion_prefix = prefix.strip()
@@ -522,6 +702,9 @@ def get_link_data():
     global LINK_DATA
     return LINK_DATA
 
+def get_actor_index() -> LinkActorIndex:
+    return get_link_data().actor_index
+
 
 def encode_from_json(json_data) -> bytearray:
     json_string = json.dumps(json_data)
@@ -530,24 +713,48 @@ def encode_from_json(json_data) -> bytearray:
 
 
 def decode_to_json(data) -> dict:
-    text = data.decode("utf-8")
+    text = str(data, "utf-8")
     json_data = json.loads(text)
     return json_data
 
 
-def pack_string(s) -> bytearray:
-    buffer = bytearray()
-    buffer += struct.pack("!I", len(s))
-    buffer += bytes(s, encoding="utf-8")
-    return buffer
-
-
-def unpack_string(buffer, offset=0):
-    length = struct.unpack_from("!I", buffer, offset)[0]
-    offset += 4
-    string: bytearray = buffer[offset:offset+length]
-    offset += length
-    return offset, string.decode(encoding="utf-8")
+def get_transform_values(matrices, translation_scale=1.0):
+    """DataLink transforms (tx, ty, tz, rx, ry, rz, rw, sx, sy, sz) of the matrices, as a big-endian (N, 10) array."""
+    values = np.empty((len(matrices), linkutils.TRANSFORM_SIZE), dtype=">f4")
+    T: Matrix
+    for i, T in enumerate(matrices):
+        t = T.to_translation() * translation_scale
+        r = T.to_quaternion()
+        s = T.to_scale()
+        values[i] = (t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+    return values
+
+
+def get_pose_bone_matrices(rig: bpy.types.Object, bone_names=None):
+    """Reads all the pose bone matrices of the rig in one bulk read, as (N, 4, 4) row major matrices.
+       Optionally only for the given bone names, in that order."""
+    pose_bones = rig.pose.bones
+    count = len(pose_bones)
+    flat = np.empty(count * 16, dtype=np.float32)
+    pose_bones.foreach_get("matrix", flat)
+    # foreach_get returns the matrices column major
+    matrices = flat.reshape(count, 4, 4).transpose(0, 2, 1).astype(np.float64)
+    if bone_names is not None:
+        matrices = matrices[[ pose_bones.find(name) for name in bone_names ]]
+    return matrices
+
+
+def get_compact_ranges(actor, rig: bpy.types.Object, bone_names, translation_scale):
+    """Quantisation ranges for the compact pose encoding, from the actor's current pose and shape keys."""
+    translations = []
+    if rig:
+        matrices = get_pose_bone_matrices(rig, bone_names)
+        transforms = linkutils.decompose_world_matrices(rig.matrix_world, matrices, translation_scale)
+        translations = transforms[:, 0:3].astype(np.float64)
+    keys = list(actor.shape_keys.values())
+    weight_min = min([ key.slider_min for key in keys ], default=0.0)
+    weight_max = max([ key.slider_max for key in keys ], default=1.0)
+    return linkutils.get_compact_ranges(translations, weight_min, weight_max)
 
 
 def get_datalink_temp_local_folder():
@@ -592,13 +799,6 @@ def get_local_data_path():
     return data_path
 
 
-def get_remote_tar_file_path(remote_id):
-    data_path = get_local_data_path()
-    remote_import_path = utils.make_sub_folder(data_path, "imports")
-    remote_file_path = os.path.join(remote_import_path, f"{remote_id}.tar")
-    return remote_file_path
-
-
 def get_unpacked_tar_file_folder(remote_id):
     data_path = get_local_data_path()
     remote_import_path = utils.make_sub_folder(data_path, "imports")
@@ -615,6 +815,124 @@ def find_rig_pivot_bone(rig, parent):
     return None
 
 
+def get_mesh_topology_hash(mesh: bpy.types.Mesh):
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    return linkutils.topology_hash(len(mesh.vertices), loop_totals, loop_vertices)
+
+
+def get_mesh_position_data(mesh: bpy.types.Mesh, shape_key_name=None):
+    """The named shape key's points, the basis shape key's if the mesh has shape keys, or the vertices."""
+    if mesh.shape_keys:
+        if shape_key_name and shape_key_name in mesh.shape_keys.key_blocks:
+            return mesh.shape_keys.key_blocks[shape_key_name].data
+        return mesh.shape_keys.reference_key.data
+    return mesh.vertices
+
+
+def get_mesh_positions(obj: bpy.types.Object, shape_key_name=None):
+    """(N, 3) local vertex positions of the mesh (or shape key)."""
+    if obj.mode == "EDIT":
+        obj.update_from_editmode()
+    mesh: bpy.types.Mesh = obj.data
+    positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    get_mesh_position_data(mesh, shape_key_name).foreach_get("co", positions)
+    return positions.reshape(-1, 3)
+
+
+def get_mesh_export_data(obj: bpy.types.Object, global_scale=100):
+    """Topology hash and (N, 3) vertex positions of the mesh as obj_export writes them:
+       with the modifiers applied, in world space, scaled by global_scale and Y up."""
+    if obj.mode == "EDIT":
+        obj.update_from_editmode()
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    obj_eval = obj.evaluated_get(depsgraph)
+    mesh = obj_eval.to_mesh()
+    try:
+        topology = get_mesh_topology_hash(mesh)
+        positions = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", positions)
+    finally:
+        obj_eval.to_mesh_clear()
+    M = np.array(obj_eval.matrix_world, dtype=np.float32)
+    positions = positions.reshape(-1, 3) @ M[:3, :3].T + M[:3, 3]
+    return topology, linkutils.blender_to_obj_axes(positions * global_scale)
+
+
+def set_mesh_positions(obj: bpy.types.Object, positions, shape_key_name=None):
+    """Sets the (N, 3) local vertex positions of the mesh, or of the named shape key (added if missing)."""
+    mesh: bpy.types.Mesh = obj.data
+    co = np.ascontiguousarray(positions, dtype=np.float32).ravel()
+    if shape_key_name:
+        if not mesh.shape_keys:
+            obj.shape_key_add(name="Basis")
+        if shape_key_name not in mesh.shape_keys.key_blocks:
+            shape_key_name = obj.shape_key_add(name=shape_key_name).name
+        mesh.shape_keys.key_blocks[shape_key_name].data.foreach_set("co", co)
+    else:
+        mesh.vertices.foreach_set("co", co)
+        if mesh.shape_keys:
+            mesh.shape_keys.reference_key.data.foreach_set("co", co)
+    mesh.update()
+
+
+def get_material_parameters(mat_cache):
+    """The material cache's parameter values, or None if it has none."""
+    parameters = getattr(mat_cache, "parameters", None) if mat_cache else None
+    if not parameters:
+        return None
+    values = {}
+    for name in parameters.bl_rna.properties.keys():
+        if name != "rna_type":
+            value = getattr(parameters, name)
+            values[name] = value if type(value) in (bool, int, float, str) else tuple(value)
+    return values
+
+
+def get_material_textures(mat, mat_cache):
+    """The nodes (and images) connected to the material's shader texture sockets."""
+    shader_name = params.get_shader_name(mat_cache)
+    shader_def = params.get_shader_def(shader_name)
+    bsdf_node, shader_node, mix_node = nodeutils.get_shader_nodes(mat, shader_name)
+    textures = {}
+    if shader_def and shader_node and "textures" in shader_def.keys():
+        for tex_def in shader_def["textures"]:
+            tex_node = nodeutils.get_node_connected_to_input(shader_node, tex_def[0])
+            if tex_node:
+                image = getattr(tex_node, "image", None)
+                textures[tex_def[0]] = (tex_node.name, image.name if image else "", image.filepath if image else "")
+    return textures
+
+
+def write_material_parameters_json(mat_json, mat_cache, changed=None):
+    """As exporter.write_back_json, but only for the json vars of the changed parameters
+       (all of them if None) and the export values that depend on them. Nothing is baked."""
+    shader_def = params.get_shader_def(params.get_shader_name(mat_cache))
+    if mat_json is None or not shader_def:
+        return
+    if "vars" in shader_def.keys():
+        for var_def in shader_def["vars"]:
+            prop_name = var_def[0]
+            prop_default = var_def[1]
+            func = var_def[2]
+            if func == "" and (changed is None or prop_name in changed):
+                json_var = var_def[3]
+                if json_var:
+                    prop_value = exporter.get_prop_value(mat_cache, prop_name, prop_default)
+                    jsonutils.set_material_json_var(mat_json, json_var, prop_value)
+    if "export" in shader_def.keys():
+        for export_def in shader_def["export"]:
+            json_var = export_def[0]
+            json_default = export_def[1]
+            func = export_def[2]
+            args = export_def[3:]
+            if changed is None or any(arg in changed for arg in args):
+                json_value = shaders.eval_parameters_func(mat_cache, func, args, json_default)
+                jsonutils.set_material_json_var(mat_json, json_var, json_value)
+
+
 def BFA(f):
     """Blender Frame Adjust:
             Convert Blender frame index (starting at frame 1)
@@ -778,26 +1096,6 @@ def remove_datalink_import_rig(actor: LinkActor, apply_constraints=False):
         utils.object_mode_to(chr_rig)
 
 
-def set_actor_expression_weight(objects, expression_name, weight):
-    global LINK_DATA
-    if objects:
-        obj: bpy.types.Object
-        for obj in objects:
-            if expression_name in obj.data.shape_keys.key_blocks:
-                if obj.data.shape_keys.key_blocks[expression_name].value != weight:
-                    obj.data.shape_keys.key_blocks[expression_name].value = weight
-
-
-def set_actor_viseme_weight(objects, viseme_name, weight):
-    global LINK_DATA
-    if objects and LINK_DATA.preview_shape_keys:
-        for obj in objects:
-            if obj.data.shape_keys and obj.data.shape_keys.key_blocks:
-                if viseme_name in obj.data.shape_keys.key_blocks:
-                    if obj.data.shape_keys.key_blocks[viseme_name].value != weight:
-                        obj.data.shape_keys.key_blocks[viseme_name].value = weight
-
-
 def ensure_current_frame(current_frame):
     if bpy.context.scene.frame_current != current_frame:
         bpy.context.scene.frame_current = current_frame
@@ -824,7 +1122,7 @@ def prev_frame(current_frame=None):
     return current_frame
 
 
-def create_rotation_fcurves_cache(obj, count):
+def create_rotation_fcurves_cache(obj, buffer: linkutils.KeyframeBuffer):
     if obj.rotation_mode == "QUATERNION":
         indices = 4
         defaults = [1,0,0,0]
@@ -834,21 +1132,18 @@ def create_rotation_fcurves_cache(obj, count):
     else: # transform_object.rotation_mode in [ "XYZ", "XZY", "YXZ", "YZX", "ZXY", "ZYX" ]:
         indices = 3
         defaults = [0,0,0]
-    return create_fcurves_cache(count, indices, defaults, cache_type=obj.rotation_mode)
+    return create_fcurves_cache(buffer, indices, defaults, cache_type=obj.rotation_mode)
 
 
-def create_fcurves_cache(count, indices, defaults, cache_type="VALUE"):
-    curves = []
+def create_fcurves_cache(buffer: linkutils.KeyframeBuffer, indices, defaults, cache_type="VALUE"):
+    """Reserves the channels for a property's fcurves in the actor's keyframe buffer."""
     cache = {
-        "count": count,
+        "count": buffer.count,
         "indices": indices,
-        "curves": curves,
+        "buffer": buffer,
+        "column": buffer.reserve(defaults[:indices]),
         "type": cache_type,
     }
-    for i in range(0, indices):
-        d = defaults[i]
-        cache_data = [d]*(count*2)
-        curves.append(cache_data)
     return cache
 
 
@@ -901,9 +1196,14 @@ def prep_pose_actor(actor: LinkActor, start_frame, end_frame):
     props = vars.props()
     prefs = vars.prefs()
 
-    motion_id = "Pose" if LINK_DATA.sequence_type == "POSE" else "Sequence"
+    motion_id = ("Pose" if LINK_DATA.sequence_type == "POSE" else
+                 "Motion" if LINK_DATA.sequence_type == "MOTION" else
+                 "Sequence")
     chr_cache = actor.get_chr_cache()
     rigutils.ensure_motion_set(actor.get_primary_object(), motion_id, LINK_DATA.motion_prefix)
+    # keyframe rows are stored from the sequence start frame after the actor's frame mode,
+    # as the frames are stored and written relative to it
+    opt_start_frame = LinkActor.get_sequence_frame(actor, start_frame, start_frame, LINK_DATA.scene_current_frame)
 
     if actor and actor.get_type() == "LIGHT":
 
@@ -918,24 +1218,27 @@ def prep_pose_actor(actor: LinkActor, start_frame, end_frame):
                                  motion_prefix=LINK_DATA.motion_prefix)
 
             count = end_frame - start_frame + 1
+            buffer = linkutils.KeyframeBuffer(count, opt_start_frame)
             transform_cache = {}
             light_cache = {}
             actor_cache = {
                 "object": actor.object,
+                "buffer": buffer,
                 "transform": transform_cache,
                 "light": light_cache,
                 "start": start_frame,
                 "end": end_frame,
             }
 
-            transform_cache["loc"] = create_fcurves_cache(count, 3, [0,0,0])
-            transform_cache["rot"] = create_rotation_fcurves_cache(actor.object, count)
-            transform_cache["sca"] = create_fcurves_cache(count, 3, [1,1,1])
-            light_cache["color"] = create_fcurves_cache(count, 3, [1,1,1])
-            light_cache["energy"] = create_fcurves_cache(count, 1, [1])
-            light_cache["cutoff_distance"] = create_fcurves_cache(count, 1, [9])
-            light_cache["spot_blend"] = create_fcurves_cache(count, 1, [1])
-            light_cache["spot_size"] = create_fcurves_cache(count, 1, [1])
+            transform_cache["loc"] = create_fcurves_cache(buffer, 3, [0,0,0])
+            transform_cache["rot"] = create_rotation_fcurves_cache(actor.object, buffer)
+            transform_cache["sca"] = create_fcurves_cache(buffer, 3, [1,1,1])
+            light_cache["color"] = create_fcurves_cache(buffer, 3, [1,1,1])
+            light_cache["energy"] = create_fcurves_cache(buffer, 1, [1])
+            light_cache["cutoff_distance"] = create_fcurves_cache(buffer, 1, [9])
+            light_cache["spot_blend"] = create_fcurves_cache(buffer, 1, [1])
+            light_cache["spot_size"] = create_fcurves_cache(buffer, 1, [1])
+            buffer.allocate()
             actor.set_cache(actor_cache)
 
         else:
@@ -957,23 +1260,26 @@ def prep_pose_actor(actor: LinkActor, start_frame, end_frame):
                                  motion_prefix=LINK_DATA.motion_prefix)
 
             count = end_frame - start_frame + 1
+            buffer = linkutils.KeyframeBuffer(count, opt_start_frame)
             transform_cache = {}
             camera_cache = {}
             actor_cache = {
                 "object": actor.object,
+                "buffer": buffer,
                 "transform": transform_cache,
                 "camera": camera_cache,
                 "start": start_frame,
                 "end": end_frame,
             }
 
-            transform_cache["loc"] = create_fcurves_cache(count, 3, [0,0,0])
-            transform_cache["rot"] = create_rotation_fcurves_cache(actor.object, count)
-            transform_cache["sca"] = create_fcurves_cache(count, 3, [1,1,1])
-            camera_cache["lens"] = create_fcurves_cache(count, 1, [50])
-            camera_cache["dof"] = create_fcurves_cache(count, 1, [1])
-            camera_cache["focus_distance"] = create_fcurves_cache(count, 1, [1])
-            camera_cache["f_stop"] = create_fcurves_cache(count, 1, [2.8])
+            transform_cache["loc"] = create_fcurves_cache(buffer, 3, [0,0,0])
+            transform_cache["rot"] = create_rotation_fcurves_cache(actor.object, buffer)
+            transform_cache["sca"] = create_fcurves_cache(buffer, 3, [1,1,1])
+            camera_cache["lens"] = create_fcurves_cache(buffer, 1, [50])
+            camera_cache["dof"] = create_fcurves_cache(buffer, 1, [1])
+            camera_cache["focus_distance"] = create_fcurves_cache(buffer, 1, [1])
+            camera_cache["f_stop"] = create_fcurves_cache(buffer, 1, [2.8])
+            buffer.allocate()
             actor.set_cache(actor_cache)
 
         else:
@@ -1124,40 +1430,50 @@ def prep_pose_actor(actor: LinkActor, start_frame, end_frame):
             if LINK_DATA.set_keyframes:
 
                 count = end_frame - start_frame + 1
+                # all the bone channels, then all the shape key channels, each in a single block
+                # so that a whole frame of them can be stored in one row slice
+                buffer = linkutils.KeyframeBuffer(count, opt_start_frame)
                 bone_cache = {}
                 expression_cache = {}
                 viseme_cache = {}
                 morph_cache = {}
                 actor_cache = {
                     "rig": rig,
+                    "buffer": buffer,
                     "bones": bone_cache,
+                    "bones_column": 0,
                     "expressions": expression_cache,
                     "visemes": viseme_cache,
                     "morphs": morph_cache,
+                    "shapes_column": 0,
                     "start": start_frame,
                     "end": end_frame,
                 }
                 for pose_bone in rig.pose.bones:
                     bone_name = pose_bone.name
                     if bones.get_bone_selected(rig, pose_bone):
-                        loc_cache = create_fcurves_cache(count, 3, [0,0,0])
-                        sca_cache = create_fcurves_cache(count, 3, [1,1,1])
-                        rot_cache = create_rotation_fcurves_cache(pose_bone, count)
+                        loc_cache = create_fcurves_cache(buffer, 3, [0,0,0])
+                        rot_cache = create_rotation_fcurves_cache(pose_bone, buffer)
+                        sca_cache = create_fcurves_cache(buffer, 3, [1,1,1])
                         bone_cache[bone_name] = {
                             "loc": loc_cache,
                             "sca": sca_cache,
                             "rot": rot_cache,
                         }
 
+                actor_cache["bone_solve"] = create_bone_solve_cache(rig, bone_cache)
+                actor_cache["shapes_column"] = len(buffer.defaults)
+
                 for expression_name in actor.expressions:
-                    expression_cache[expression_name] = create_fcurves_cache(count, 1, [0])
+                    expression_cache[expression_name] = create_fcurves_cache(buffer, 1, [0])
 
                 for viseme_name in actor.visemes:
-                    viseme_cache[viseme_name] = create_fcurves_cache(count, 1, [0])
+                    viseme_cache[viseme_name] = create_fcurves_cache(buffer, 1, [0])
 
                 for morph_name in actor.morphs:
                     pass
 
+                buffer.allocate()
                 actor.set_cache(actor_cache)
 
 
@@ -1182,45 +1498,114 @@ def key_frame_pose_visual():
         bpy.ops.anim.keyframe_insert_menu(type='BUILTIN_KSI_VisualLocRot')
 
 
-def store_cache_curves_frame(cache, prop, frame, start, value):
+def get_cache_curves_values(prop_cache, value):
+    """The fcurve channel values of a property value, converting rotations to the cache's rotation mode."""
     T = type(value)
-    index = (frame - start) * 2
     if T is Quaternion:
-        cache_type = cache[prop]["type"]
+        cache_type = prop_cache["type"]
         if cache_type == "QUATERNION":
-            l = len(value)
-            for i in range(0, l):
-                curve = cache[prop]["curves"][i]
-                curve[index] = frame
-                curve[index + 1] = value[i]
+            return value[:]
         elif cache_type == "AXIS_ANGLE":
             # convert quaternion to angle axis
             v,a = value.to_axis_angle()
-            l = len(v)
-            for i in range(0, l):
-                curve = cache[prop]["curves"][i]
-                curve[index] = frame
-                curve[index + 1] = v[i]
-            curve = cache[prop]["curves"][3]
-            curve[index] = frame
-            curve[index + 1] = a
+            return (v[0], v[1], v[2], a)
         else:
-            euler = value.to_euler(cache_type)
-            l = len(euler)
-            for i in range(0, l):
-                curve = cache[prop]["curves"][i]
-                curve[index] = frame
-                curve[index + 1] = euler[i]
+            return value.to_euler(cache_type)[:]
     elif T is Vector or T is Color or T is tuple or T is list:
-        l = len(value)
-        for i in range(0, l):
-            curve = cache[prop]["curves"][i]
-            curve[index] = frame
-            curve[index + 1] = value[i]
+        return value[:]
     else:
-        curve = cache[prop]["curves"][0]
-        curve[index] = frame
-        curve[index + 1] = value
+        return (value,)
+
+
+def store_cache_curves_frame(cache, prop, frame, start, value):
+    prop_cache = cache[prop]
+    buffer: linkutils.KeyframeBuffer = prop_cache["buffer"]
+    buffer.set(frame - start, prop_cache["column"], get_cache_curves_values(prop_cache, value))
+
+
+def create_bone_solve_cache(rig: bpy.types.Object, bone_cache: dict):
+    """Precomputes everything about the cached bones that doesn't change during a sequence:
+       pose bone indices, parent indices, inverted rest @ parent rest matrices and the
+       buffer columns of each bone's channels (relative to the first bone channel)."""
+    pose_bones = rig.pose.bones
+    count = len(bone_cache)
+    indices = np.empty(count, dtype=np.int64)
+    parents = np.full(count, -1, dtype=np.int64)
+    RIPR = np.empty((count, 4, 4), dtype=np.float64)
+    local_location = np.empty(count, dtype=bool)
+    inherit_rotation = np.empty(count, dtype=bool)
+    loc_columns = np.empty((count, 3), dtype=np.int64)
+    sca_columns = np.empty((count, 3), dtype=np.int64)
+    # rotation mode: [ bone positions, (n, 3 or 4) columns ]
+    rotations = {}
+    column = 0
+    for i, bone_name in enumerate(bone_cache):
+        pose_bone: bpy.types.PoseBone = pose_bones[bone_name]
+        indices[i] = pose_bones.find(bone_name)
+        RI = np.linalg.inv(np.array(pose_bone.bone.matrix_local))
+        if pose_bone.parent:
+            parents[i] = pose_bones.find(pose_bone.parent.name)
+            RIPR[i] = RI @ np.array(pose_bone.parent.bone.matrix_local)
+        else:
+            RIPR[i] = RI
+        local_location[i] = pose_bone.bone.use_local_location
+        inherit_rotation[i] = pose_bone.bone.use_inherit_rotation
+        rot_cache = bone_cache[bone_name]["rot"]
+        num_rot = rot_cache["indices"]
+        loc_columns[i] = range(column, column + 3)
+        positions, columns = rotations.setdefault(rot_cache["type"], ([], []))
+        positions.append(i)
+        columns.append(range(column + 3, column + 3 + num_rot))
+        sca_columns[i] = range(column + 3 + num_rot, column + 6 + num_rot)
+        column += 6 + num_rot
+    return {
+        "indices": indices,
+        "parents": parents,
+        "has_parent": parents >= 0,
+        "RIPR": RIPR,
+        "local_location": local_location,
+        "inherit_rotation": inherit_rotation,
+        "loc_columns": loc_columns,
+        "sca_columns": sca_columns,
+        "rotations": { mode: (np.array(positions, dtype=np.int64), np.array(columns, dtype=np.int64))
+                       for mode, (positions, columns) in rotations.items() },
+        "width": column,
+    }
+
+
+def solve_bone_cache_values(solve, pose_matrices):
+    """The cached bones' channel values from (F, N, 4, 4) object space pose bone matrices of F frames.
+       Returns (F, width) float32 values."""
+    frames = len(pose_matrices)
+    M = pose_matrices[:, solve["indices"]]
+    count = M.shape[1]
+    # parent object space matrices (identity for root bones)
+    P = np.broadcast_to(np.identity(4), M.shape).copy()
+    has_parent = solve["has_parent"]
+    P[:, has_parent] = pose_matrices[:, solve["parents"][has_parent]]
+    # non-local space matrices (if not using local location or inherit rotation)
+    NL = np.matmul(np.linalg.inv(P), M)
+    # local space matrices: RI @ (PR @ (PI @ M))
+    L = np.matmul(solve["RIPR"], NL)
+    loc = np.where(solve["local_location"][:, None], L[..., 0:3, 3], NL[..., 0:3, 3])
+    inherit_rotation = np.tile(solve["inherit_rotation"], frames)
+    L = L.reshape(-1, 4, 4)
+    NL = NL.reshape(-1, 4, 4)
+    sca = linkutils.matrices_to_scales(L).reshape(frames, count, 3)
+    rot = linkutils.matrices_to_quaternions(np.where(inherit_rotation[:, None, None], L, NL)).reshape(frames, count, 4)
+    values = np.empty((frames, solve["width"]), dtype=np.float32)
+    values[:, solve["loc_columns"]] = loc
+    values[:, solve["sca_columns"]] = sca
+    for mode, (positions, columns) in solve["rotations"].items():
+        q = rot[:, positions].reshape(-1, 4)
+        if mode == "QUATERNION":
+            r = q
+        elif mode == "AXIS_ANGLE":
+            r = linkutils.quaternions_to_axis_angles(q)
+        else:
+            r = linkutils.quaternions_to_eulers(q, mode)
+        values[:, columns] = r.reshape(frames, len(positions), -1)
+    return values
 
 
 def store_bone_cache_keyframes(actor: LinkActor, frame, start):
@@ -1230,35 +1615,248 @@ def store_bone_cache_keyframes(actor: LinkActor, frame, start):
         utils.log_error(f"No actor cache: {actor.name}")
         return
 
+    solve = actor.cache["bone_solve"]
+    if not solve["width"]:
+        return
     rig = actor.get_armature()
-    bone_cache = actor.cache["bones"]
-    for bone_name in bone_cache:
-        pose_bone: bpy.types.PoseBone = rig.pose.bones[bone_name]
-        L: Matrix   # local space matrix we want
-        NL: Matrix  # non-local space matrix we want (if not using local location or inherit rotation)
-        M: Matrix = pose_bone.matrix # object space matrix of the pose bone after contraints and drivers
-        R: Matrix = pose_bone.bone.matrix_local # bone rest pose matrix
-        RI: Matrix = R.inverted() # bone rest pose matrix inverted
-        if pose_bone.parent:
-            PI: Matrix = pose_bone.parent.matrix.inverted() # parent object space matrix inverted (after contraints and drivers)
-            PR: Matrix = pose_bone.parent.bone.matrix_local # parent rest pose matrix
-            L = RI @ (PR @ (PI @ M))
-            NL = PI @ M
-        else:
-            L = RI @ M
-            NL = M
-        if not pose_bone.bone.use_local_location:
-            loc = NL.to_translation()
+    # object space matrices of the pose bones after contraints and drivers
+    pose_matrices = get_pose_bone_matrices(rig)
+    values = solve_bone_cache_values(solve, pose_matrices[None])[0]
+    buffer: linkutils.KeyframeBuffer = actor.cache["buffer"]
+    buffer.set(frame - start, actor.cache["bones_column"], values)
+
+
+def create_analytic_pose_solve(actor: LinkActor):
+    """For a character rig that is only constrained to its datalink import rig (world space copy
+       location, rotation and scale), works out how its object space pose bone matrices follow
+       directly from the incoming bone transforms, so recorded frames can be solved without a
+       depsgraph update. Returns None if the rig can't be solved this way."""
+    chr_cache = actor.get_chr_cache()
+    rig = actor.get_armature()
+    if not chr_cache or not rig or chr_cache.rigified or not actor.id_map:
+        return None
+    link_rig = chr_cache.rig_datalink_rig
+    if not utils.object_exists_is_armature(link_rig) or link_rig.parent:
+        return None
+    # link rig bone name: incoming bone index
+    link_bones = {}
+    for i, id in enumerate(actor.ids):
+        if id in actor.id_map and not actor.id_map[id]["mesh"]:
+            link_bones[actor.id_map[id]["name"]] = i
+    # character bone name: (incoming bone index, link rig bone rest matrix)
+    targets = {}
+    copy_types = { "COPY_LOCATION", "COPY_ROTATION", "COPY_SCALE" }
+    pose_bone: bpy.types.PoseBone
+    for pose_bone in rig.pose.bones:
+        constraints = [ c for c in pose_bone.constraints if not c.mute ]
+        if constraints:
+            subtargets = set()
+            types = set()
+            for c in constraints:
+                if (c.type not in copy_types or c.target != link_rig or c.influence != 1.0 or
+                    c.target_space != "WORLD" or c.owner_space != "WORLD" or c.subtarget not in link_bones):
+                    return None
+                if c.type == "COPY_ROTATION" and c.mix_mode != "REPLACE":
+                    return None
+                if c.type == "COPY_LOCATION" and c.use_offset:
+                    return None
+                subtargets.add(c.subtarget)
+                types.add(c.type)
+            if types != copy_types or len(subtargets) != 1:
+                return None
+            subtarget = subtargets.pop()
+            targets[pose_bone.name] = (link_bones[subtarget], np.array(link_rig.data.bones[subtarget].matrix_local))
+    return build_analytic_pose_solve(rig, np.array(link_rig.matrix_world), targets)
+
+
+def create_template_pose_solve(actor: LinkActor):
+    """As create_analytic_pose_solve, but for the datalink import rig that make_datalink_import_rig would
+       make from the actor's template (bones at the origin with identity rests, each constraining the
+       character bone it maps to), without making it. Returns None if the rig can't be solved this way."""
+    chr_cache = actor.get_chr_cache()
+    rig = actor.get_armature()
+    if not chr_cache or not rig or chr_cache.rigified or not actor.id_map:
+        return None
+    if utils.object_exists_is_armature(chr_cache.rig_datalink_rig):
+        return create_analytic_pose_solve(actor)
+    targets = {}
+    for i, id in enumerate(actor.ids):
+        if id in actor.id_map and not actor.id_map[id]["mesh"]:
+            chr_bone_name = bones.find_target_bone_name(rig, actor.id_map[id]["name"])
+            if chr_bone_name:
+                if chr_bone_name in targets:
+                    return None
+                targets[chr_bone_name] = (i, np.identity(4))
+    return build_analytic_pose_solve(rig, np.identity(4), targets)
+
+
+def build_analytic_pose_solve(rig: bpy.types.Object, link_world, targets: dict):
+    """The analytic solve of the character rig, with its targets: { bone name: (incoming bone index,
+       link rig bone rest matrix) } copying the world transforms of the link rig (at link_world)
+       bones. All the other bones must be unconstrained."""
+    if rig.parent or not targets:
+        return None
+    if rig.animation_data and any(driver.data_path.startswith("pose.") for driver in rig.animation_data.drivers):
+        return None
+    # the character rig is posed at the origin, at the actor's scale, for each frame
+    chr_world = np.diag(list(rig.scale) + [1.0])
+    C = np.linalg.inv(chr_world) @ link_world
+    S = np.linalg.norm(C[0:3, 0:3], axis=0)
+    if not np.allclose(S, S[0]) or not np.allclose(C[0:3, 0:3].T @ C[0:3, 0:3], np.identity(3) * S[0] * S[0]):
+        return None
+    pose_bones = rig.pose.bones
+    count = len(pose_bones)
+    sources = np.full(count, -1, dtype=np.int64)
+    parents = np.full(count, -1, dtype=np.int64)
+    # constrained: C @ link bone rest, unconstrained: parent rest relative rest @ basis
+    K = np.empty((count, 4, 4), dtype=np.float64)
+    depth = np.zeros(count, dtype=np.int64)
+    pose_bone: bpy.types.PoseBone
+    for j, pose_bone in enumerate(pose_bones):
+        bone = pose_bone.bone
+        if pose_bone.name in targets:
+            sources[j], rest = targets[pose_bone.name]
+            K[j] = C @ rest
         else:
-            loc = L.to_translation()
-        sca = L.to_scale()
-        if not pose_bone.bone.use_inherit_rotation:
-            rot = NL.to_quaternion()
+            if any(not c.mute for c in pose_bone.constraints):
+                return None
+            if not bone.use_inherit_rotation or bone.inherit_scale != "FULL" or not bone.use_local_location:
+                return None
+            R = np.array(bone.matrix_local)
+            if pose_bone.parent:
+                parents[j] = pose_bones.find(pose_bone.parent.name)
+                R = np.linalg.inv(np.array(pose_bone.parent.bone.matrix_local)) @ R
+            K[j] = R @ np.array(pose_bone.matrix_basis)
+        parent = pose_bone.parent
+        while parent:
+            depth[j] += 1
+            parent = parent.parent
+    constrained = sources >= 0
+    unconstrained = np.flatnonzero(~constrained)
+    return {
+        "constrained": constrained,
+        "sources": sources[constrained],
+        "K": K,
+        # parents before children
+        "unconstrained": unconstrained[np.argsort(depth[unconstrained], kind="stable")],
+        "parents": parents,
+        "scale": np.array(rig.scale, dtype=np.float64),
+        "count": count,
+    }
+
+
+def solve_analytic_pose_matrices(analytic, transforms):
+    """(F, N, 4, 4) object space pose bone matrices of the character rig from
+       (F, B, 10) incoming bone transforms (tx, ty, tz, rx, ry, rz, rw, sx, sy, sz)."""
+    frames = len(transforms)
+    T = transforms[:, analytic["sources"]].reshape(-1, linkutils.TRANSFORM_SIZE).astype(np.float64)
+    q = T[:, (6, 3, 4, 5)]
+    length = np.linalg.norm(q, axis=1)
+    length[length == 0.0] = 1.0
+    # link rig pose bone: location (cm to m), rotation and scale (the actor's scale)
+    basis = np.zeros((len(T), 4, 4), dtype=np.float64)
+    basis[:, 0:3, 0:3] = linkutils.quaternions_to_matrices(q / length[:, None]) * analytic["scale"][None, None, :]
+    basis[:, 0:3, 3] = T[:, 0:3] * 0.01
+    basis[:, 3, 3] = 1.0
+    M = np.empty((frames, analytic["count"], 4, 4), dtype=np.float64)
+    K = analytic["K"]
+    constrained = analytic["constrained"]
+    M[:, constrained] = np.matmul(K[constrained], basis.reshape(frames, -1, 4, 4))
+    parents = analytic["parents"]
+    for j in analytic["unconstrained"]:
+        p = parents[j]
+        M[:, j] = np.matmul(M[:, p], K[j]) if p >= 0 else K[j]
+    return M
+
+
+def solve_recorded_frames(actor: LinkActor, chunk_size=256):
+    """Solves the frames buffered by fast record into the actor's keyframe cache."""
+    if not actor.cache:
+        return
+    recorded = actor.cache.get("recorded")
+    if not recorded or not recorded["rows"]:
+        return
+    solve = actor.cache["bone_solve"]
+    analytic = recorded["analytic"]
+    buffer: linkutils.KeyframeBuffer = actor.cache["buffer"]
+    rows = recorded["rows"]
+    transforms = recorded["transforms"]
+    if solve["width"]:
+        for i in range(0, len(rows), chunk_size):
+            M = solve_analytic_pose_matrices(analytic, np.stack(transforms[i:i+chunk_size]))
+            buffer.set_rows(rows[i:i+chunk_size], actor.cache["bones_column"], solve_bone_cache_values(solve, M))
+    utils.log_info(f"Solved {len(rows)} recorded frames: {actor.name}")
+    recorded["rows"] = []
+    recorded["transforms"] = []
+
+
+def store_shape_key_cache_rows(actor: LinkActor, rows, expression_weights, viseme_weights):
+    """Stores (F, E) expression and (F, V) viseme weights into the F rows of the actor's keyframe cache."""
+    num_expressions = len(actor.cache["expressions"])
+    num_visemes = len(actor.cache["visemes"])
+    if num_expressions + num_visemes:
+        values = np.zeros((len(rows), num_expressions + num_visemes), dtype=np.float32)
+        n = min(num_expressions, expression_weights.shape[1])
+        values[:, :n] = expression_weights[:, :n]
+        n = min(num_visemes, viseme_weights.shape[1])
+        values[:, num_expressions:num_expressions + n] = viseme_weights[:, :n]
+        buffer: linkutils.KeyframeBuffer = actor.cache["buffer"]
+        buffer.set_rows(rows, actor.cache["shapes_column"], values)
+
+
+def solve_motion_curves(actor: LinkActor, curves, chunk_size=256):
+    """Solves a whole motion's decoded curves (MOTION_CURVES) straight into the actor's keyframe cache,
+       without making the datalink import rig or posing and evaluating the character rig.
+       Returns False if the rig can't be solved this way."""
+    chr_cache = actor.get_chr_cache()
+    if not chr_cache or chr_cache.rigified:
+        return False
+    # mesh bones (prop skin meshes) are positioned by the fully evaluated frames
+    if any(id in actor.id_map and actor.id_map[id]["mesh"] for id in actor.ids):
+        return False
+    transforms = curves["bones"]
+    # negative scales are left to the constraints to resolve
+    if (transforms[..., 7:10] < 0).any():
+        return False
+    rig = actor.get_armature()
+    # the character rig is posed at the origin, at the actor's scale, as for the live frames
+    rig.location = Vector((0, 0, 0))
+    rot_mode = rig.rotation_mode
+    utils.set_transform_rotation(rig, Quaternion((1, 0, 0, 0)))
+    rig.scale = Vector((0.01, 0.01, 0.01))
+    rig.rotation_mode = rot_mode
+    analytic = create_template_pose_solve(actor)
+    if not analytic:
+        return False
+    solve = actor.cache["bone_solve"]
+    buffer: linkutils.KeyframeBuffer = actor.cache["buffer"]
+    # every frame mode keeps the frames consecutive from the start frame
+    rows = np.arange(len(transforms))
+    if solve["width"]:
+        for i in range(0, len(rows), chunk_size):
+            M = solve_analytic_pose_matrices(analytic, transforms[i:i+chunk_size])
+            buffer.set_rows(rows[i:i+chunk_size], actor.cache["bones_column"], solve_bone_cache_values(solve, M))
+    store_shape_key_cache_rows(actor, rows, curves["expressions"], curves["visemes"])
+    utils.log_info(f"Solved {len(rows)} motion frames: {actor.name}")
+    return True
+
+
+def get_actor_recorder(actor: LinkActor):
+    """The fast record frame buffer of the actor, or None if the actor can't be fast recorded."""
+    if not actor.cache or actor.get_type() not in ["AVATAR", "PROP"]:
+        return None
+    if "recorded" not in actor.cache:
+        chr_cache = actor.get_chr_cache()
+        if not chr_cache or not utils.object_exists_is_armature(chr_cache.rig_datalink_rig):
+            # the import rig (and constraints) are made by the first fully evaluated frame
+            return None
+        analytic = create_analytic_pose_solve(actor)
+        if analytic:
+            utils.log_info(f"Fast recording: {actor.name}")
         else:
-            rot = L.to_quaternion()
-        store_cache_curves_frame(bone_cache[bone_name], "loc", frame, start, loc)
-        store_cache_curves_frame(bone_cache[bone_name], "rot", frame, start, rot)
-        store_cache_curves_frame(bone_cache[bone_name], "sca", frame, start, sca)
+            utils.log_info(f"Fast record not possible, fully evaluating every frame: {actor.name}")
+        actor.cache["recorded"] = { "analytic": analytic, "rows": [], "transforms": [] } if analytic else None
+    return actor.cache["recorded"]
 
 
 def store_shape_key_cache_keyframes(actor: LinkActor, frame, start, expression_weights, viseme_weights, morph_weights):
@@ -1267,12 +1865,17 @@ def store_shape_key_cache_keyframes(actor: LinkActor, frame, start, expression_w
         utils.log_error(f"No actor cache: {actor.name}")
         return
 
-    expression_cache = actor.cache["expressions"]
-    for i, expression_name in enumerate(expression_cache):
-        store_cache_curves_frame(actor.cache["expressions"], expression_name, frame, start, expression_weights[i])
-    viseme_cache = actor.cache["visemes"]
-    for i, viseme_name in enumerate(viseme_cache):
-        store_cache_curves_frame(actor.cache["visemes"], viseme_name, frame, start, viseme_weights[i])
+    # the expression and viseme channels are reserved contiguously
+    num_expressions = len(actor.cache["expressions"])
+    num_visemes = len(actor.cache["visemes"])
+    if num_expressions + num_visemes:
+        values = np.zeros(num_expressions + num_visemes, dtype=np.float32)
+        n = min(num_expressions, len(expression_weights))
+        values[:n] = expression_weights[:n]
+        n = min(num_visemes, len(viseme_weights))
+        values[num_expressions:num_expressions + n] = viseme_weights[:n]
+        buffer: linkutils.KeyframeBuffer = actor.cache["buffer"]
+        buffer.set(frame - start, actor.cache["shapes_column"], values)
 
 
 def store_light_cache_keyframes(actor: LinkActor, frame, start):
@@ -1323,7 +1926,7 @@ def store_camera_cache_keyframes(actor: LinkActor, frame, start):
     store_cache_curves_frame(camera_cache, "f_stop", frame, start, data.dof.aperture_fstop)
 
 
-def write_action_rotation_cache_curve(action: bpy.types.Action, cache, prop, obj, num_frames, group_name=None, slot=None, slot_type=None, reduce=False):
+def write_action_rotation_cache_curve(action: bpy.types.Action, cache, prop, obj, num_frames, group_name=None, slot=None, slot_type=None, reduce=True):
     cache_type = cache[prop]["type"]
     data_path = None
     if cache_type == "QUATERNION":
@@ -1341,32 +1944,26 @@ def write_action_rotation_cache_curve(action: bpy.types.Action, cache, prop, obj
     write_action_cache_curve(action, cache, prop, data_path, num_frames, group_name, slot=slot, slot_type=slot_type, reduce=reduce)
 
 
-def write_action_cache_curve(action: bpy.types.Action, cache, prop, data_path, num_frames, group_name, slot=None, slot_type=None, reduce=False):
+def write_action_cache_curve(action: bpy.types.Action, cache, prop, data_path, num_frames, group_name, slot=None, slot_type=None, reduce=True):
     if not LINK_DATA.set_keyframes: return
     prop_cache = cache[prop]
-    num_curves = len(prop_cache["curves"])
+    buffer: linkutils.KeyframeBuffer = prop_cache["buffer"]
+    column = prop_cache["column"]
+    num_curves = prop_cache["indices"]
     channel = utils.get_action_channelbag(action, slot=slot, slot_type=slot_type)
     if channel:
         fcurve: bpy.types.FCurve = None
         if group_name not in channel.groups:
             channel.groups.new(group_name)
         for i in range(0, num_curves):
-            cache_curve = prop_cache["curves"][i]
             fcurve = channel.fcurves.new(data_path, index=i)
-            set_count = num_frames * 2
-            if set_count < len(cache_curve):
-                # if setting fewer frames than are in the cache (sequence was stopped early)
-                cache_data = cache_curve[:set_count]
-            else:
-                cache_data = cache_curve
+            # only the recorded frames (the sequence may have been stopped early)
+            cache_data = buffer.get_keyframes(column + i, num_frames)
             if reduce:
-                reduced = rlx.reduce_cache(cache_data, "LINEAR")
-                num_reduced = int(len(reduced) / 2)
-                fcurve.keyframe_points.add(num_reduced)
-                fcurve.keyframe_points.foreach_set('co', reduced)
-            else:
-                fcurve.keyframe_points.add(num_frames)
-                fcurve.keyframe_points.foreach_set('co', cache_curve)
+                cache_data = rlx.reduce_cache(cache_data, "LINEAR", data_path)
+            num_keys = int(len(cache_data) / 2)
+            fcurve.keyframe_points.add(num_keys)
+            fcurve.keyframe_points.foreach_set('co', cache_data)
             rigutils.reset_fcurve_interpolation(fcurve)
 
 
@@ -1525,8 +2122,18 @@ class LinkService():
     is_import: bool = False
     loop_rate: float = 0.0
     loop_count: int = 0
-    sequence_send_count: int = 5
-    sequence_send_rate: float = 5.0
+    flow: linkutils.FlowControl = None
+    telemetry: linkutils.LinkTelemetry = None
+    # arrival time of the message being parsed
+    message_time: float = 0.0
+    # session recording and replay
+    recorder: linkutils.SessionRecorder = None
+    replay_log: linkutils.SessionLog = None
+    replay_index: int = 0
+    # frame messages before this index are skipped (start frame of the replay)
+    replay_from: int = 0
+    replay_start: float = 0.0
+    replay_speed: str = "ORIGINAL"
     # Signals
     listening = Signal()
     connecting = Signal()
@@ -1551,10 +2158,68 @@ class LinkService():
     plugin_version: str = None
     link_data: LinkData = None
     remote_is_local: bool = True
+    reader: linkutils.MessageReader = None
+    io_thread: linkutils.LinkIOThread = None
+    compression: linkutils.Compression = None
+    remote_delta_frames: bool = False
+    remote_pose_encodings: list = None
+    compact_sequence: bool = False
+    remote_frame_batch: bool = False
+    remote_compact_sync: bool = False
+    remote_mesh_delta: bool = False
+    remote_material_diff: bool = False
+    # (link_id, object key, material key): material json last sent or received
+    material_snapshots: dict = None
+    # material name: material cache parameter values, for live material sync
+    material_parameters: dict = None
+    # material name: shader texture nodes, for live material sync
+    material_textures: dict = None
+    # material name: (parameter values, shader texture nodes) of the material last sent or received
+    material_sent: dict = None
+    material_debounce: linkutils.Debouncer = None
+    # object name: (topology hash, (N, 3) OBJ export space positions) of the meshes last sent or received
+    mesh_baselines: dict = None
+    # object name: { delta_id, topology, positions, resend } of the mesh deltas sent but not yet acknowledged
+    mesh_deltas: dict = None
+    mesh_delta_id: int = 0
+    # coalescing, rate limited camera and frame sync
+    sync: linkutils.SyncSender = None
+    # send sequence frames in batches (SEQUENCE_FRAMES) of (frame, actor_blocks)
+    batch_sequence: bool = False
+    sequence_batch: list = None
+    delta_encoder: linkutils.DeltaEncoder = None
+    delta_decoder: linkutils.DeltaDecoder = None
+    # remote_id: { "files": [extracted file names], "hashes": { name: hash }, "manifest": [files] }
+    remote_transfers: dict = None
+    file_events: queue.Queue = None
+    file_cache: linkutils.FileCache = None
+    remote_file_cache: bool = False
+    # remote ids of incoming transfers with a manifest, whose files are hashed by the I/O thread
+    cached_transfers: set = None
+    # the outgoing transfer waiting for the remote's FILE_REQUEST:
+    # { "remote_id", "folder", "manifest", "deadline" }
+    file_request: dict = None
+    # messages sent while a file request is pending, sent in order once its files have gone:
+    # ("REQUEST", remote_id, folder), ("FILE", remote_id, source, remove) or ("MESSAGE", op_code, data)
+    held_messages: list = None
 
     def __init__(self):
         global LINK_DATA
         self.link_data = LINK_DATA
+        self.remote_transfers = {}
+        self.file_events = queue.Queue()
+        self.cached_transfers = set()
+        self.held_messages = []
+        self.flow = linkutils.FlowControl()
+        self.telemetry = linkutils.LinkTelemetry()
+        self.sync = linkutils.SyncSender()
+        self.mesh_baselines = {}
+        self.mesh_deltas = {}
+        self.material_snapshots = {}
+        self.material_parameters = {}
+        self.material_textures = {}
+        self.material_sent = {}
+        self.material_debounce = linkutils.Debouncer()
 
     def __enter__(self):
         return self
@@ -1655,6 +2320,7 @@ class LinkService():
                 self.ping_timer = PING_INTERVAL_S
                 self.remote_is_local = True if self.client_ip == "127.0.0.1" else False
                 utils.log_info(f"connecting with data link server on {host}:{port}")
+                self.start_io_thread()
                 self.send_hello()
                 self.connecting.emit()
                 self.changed.emit()
@@ -1686,14 +2352,45 @@ class LinkService():
             "Local": self.remote_is_local,
             "FPS": bpy.context.scene.render.fps,
         }
+        if self.is_remote() and prefs.datalink_compression != "NONE":
+            json_data["Compression"] = ["zlib"]
+        if prefs.datalink_delta_frames:
+            json_data["DeltaFrames"] = True
+        json_data["PoseEncodings"] = ["LOSSLESS", "COMPACT"]
+        json_data["FrameBatch"] = True
+        json_data["CompactSync"] = True
+        json_data["MeshDelta"] = True
+        json_data["MotionCurves"] = True
+        json_data["MaterialDiff"] = True
+        if prefs.datalink_file_cache:
+            json_data["FileCache"] = True
         self.link_data.link_fps = bpy.context.scene.render.fps
         utils.log_info(f"Send Hello: {self.local_path}")
         self.send(OpCodes.HELLO, encode_from_json(json_data))
 
+    def negotiate_compression(self, remote_codecs):
+        """Compress messages only if both ends offered zlib and this is a remote session."""
+        prefs = vars.prefs()
+        compression = None
+        if self.is_remote() and prefs.datalink_compression != "NONE" and "zlib" in remote_codecs:
+            level = COMPRESSION_LEVELS[prefs.datalink_compression]
+            compression = linkutils.Compression(level, linkutils.COMPRESS_THRESHOLD)
+            utils.log_info(f"DataLink compression: zlib level {level}")
+        self.set_compression(compression)
+
+    def set_compression(self, compression):
+        self.compression = compression
+        if self.reader:
+            self.reader.compression = compression
+        if self.io_thread:
+            self.io_thread.reader.compression = compression
+
     def stop_client(self):
         link_props = vars.link_props()
 
         try:
+            self.stop_io_thread()
+            self.set_compression(None)
             if self.client_sock:
                 utils.log_info(f"Closing Client Socket")
                 try:
@@ -1701,6 +2398,10 @@ class LinkService():
                     self.client_sock.close()
                 except Exception as e:
                     utils.log_error("Closing Client Socket failed!", e)
+            if self.reader:
+                self.reader.close()
+                self.reader = None
+            self.clear_held_messages()
             self.is_connected = False
             self.is_connecting = False
             if link_props:
@@ -1726,65 +2427,139 @@ class LinkService():
         else:
             return False
 
+    def start_io_thread(self):
+        self.stop_io_thread()
+        if USE_IO_THREAD and self.client_sock:
+            self.io_thread = linkutils.LinkIOThread(self.client_sock, self.open_remote_file,
+                                                    max_inbound=MAX_INBOUND_QUEUE,
+                                                    max_outbound=MAX_OUTBOUND_QUEUE)
+            self.io_thread.reader.compression = self.compression
+            self.io_thread.reader.telemetry = self.telemetry
+            self.io_thread.start()
+            utils.log_info(f"DataLink I/O thread started")
+
+    def stop_io_thread(self, flush=True):
+        if self.io_thread:
+            io_thread = self.io_thread
+            self.io_thread = None
+            io_thread.stop(flush=flush, timeout=SOCKET_TIMEOUT)
+            utils.log_info(f"DataLink I/O thread stopped")
+
+    def open_remote_file(self, remote_id):
+        """Opens the sink for an incoming FILE, which extracts the tar into the imports folder as it arrives.
+           Called from the I/O thread, so only uses the data path cached by check_paths()."""
+        unpack_folder = os.path.join(self.local_path, "imports", remote_id)
+        file_events = self.file_events
+        # files sent against a manifest are hashed here, for the file cache
+        hash_files = remote_id in self.cached_transfers
+
+        def extracted(name, path):
+            file_events.put((remote_id, name, linkutils.hash_file(path) if hash_files else None))
+
+        file_events.put((remote_id, None, None))
+        return linkutils.TarExtractor(unpack_folder, extracted)
+
+    def update_remote_transfers(self):
+        """Publishes the files extracted so far from incoming FILE transfers."""
+        while True:
+            try:
+                remote_id, name, hash = self.file_events.get_nowait()
+            except queue.Empty:
+                return
+            transfer = self.get_remote_transfer(remote_id)
+            if name:
+                transfer["files"].append(name)
+                if hash:
+                    transfer["hashes"][name] = hash
+
+    def get_remote_transfer(self, remote_id):
+        return self.remote_transfers.setdefault(remote_id, { "files": [], "hashes": {}, "manifest": None })
+
+    def get_reader(self) -> linkutils.MessageReader:
+        if not self.reader or self.reader.sock is not self.client_sock:
+            if self.reader:
+                self.reader.close()
+            self.reader = linkutils.MessageReader(self.client_sock, self.open_remote_file)
+            self.reader.compression = self.compression
+            self.reader.telemetry = self.telemetry
+        return self.reader
+
+    def next_message(self, deadline):
+        """Returns the next complete (op_code, data) message, or None if there isn't one (yet)."""
+        return self.read_message(deadline)
+
+    def read_message(self, deadline, wait=False):
+        if self.io_thread:
+            try:
+                if wait:
+                    message = self.io_thread.inbound.get(timeout=max(0.001, deadline - time.perf_counter()))
+                else:
+                    message = self.io_thread.inbound.get_nowait()
+            except queue.Empty:
+                return None
+            if message == linkutils.LinkIOThread.LOST:
+                if isinstance(self.io_thread.error, ConnectionResetError):
+                    utils.log_always("Socket closed by client")
+                else:
+                    utils.log_error("Client socket I/O failed!", self.io_thread.error)
+                self.client_lost()
+                return None
+            op_code, data, self.message_time = message
+            if self.recorder:
+                self.recorder.record(linkutils.SESSION_IN, op_code, data)
+            return op_code, data
+        else:
+            reader = self.get_reader()
+            try:
+                message = reader.read(deadline)
+            except ConnectionResetError:
+                utils.log_always("Socket closed by client")
+                self.client_lost()
+                return None
+            except Exception as e:
+                utils.log_error("Client socket recv failed!", e)
+                self.client_lost()
+                return None
+            if not message:
+                # any partially received message continues on the next timer tick
+                self.is_data = reader.is_partial()
+                if wait:
+                    time.sleep(0.005)
+            else:
+                self.message_time = time.perf_counter()
+                if self.recorder:
+                    self.recorder.record(linkutils.SESSION_IN, message[0], message[1])
+            return message
+
+    def has_next_message(self):
+        if self.io_thread:
+            return not self.io_thread.inbound.empty()
+        try:
+            return self.get_reader().has_data()
+        except Exception as e:
+            utils.log_error("Client socket recv:select (reselect) failed!", e)
+            self.client_lost()
+            return False
+
     def recv(self):
         prefs = vars.prefs()
 
         self.is_data = False
         self.is_import = False
+        self.update_remote_transfers()
         if self.has_client_sock():
-            try:
-                r,w,x = select.select(self.client_sockets, self.empty_sockets, self.empty_sockets, 0)
-            except Exception as e:
-                utils.log_error("Client socket recv:select failed!", e)
-                self.client_lost()
-                return
+            deadline = time.perf_counter() + RECV_TIME_BUDGET
             count = 0
-            while r:
-                op_code = None
-                try:
-                    header = self.client_sock.recv(8)
-                    if header == 0:
-                        utils.log_always("Socket closed by client")
-                        self.client_lost()
-                        return
-                except Exception as e:
-                    utils.log_error("Client socket recv:recv header failed!", e)
-                    self.client_lost()
+            while True:
+                message = self.next_message(deadline)
+                if not message:
                     return
-                if header and len(header) == 8:
-                    op_code, size = struct.unpack("!II", header)
-                    data = None
-                    if size > 0:
-                        data = bytearray()
-                        while size > 0:
-                            chunk_size = min(size, MAX_CHUNK_SIZE)
-                            try:
-                                chunk = self.client_sock.recv(chunk_size)
-                            except Exception as e:
-                                utils.log_error("Client socket recv:recv chunk failed!", e)
-                                self.client_lost()
-                                return
-                            data.extend(chunk)
-                            size -= len(chunk)
-                    if op_code == OpCodes.FILE:
-                        remote_id = data.decode(encoding="utf-8")
-                        chunk = self.client_sock.recv(4)
-                        size = struct.unpack("!I", chunk)[0]
-                        tar_file_path = get_remote_tar_file_path(remote_id)
-                        with open(tar_file_path, 'wb') as file:
-                            while size > 0:
-                                chunk_size = min(size, MAX_CHUNK_SIZE)
-                                try:
-                                    chunk = self.client_sock.recv(chunk_size)
-                                    file.write(chunk)
-                                except Exception as e:
-                                    utils.log_error("Client socket recv:recv file chunk failed!", e)
-                                    self.client_lost()
-                                    return
-                                size -= len(chunk)
-                    self.parse(op_code, data)
-                    self.received.emit(op_code, data)
-                    count += 1
+                op_code, data = message
+                apply_time = time.perf_counter()
+                self.parse(op_code, data)
+                self.count_applied(op_code, apply_time)
+                self.received.emit(op_code, data)
+                count += 1
                 self.is_data = False
                 # parse may have received a disconnect notice
                 if not self.has_client_sock():
@@ -1805,16 +2580,13 @@ class LinkService():
                     self.is_data = False
                     self.is_import = True
                     return
-                try:
-                    r,w,x = select.select(self.client_sockets, self.empty_sockets, self.empty_sockets, 0)
-                except Exception as e:
-                    utils.log_error("Client socket recv:select (reselect) failed!", e)
-                    self.client_lost()
+                if not self.has_next_message():
+                    return
+                self.is_data = True
+                if count >= MAX_RECEIVE or op_code == OpCodes.NOTIFY or op_code == OpCodes.INVALID:
+                    return
+                if time.perf_counter() > deadline:
                     return
-                if r:
-                    self.is_data = True
-                    if count >= MAX_RECEIVE or op_code == OpCodes.NOTIFY or op_code == OpCodes.INVALID:
-                        return
 
     def accept(self):
         link_props = vars.link_props()
@@ -1838,6 +2610,7 @@ class LinkService():
                 self.keepalive_timer = KEEPALIVE_TIMEOUT_S
                 self.ping_timer = PING_INTERVAL_S
                 utils.log_info(f"Incoming connection received from: {address[0]}:{address[1]}")
+                self.start_io_thread()
                 self.send_hello()
                 self.accepted.emit(self.client_ip, self.client_port)
                 self.changed.emit()
@@ -1861,6 +2634,14 @@ class LinkService():
                 self.link_data.remote_version = self.remote_version
                 self.link_data.remote_path = self.remote_path
                 self.link_data.remote_exe = self.remote_exe
+                self.negotiate_compression(json_data.get("Compression", []))
+                self.remote_delta_frames = json_data.get("DeltaFrames", False)
+                self.remote_pose_encodings = json_data.get("PoseEncodings", ["LOSSLESS"])
+                self.remote_file_cache = json_data.get("FileCache", False)
+                self.remote_frame_batch = json_data.get("FrameBatch", False)
+                self.remote_compact_sync = json_data.get("CompactSync", False)
+                self.remote_mesh_delta = json_data.get("MeshDelta", False)
+                self.remote_material_diff = json_data.get("MaterialDiff", False)
                 if self.compatible_plugin(self.plugin_version):
                     self.service_initialize()
                     link_props.remote_app = self.remote_app
@@ -1911,6 +2692,12 @@ class LinkService():
         elif op_code == OpCodes.FILE:
             self.receive_remote_file(data)
 
+        elif op_code == OpCodes.FILE_MANIFEST:
+            self.receive_file_manifest(data)
+
+        elif op_code == OpCodes.FILE_REQUEST:
+            self.receive_file_request(data)
+
         elif op_code == OpCodes.TEMPLATE:
             self.receive_actor_templates(data)
 
@@ -1920,6 +2707,9 @@ class LinkService():
         elif op_code == OpCodes.POSE_FRAME:
             self.receive_pose_frame(data)
 
+        elif op_code == OpCodes.POSE_FRAME_COMPACT:
+            self.receive_pose_frame(data, compact=True)
+
         elif op_code == OpCodes.MORPH:
             self.receive_morph(data)
 
@@ -1929,6 +2719,15 @@ class LinkService():
         elif op_code == OpCodes.MESH:
             self.receive_mesh_modify(data)
 
+        elif op_code == OpCodes.MESH_DELTA:
+            self.receive_mesh_delta(data)
+
+        elif op_code == OpCodes.MESH_DELTA_ACK:
+            self.receive_mesh_delta_ack(data)
+
+        elif op_code == OpCodes.MATERIALS_DIFF:
+            self.receive_material_diff(data)
+
         elif op_code == OpCodes.CHARACTER:
             self.receive_actor_import(data)
 
@@ -1944,6 +2743,9 @@ class LinkService():
         elif op_code == OpCodes.MOTION:
             self.receive_motion_import(data)
 
+        elif op_code == OpCodes.MOTION_CURVES:
+            self.receive_motion_curves(data)
+
         elif op_code == OpCodes.CHARACTER_UPDATE:
             self.receive_actor_update(data)
 
@@ -1959,6 +2761,15 @@ class LinkService():
         elif op_code == OpCodes.SEQUENCE_FRAME:
             self.receive_sequence_frame(data)
 
+        elif op_code == OpCodes.SEQUENCE_DELTA:
+            self.receive_sequence_frame(data, delta=True)
+
+        elif op_code == OpCodes.SEQUENCE_COMPACT:
+            self.receive_sequence_frame(data, compact=True)
+
+        elif op_code == OpCodes.SEQUENCE_FRAMES:
+            self.receive_sequence_frames(data)
+
         elif op_code == OpCodes.SEQUENCE_END:
             self.receive_sequence_end(data)
 
@@ -1971,6 +2782,9 @@ class LinkService():
         elif op_code == OpCodes.CAMERA_SYNC:
             self.receive_camera_sync(data)
 
+        elif op_code == OpCodes.CAMERA_SYNC_COMPACT:
+            self.receive_camera_sync(data, compact=True)
+
         elif op_code == OpCodes.FRAME_SYNC:
             self.receive_frame_sync(data)
 
@@ -2002,6 +2816,7 @@ class LinkService():
 
     def shutdown(self):
         self.send(OpCodes.DISCONNECT)
+        self.stop_io_thread()
 
     def service_disconnect(self):
         try:
@@ -2079,6 +2894,7 @@ class LinkService():
             delta_time = current_time - self.time
             self.time = current_time
             if delta_time > 0:
+                self.telemetry.loop.add(delta_time)
                 rate = 1.0 / delta_time
                 self.loop_rate = self.loop_rate * 0.75 + rate * 0.25
                 #if self.loop_count % 100 == 0:
@@ -2106,6 +2922,9 @@ class LinkService():
                     return None
 
                 self.check_fps()
+                self.update_file_request()
+                self.update_view_sync()
+                self.update_material_sync()
 
             elif self.is_listening:
                 self.keepalive_timer -= delta_time
@@ -2121,9 +2940,12 @@ class LinkService():
             # receive client data
             self.recv()
 
-            # run anything in sequence
-            for i in range(0, self.sequence_send_count):
-                self.sequence.emit()
+            # replay any recorded session messages that are due
+            if self.replay_log:
+                self.replay_step()
+
+            # run anything in sequence, as far as the flow control window allows
+            self.run_sequence()
 
             if self.is_import:
                 return 0.5
@@ -2136,17 +2958,149 @@ class LinkService():
             return TIMER_INTERVAL
 
 
+    def start_recording(self):
+        """Starts recording all messages received and sent to captures/session_<time>.bin"""
+        self.stop_recording()
+        folder = os.path.join(get_local_data_path() or get_datalink_temp_local_folder(), "captures")
+        file_path = os.path.join(folder, f"session_{int(time.time())}.bin")
+        try:
+            self.recorder = linkutils.SessionRecorder(file_path)
+            utils.log_info(f"Recording DataLink session: {file_path}")
+        except Exception as e:
+            utils.log_error(f"Unable to record DataLink session: {file_path}", e)
+            self.recorder = None
+            file_path = None
+        self.changed.emit()
+        return file_path
+
+    def stop_recording(self):
+        if self.recorder:
+            utils.log_info(f"DataLink session recorded: {self.recorder.file_path} ({self.recorder.count} messages)")
+            self.recorder.close()
+            self.recorder = None
+            self.changed.emit()
+
+    def is_recording(self):
+        return self.recorder is not None
+
+    def is_replaying(self):
+        return self.replay_log is not None
+
+    def replay_session(self, file_path, speed="ORIGINAL", start_frame=None):
+        """Feeds the messages received in a recorded session back through parse,
+           at the original timing or as fast as possible, optionally starting from a (Blender) frame."""
+        self.stop_replay()
+        try:
+            self.replay_log = linkutils.SessionLog(file_path)
+        except Exception as e:
+            utils.log_error(f"Unable to replay DataLink session: {file_path}", e)
+            self.replay_log = None
+            return False
+        self.replay_speed = speed
+        self.replay_index = 0
+        self.replay_from = 0
+        self.replay_start = time.perf_counter()
+        if start_frame is not None:
+            index = self.replay_log.find_frame(BFA(start_frame))
+            if index is not None:
+                self.replay_from = index
+                self.replay_start -= self.replay_log.message(index)[0]
+        utils.log_info(f"Replaying DataLink session: {file_path} ({len(self.replay_log)} messages)")
+        update_link_status(f"Replaying Session")
+        self.start_timer()
+        self.changed.emit()
+        return True
+
+    def stop_replay(self):
+        if self.replay_log:
+            self.replay_log.close()
+            self.replay_log = None
+            update_link_status(f"Replay Finished")
+            if not (self.is_connected or self.is_connecting or self.is_listening):
+                self.stop_timer()
+            self.changed.emit()
+
+    def replay_step(self):
+        """Parses the replayed messages that are due, within the receive time budget."""
+        prefs = vars.prefs()
+        log = self.replay_log
+        start_time = time.perf_counter()
+        deadline = start_time + RECV_TIME_BUDGET
+        elapsed = start_time - self.replay_start
+        self.is_data = True
+        while self.replay_index < len(log):
+            t, direction, op_code, payload = log.message(self.replay_index)
+            if direction != linkutils.SESSION_IN or op_code in REPLAY_SKIP_OP_CODES:
+                self.replay_index += 1
+                continue
+            if self.replay_index < self.replay_from and op_code in FRAME_OP_CODES:
+                # skipped frames still have to go through the delta decoder
+                if op_code == OpCodes.SEQUENCE_DELTA and self.delta_decoder:
+                    self.delta_decoder.decode(payload)
+                self.replay_index += 1
+                continue
+            if self.replay_speed == "ORIGINAL" and t > elapsed:
+                return
+            self.replay_index += 1
+            payload = bytes(payload) if payload is not None else None
+            self.message_time = time.perf_counter()
+            apply_time = self.message_time
+            self.parse(op_code, payload)
+            self.count_applied(op_code, apply_time)
+            self.received.emit(op_code, payload)
+            # previewing every frame: one frame per timer loop
+            if op_code in SEQUENCE_FRAME_OP_CODES and (prefs.datalink_frame_sync or not LINK_DATA.set_keyframes):
+                return
+            if time.perf_counter() > deadline:
+                return
+        self.stop_replay()
+
+    def export_telemetry(self):
+        folder = os.path.join(get_local_data_path() or get_datalink_temp_local_folder(), "Telemetry")
+        info = {
+            "version": vars.VERSION_STRING,
+            "blender": bpy.app.version_string,
+            "remote_app": self.remote_app,
+            "remote_version": self.remote_version,
+            "plugin_version": self.plugin_version,
+            "remote": not self.remote_is_local,
+            "compression": self.compression.level if self.compression else 0,
+        }
+        try:
+            file_path = self.telemetry.export(folder, info)
+            utils.log_info(f"DataLink telemetry exported: {file_path}")
+            return file_path
+        except Exception as e:
+            utils.log_error("Unable to export DataLink telemetry!", e)
+            return None
+
+    def count_applied(self, op_code, apply_time):
+        now = time.perf_counter()
+        self.telemetry.count_applied(op_code, now - apply_time)
+        if op_code in FRAME_OP_CODES:
+            self.telemetry.arrival.add(now - self.message_time)
+
     def send(self, op_code, binary_data = None):
+        if self.file_request and op_code not in UNHELD_OP_CODES:
+            # sent after the files, so the remote receives them in order
+            self.held_messages.append(("MESSAGE", op_code, bytes(binary_data) if binary_data else None))
+            return
+        self.send_message(op_code, binary_data)
+
+    def send_message(self, op_code, binary_data = None):
         try:
+            # replies to replayed messages go nowhere
+            if self.replay_log:
+                return
             if self.client_sock and (self.is_connected or self.is_connecting):
-                data_length = len(binary_data) if binary_data else 0
-                header = struct.pack("!II", op_code, data_length)
-                data = bytearray()
-                data.extend(header)
-                if binary_data:
-                    data.extend(binary_data)
+                self.telemetry.count_sent(op_code, linkutils.HEADER.size + (len(binary_data) if binary_data else 0))
+                if self.recorder:
+                    self.recorder.record(linkutils.SESSION_OUT, op_code, binary_data)
                 try:
-                    self.client_sock.sendall(data)
+                    if self.io_thread:
+                        self.io_thread.send(op_code, binary_data, self.compression)
+                    else:
+                        self.client_sock.sendall(linkutils.frame_message(op_code, binary_data, self.compression))
                 except Exception as e:
                     utils.log_error("Client socket sendall failed!")
                     self.client_lost()
@@ -2156,33 +3110,39 @@ class LinkService():
         except Exception as e:
             utils.log_error("LinkService send failed!", e)
 
-    def send_file(self, tar_id, tar_file):
+    def send_file(self, remote_id, source, remove=False):
+        """Sends a FileSource or TarStream as a FILE message.
+           If remove, the source is deleted once it has been sent."""
+        if self.file_request:
+            self.held_messages.append(("FILE", remote_id, source, remove))
+            return
+        self.send_file_message(remote_id, source, remove)
+
+    def send_file_message(self, remote_id, source, remove=False):
         try:
-            utils.log_info(f"Sending Remote files: {tar_file}")
+            utils.log_info(f"Sending Remote files: {remote_id} ({source.size} bytes)")
             if self.client_sock and (self.is_connected or self.is_connecting):
-                file_size = os.path.getsize(tar_file)
-                id_data = pack_string(tar_id)
-                data = bytearray()
-                data.extend(struct.pack("!I", OpCodes.FILE))
-                data.extend(id_data)
-                data.extend(struct.pack("!I", file_size))
-                self.client_sock.send(data)
-                remaining_size = file_size
-                with open(tar_file, 'rb') as file:
-                    while remaining_size > 0:
-                        chunk_size = min(MAX_CHUNK_SIZE, remaining_size)
-                        byte_array = bytearray(file.read(chunk_size))
-                        remaining_size -= MAX_CHUNK_SIZE
-                        self.client_sock.send(byte_array)
+                self.telemetry.count_sent(OpCodes.FILE, source.size)
+                if self.recorder:
+                    # only the remote id, not the files
+                    self.recorder.record(linkutils.SESSION_OUT, OpCodes.FILE, pack_string(remote_id))
+                if self.io_thread:
+                    # the I/O thread removes the source once it has been sent
+                    self.io_thread.send_file(remote_id, source, remove=remove, compression=self.compression)
+                    remove = False
+                else:
+                    linkutils.send_file_message(self.client_sock, remote_id, source, self.compression)
                 self.ping_timer = PING_INTERVAL_S
                 self.sent.emit()
         except Exception as e:
             utils.log_error("LinkService send failed!", e)
+        if remove:
+            utils.log_info(f"Cleaning up remote export files: {remote_id}")
+            source.remove()
 
     def start_sequence(self, func=None):
         self.is_sequence = True
-        self.sequence_send_count = 5
-        self.sequence_send_rate = 5.0
+        self.flow.reset()
         if func:
             self.sequence.connect(func)
         else:
@@ -2192,15 +3152,18 @@ class LinkService():
         self.is_sequence = False
         self.sequence.disconnect()
 
-    def update_sequence(self, count, delta_frames):
-        if count is None:
-            self.sequence_send_rate = 5.0
-            self.sequence_send_count = 5
-        else:
-            self.sequence_send_rate = count
-            self.sequence_send_count = count
-            if self.loop_count % 30 == 0:
-                utils.log_info(f"send_count: {self.sequence_send_count} delta_frames: {delta_frames}")
+    def run_sequence(self):
+        prefs = vars.prefs()
+        if not self.sequence.callbacks:
+            return
+        if not prefs.datalink_match_client_rate:
+            for i in range(0, SEQUENCE_SEND_COUNT):
+                self.sequence.emit()
+            return
+        count = 0
+        while self.is_sequence and count < self.flow.window and self.flow.can_send():
+            self.sequence.emit()
+            count += 1
 
 
     def on_connected(self):
@@ -2210,8 +3173,10 @@ class LinkService():
         notify_json = { "message": message }
         self.send(OpCodes.NOTIFY, encode_from_json(notify_json))
 
-    def send_invalid(self, message):
+    def send_invalid(self, message, delta_id=None):
         notify_json = { "message": message }
+        if delta_id is not None:
+            notify_json["delta_id"] = delta_id
         self.send(OpCodes.INVALID, encode_from_json(notify_json))
 
     def receive_notify(self, data):
@@ -2221,6 +3186,9 @@ class LinkService():
     def receive_invalid(self, data):
         invalid_json = decode_to_json(data)
         update_link_status(invalid_json["message"])
+        if "delta_id" in invalid_json:
+            self.resend_mesh_delta(invalid_json["delta_id"])
+            return
         self.abort_sequence()
 
     def receive_save(self, data):
@@ -2228,15 +3196,132 @@ class LinkService():
             utils.log_info("Saving Mainfile")
             bpy.ops.wm.save_mainfile()
 
-    def receive_remote_file(self, data: bytearray):
-        remote_id = data.decode(encoding="utf-8")
-        tar_file_path = get_remote_tar_file_path(remote_id)
-        parent_path = os.path.dirname(tar_file_path)
-        unpack_folder = utils.make_sub_folder(parent_path, remote_id)
-        utils.log_info(f"Receive Remote Files: {remote_id} / {unpack_folder}")
-        shutil.unpack_archive(tar_file_path, unpack_folder, "tar")
-        os.remove(tar_file_path)
-        #utils.show_system_file_browser(unpack_folder)
+    def receive_remote_file(self, data):
+        # the files have already been extracted as they arrived
+        remote_id = str(data, "utf-8")
+        self.update_remote_transfers()
+        transfer = self.get_remote_transfer(remote_id)
+        del self.remote_transfers[remote_id]
+        self.cached_transfers.discard(remote_id)
+        unpack_folder = get_unpacked_tar_file_folder(remote_id)
+        utils.log_info(f"Receive Remote Files: {remote_id} / {unpack_folder} ({len(transfer['files'])} files)")
+        if transfer["manifest"]:
+            # keep the newly received files for the next time they are sent,
+            # using the hashes from the I/O thread
+            file_cache = self.get_file_cache()
+            for name, hash in transfer["hashes"].items():
+                file_cache.add(os.path.join(unpack_folder, name), hash)
+
+    def receive_file_manifest(self, data):
+        """Links the files already in the cache into the import folder and requests the rest."""
+        json_data = decode_to_json(data)
+        remote_id = json_data["remote_id"]
+        manifest = json_data["files"]
+        file_cache = self.get_file_cache()
+        unpack_folder = get_unpacked_tar_file_folder(remote_id)
+        missing = set(file_cache.missing(manifest))
+        cached_size = 0
+        for entry in manifest:
+            if entry["hash"] not in missing:
+                path = linkutils.get_safe_path(unpack_folder, entry["name"])
+                if path and file_cache.link_to(entry["hash"], path):
+                    cached_size += entry["size"]
+                else:
+                    missing.add(entry["hash"])
+        self.update_remote_transfers()
+        self.get_remote_transfer(remote_id)["manifest"] = manifest
+        self.cached_transfers.add(remote_id)
+        utils.log_info(f"Receive File Manifest: {remote_id} {len(manifest)} files, "
+                       f"{len(missing)} missing, {cached_size / 1048576:.1f} MB from cache")
+        self.send(OpCodes.FILE_REQUEST, encode_from_json({
+            "remote_id": remote_id,
+            "missing": sorted(missing),
+        }))
+
+    def request_remote_files(self, remote_id, export_folder):
+        """Sends the export folder once the remote has said which of its files it needs.
+           Messages sent meanwhile are held back until the files have gone."""
+        self.held_messages.append(("REQUEST", remote_id, export_folder))
+        self.send_held_messages()
+
+    def send_file_manifest(self, remote_id, export_folder):
+        manifest = linkutils.get_folder_manifest(export_folder)
+        self.send_message(OpCodes.FILE_MANIFEST, encode_from_json({
+            "remote_id": remote_id,
+            "files": manifest,
+        }))
+        self.file_request = {
+            "remote_id": remote_id,
+            "folder": export_folder,
+            "manifest": manifest,
+            "deadline": time.perf_counter() + FILE_REQUEST_TIMEOUT,
+        }
+
+    def receive_file_request(self, data):
+        json_data = decode_to_json(data)
+        remote_id = json_data["remote_id"]
+        if not self.file_request or self.file_request["remote_id"] != remote_id:
+            utils.log_error(f"Unexpected File Request: {remote_id}")
+            return
+        manifest = self.file_request["manifest"]
+        missing = set(json_data.get("missing", []))
+        include = set(entry["name"] for entry in manifest if entry["hash"] in missing)
+        cached_size = sum(entry["size"] for entry in manifest if entry["name"] not in include)
+        utils.log_info(f"File Request: {remote_id} {len(include)} of {len(manifest)} files, "
+                       f"{cached_size / 1048576:.1f} MB already cached remotely")
+        self.finish_file_request(include)
+
+    def update_file_request(self):
+        if self.file_request and time.perf_counter() > self.file_request["deadline"]:
+            utils.log_info(f"No File Request for: {self.file_request['remote_id']}, sending all files")
+            self.finish_file_request(None)
+
+    def finish_file_request(self, include):
+        """Sends the requested files (or all of them if include is None) and then the held messages."""
+        file_request = self.file_request
+        self.file_request = None
+        tar_stream = linkutils.TarStream(file_request["folder"], include)
+        self.send_file_message(file_request["remote_id"], tar_stream, remove=True)
+        update_link_status("Files Sent")
+        self.send_held_messages()
+
+    def send_held_messages(self):
+        """Sends the held messages in order, up to the next file request."""
+        while self.held_messages and not self.file_request:
+            kind, *args = self.held_messages.pop(0)
+            if kind == "REQUEST":
+                self.send_file_manifest(*args)
+            elif kind == "FILE":
+                self.send_file_message(*args)
+            else:
+                self.send_message(*args)
+
+    def clear_held_messages(self):
+        """Drops the pending file request and held messages, removing their export files."""
+        if self.file_request:
+            linkutils.TarStream(self.file_request["folder"]).remove()
+            self.file_request = None
+        for kind, *args in self.held_messages:
+            if kind == "REQUEST":
+                linkutils.TarStream(args[1]).remove()
+            elif kind == "FILE" and args[2]:
+                args[1].remove()
+        self.held_messages.clear()
+
+    def get_file_cache(self) -> linkutils.FileCache:
+        prefs = vars.prefs()
+        cache_folder = os.path.join(get_datalink_temp_local_folder(), "file_cache")
+        max_size = prefs.datalink_file_cache_size * 1048576
+        if not self.file_cache or self.file_cache.folder != cache_folder:
+            self.file_cache = linkutils.FileCache(cache_folder, max_size)
+        elif self.file_cache.max_size != max_size:
+            self.file_cache.max_size = max_size
+            self.file_cache.evict()
+        return self.file_cache
+
+    def use_file_cache(self):
+        prefs = vars.prefs()
+        return prefs.datalink_file_cache and self.remote_file_cache
 
     def receive_debug(self, data):
         debug_json = None
@@ -2271,26 +3356,18 @@ class LinkService():
         link_service: LinkService = LINK_SERVICE
         remote_id = ""
         if link_service.is_remote():
-            parent_folder = os.path.dirname(export_folder)
             remote_id = str(time.time_ns())
-            cwd = os.getcwd()
-            tar_file_name = remote_id
-            os.chdir(parent_folder)
-            utils.log_info(f"Packing Remote files: {tar_file_name}")
-            update_link_status("Packing Remote files")
-            shutil.make_archive(tar_file_name, "tar", export_folder)
-            os.chdir(cwd)
-            tar_file_path = os.path.join(parent_folder, f"{tar_file_name}.tar")
-            if os.path.exists(tar_file_path):
-                update_link_status("Sending Remote files")
-                link_service.send_file(remote_id, tar_file_path)
-                update_link_status("Files Sent")
-            if os.path.exists(tar_file_path):
-                utils.log_info(f"Cleaning up remote export package: {tar_file_path}")
-                os.remove(tar_file_path)
             if os.path.exists(export_folder):
-                utils.log_info(f"Cleaning up remote export folder: {export_folder}")
-                shutil.rmtree(export_folder)
+                utils.log_info(f"Streaming Remote files: {remote_id}")
+                update_link_status("Sending Remote files")
+                # the tar is generated as it is sent and the export folder removed afterwards
+                if link_service.use_file_cache():
+                    # sent once the remote has said which files it already has
+                    link_service.request_remote_files(remote_id, export_folder)
+                else:
+                    tar_stream = linkutils.TarStream(export_folder)
+                    link_service.send_file(remote_id, tar_stream, remove=True)
+                    update_link_status("Files Sent")
         return remote_id
 
     def get_actor_from_object(self, obj):
@@ -2409,8 +3486,21 @@ class LinkService():
         utils.restore_mode_selection_state(state)
         return count
 
-    def send_morph(self):
-        actor: LinkActor = self.get_active_actor()
+    def send_morph(self, actor: LinkActor=None):
+        if not actor:
+            actor = self.get_active_actor()
+        if actor and actor.get_chr_cache() and actor.get_chr_cache().object_cache:
+            obj = actor.get_chr_cache().object_cache[0].object
+            if self.send_mesh_delta(obj, {
+                "name": actor.name,
+                "type": actor.get_type(),
+                "link_id": actor.get_link_id(),
+                "object_name": obj.name,
+                "mesh_name": obj.data.name,
+                "morph": True,
+            }, lambda obj: self.send_morph(self.get_actor_from_object(obj))):
+                update_link_status(f"Sent Morph Delta: {actor.name}")
+                return True
         if actor:
             self.send_notify(f"Blender Exporting: {actor.name}...")
             # Determine export path
@@ -2442,10 +3532,131 @@ class LinkService():
             utils.restore_mode_selection_state(state)
             if is_remote or os.path.exists(export_path):
                 self.send(OpCodes.MORPH, export_data)
+                if actor.get_chr_cache().object_cache:
+                    self.store_mesh_baseline(actor.get_chr_cache().object_cache[0].object)
                 update_link_status(f"Sent: {actor.name}")
                 return True
         return False
 
+    def store_mesh_baseline(self, obj):
+        """Remembers the mesh as last sent or received, so the next send can be a mesh delta."""
+        if obj and obj.type == "MESH":
+            self.mesh_baselines[obj.name] = get_mesh_export_data(obj)
+            self.mesh_deltas.pop(obj.name, None)
+
+    def send_mesh_delta(self, obj, info: dict, resend):
+        """Sends just the vertex positions of the mesh (MESH_DELTA), if the remote supports it
+           and has the same mesh topology, i.e. the mesh has been sent or received whole before.
+           If the remote can't apply the delta, resend(obj) sends the mesh as a file instead.
+           Returns False if the mesh must be sent as a file."""
+        if not self.remote_mesh_delta or not obj or obj.type != "MESH":
+            return False
+        baseline = self.mesh_baselines.get(obj.name)
+        if not baseline:
+            return False
+        topology, positions = get_mesh_export_data(obj)
+        base_topology, base_positions = baseline
+        if topology != base_topology:
+            utils.log_info(f"Mesh topology changed: {obj.name}, sending full mesh")
+            return False
+        if obj.name in self.mesh_deltas:
+            # the remote may or may not have applied the last delta yet, so send all the positions
+            base_positions = None
+        self.mesh_delta_id += 1
+        info["topology"] = topology
+        info["delta_id"] = self.mesh_delta_id
+        info.setdefault("shape_key", None)
+        info.setdefault("morph", False)
+        info.setdefault("mesh_modify", False)
+        self.send(OpCodes.MESH_DELTA, linkutils.encode_mesh_delta(info, positions, base_positions))
+        utils.log_info(f"Sent Mesh Delta: {obj.name} {info['mode']} {info['count']} / {len(positions)}")
+        # the baseline is only replaced once the remote has acknowledged the delta
+        self.mesh_deltas[obj.name] = {
+            "delta_id": self.mesh_delta_id,
+            "topology": topology,
+            "positions": positions,
+            "resend": resend,
+        }
+        return True
+
+    def find_mesh_delta(self, delta_id):
+        for name, mesh_delta in self.mesh_deltas.items():
+            if mesh_delta["delta_id"] == delta_id:
+                return name, mesh_delta
+        return None, None
+
+    def receive_mesh_delta_ack(self, data):
+        json_data = decode_to_json(data)
+        name, mesh_delta = self.find_mesh_delta(json_data["delta_id"])
+        if mesh_delta:
+            utils.log_detail(f"Mesh Delta acknowledged: {name}")
+            self.mesh_baselines[name] = (mesh_delta["topology"], mesh_delta["positions"])
+            del self.mesh_deltas[name]
+
+    def resend_mesh_delta(self, delta_id):
+        """The remote couldn't apply a mesh delta: forget the mesh baseline and send the whole mesh."""
+        name, mesh_delta = self.find_mesh_delta(delta_id)
+        if mesh_delta:
+            del self.mesh_deltas[name]
+            self.mesh_baselines.pop(name, None)
+            obj = bpy.data.objects.get(name)
+            if obj:
+                utils.log_info(f"Mesh Delta rejected: {name}, sending full mesh")
+                state = utils.store_mode_selection_state()
+                mesh_delta["resend"](obj)
+                utils.restore_mode_selection_state(state)
+
+    def find_mesh_delta_object(self, info):
+        name = info["name"]
+        link_id = info["link_id"]
+        object_name = info["object_name"]
+        if info.get("mesh_modify"):
+            for obj in bpy.data.objects:
+                if (utils.get_prop(obj, "rl_mesh_modify") and utils.get_prop(obj, "rl_link_id") == link_id and
+                        utils.strip_name(obj.name) == object_name):
+                    return obj
+            return None
+        actor = LinkActor.find_actor(link_id, search_name=name, search_type=info["type"])
+        chr_cache = actor.get_chr_cache() if actor else None
+        if not chr_cache or not chr_cache.object_cache:
+            return None
+        if info.get("morph"):
+            return chr_cache.object_cache[0].object
+        for obj_cache in chr_cache.object_cache:
+            obj = obj_cache.get_object()
+            if obj and obj.type == "MESH" and (obj_cache.source_name == object_name or obj.name == object_name):
+                return obj
+        return None
+
+    def receive_mesh_delta(self, data):
+        info, indices, values = linkutils.decode_mesh_delta(data)
+        object_name = info["object_name"]
+        utils.log_info(f"Receive Mesh Delta: {info['name']} / {object_name} {info['mode']} {info['count']}")
+        delta_id = info.get("delta_id")
+        obj = self.find_mesh_delta_object(info)
+        if not obj or obj.type != "MESH":
+            update_link_status(f"Mesh Delta: {object_name} not found!")
+            self.send_invalid(f"Mesh not found: {object_name}, send the full mesh", delta_id)
+            return
+        topology = get_mesh_topology_hash(obj.data)
+        if len(obj.data.vertices) != info["vertex_count"] or topology != info["topology"]:
+            update_link_status(f"Mesh Delta: {object_name} topology differs!")
+            self.send_invalid(f"Mesh topology differs: {object_name}, send the full mesh", delta_id)
+            return
+        shape_key_name = info.get("shape_key")
+        mss = utils.store_mode_selection_state()
+        utils.object_mode()
+        # as with the OBJ files, the positions are written to the mesh as they are, only converted to Z up
+        positions = get_mesh_positions(obj, shape_key_name)
+        positions = linkutils.apply_mesh_delta(positions, indices, linkutils.obj_to_blender_axes(values))
+        set_mesh_positions(obj, positions, shape_key_name)
+        utils.restore_mode_selection_state(mss)
+        if not shape_key_name:
+            self.store_mesh_baseline(obj)
+        if delta_id is not None:
+            self.send(OpCodes.MESH_DELTA_ACK, encode_from_json({ "delta_id": delta_id }))
+        update_link_status(f"Mesh Updated: {obj.name}")
+
     def obj_export(self, file_path, use_selection=False, use_animation=False, global_scale=100,
                          use_vertex_colors=False, use_vertex_groups=False, apply_modifiers=True,
                          keep_vertex_order=False, use_materials=False):
@@ -2483,28 +3694,8 @@ class LinkService():
         for obj in objects:
             if obj.type == "MESH":
                 if utils.get_prop(obj, "rl_mesh_modify"):
-                    link_id = utils.get_prop(obj, "rl_link_id")
-                    type = utils.get_prop(obj, "rl_type")
-                    name = utils.get_prop(obj, "rl_name")
-                    if link_id:
-                        object_name = utils.strip_name(obj.name)
-                        mesh_name = utils.strip_name(obj.data.name)
-                        export_path = self.get_export_path("Meshes", f"{obj.name}_mesh.obj",
-                                                           reuse_folder=True, reuse_file=True)
-                    utils.set_active_object(obj, deselect_all=True)
-                    self.obj_export(export_path, use_selection=True, use_vertex_colors=False)
-                    export_data = encode_from_json({
-                        "path": export_path,
-                        "actor_name": name,
-                        "object_name": object_name,
-                        "mesh_name": mesh_name,
-                        "type": type,
-                        "morph": False,
-                        "link_id": link_id,
-                    })
-                    self.send(OpCodes.REPLACE_MESH, export_data)
-                    update_link_status(f"Sent Mesh: {obj.name}")
-                    count += 1
+                    if self.send_mesh_modify_object(obj):
+                        count += 1
 
         utils.restore_mode_selection_state(state)
 
@@ -2514,6 +3705,42 @@ class LinkService():
 
         return count
 
+    def send_mesh_modify_object(self, obj):
+        link_id = utils.get_prop(obj, "rl_link_id")
+        type = utils.get_prop(obj, "rl_type")
+        name = utils.get_prop(obj, "rl_name")
+        if not link_id:
+            return False
+        object_name = utils.strip_name(obj.name)
+        mesh_name = utils.strip_name(obj.data.name)
+        if self.send_mesh_delta(obj, {
+            "name": name,
+            "type": type,
+            "link_id": link_id,
+            "object_name": object_name,
+            "mesh_name": mesh_name,
+            "mesh_modify": True,
+        }, self.send_mesh_modify_object):
+            update_link_status(f"Sent Mesh Delta: {obj.name}")
+            return True
+        export_path = self.get_export_path("Meshes", f"{obj.name}_mesh.obj",
+                                           reuse_folder=True, reuse_file=True)
+        utils.set_active_object(obj, deselect_all=True)
+        self.obj_export(export_path, use_selection=True, use_vertex_colors=False)
+        export_data = encode_from_json({
+            "path": export_path,
+            "actor_name": name,
+            "object_name": object_name,
+            "mesh_name": mesh_name,
+            "type": type,
+            "morph": False,
+            "link_id": link_id,
+        })
+        self.send(OpCodes.REPLACE_MESH, export_data)
+        self.store_mesh_baseline(obj)
+        update_link_status(f"Sent Mesh: {obj.name}")
+        return True
+
     def send_replace_mesh_request(self):
         self.send_request("REPLACE_MESH")
 
@@ -2528,42 +3755,58 @@ class LinkService():
         count = 0
         for obj in objects:
             if obj.type == "MESH":
-                actor = self.get_actor_from_object(obj)
-                if actor:
-                    obj_cache = actor.get_chr_cache().get_object_cache(obj)
-                    object_name = obj.name
-                    mesh_name = obj.data.name
-                    if obj_cache:
-                        object_name = obj_cache.source_name
-                        mesh_name = obj_cache.source_name
-                    export_path = self.get_export_path("Meshes", f"{obj.name}_mesh.obj",
-                                                       reuse_folder=True, reuse_file=True)
-                    utils.set_active_object(obj, deselect_all=True)
-                    self.obj_export(export_path, use_selection=True, use_vertex_colors=False)
-                    export_data = encode_from_json({
-                        "path": export_path,
-                        "actor_name": actor.name,
-                        "object_name": object_name,
-                        "mesh_name": mesh_name,
-                        "type": actor.get_type(),
-                        "morph": actor.is_obj(),
-                        "link_id": actor.get_link_id(),
-                    })
-                    self.send(OpCodes.REPLACE_MESH, export_data)
-                    update_link_status(f"Sent Mesh: {actor.name}")
+                if self.send_replace_mesh_object(obj):
                     count += 1
 
         utils.restore_mode_selection_state(state)
 
         return count
 
-    def export_object_material_data(self, context, actor: LinkActor, objects):
+    def send_replace_mesh_object(self, obj):
+        actor = self.get_actor_from_object(obj)
+        if not actor:
+            return False
+        obj_cache = actor.get_chr_cache().get_object_cache(obj)
+        object_name = obj.name
+        mesh_name = obj.data.name
+        if obj_cache:
+            object_name = obj_cache.source_name
+            mesh_name = obj_cache.source_name
+        if self.send_mesh_delta(obj, {
+            "name": actor.name,
+            "type": actor.get_type(),
+            "link_id": actor.get_link_id(),
+            "object_name": object_name,
+            "mesh_name": mesh_name,
+            "morph": actor.is_obj(),
+        }, self.send_replace_mesh_object):
+            update_link_status(f"Sent Mesh Delta: {actor.name}")
+            return True
+        export_path = self.get_export_path("Meshes", f"{obj.name}_mesh.obj",
+                                           reuse_folder=True, reuse_file=True)
+        utils.set_active_object(obj, deselect_all=True)
+        self.obj_export(export_path, use_selection=True, use_vertex_colors=False)
+        export_data = encode_from_json({
+            "path": export_path,
+            "actor_name": actor.name,
+            "object_name": object_name,
+            "mesh_name": mesh_name,
+            "type": actor.get_type(),
+            "morph": actor.is_obj(),
+            "link_id": actor.get_link_id(),
+        })
+        self.send(OpCodes.REPLACE_MESH, export_data)
+        self.store_mesh_baseline(obj)
+        update_link_status(f"Sent Mesh: {actor.name}")
+        return True
+
+    def export_object_material_data(self, context, actor: LinkActor, objects, materials=None):
         prefs = vars.prefs()
         obj: bpy.types.Object
 
         chr_cache = actor.get_chr_cache()
         if chr_cache:
-            if prefs.datalink_send_mode == "ACTIVE":
+            if materials is None and prefs.datalink_send_mode == "ACTIVE":
                 materials = []
                 for obj in objects:
                     idx = obj.active_material_index
@@ -2571,8 +3814,6 @@ class LinkService():
                         mat = obj.material_slots[idx].material
                         if mat:
                             materials.append(mat)
-            else:
-                materials = None
             export_path = self.get_export_path("Materials", f"{actor.name}.json",
                                                reuse_folder=True, reuse_file=True)
             export_dir, json_file = os.path.split(export_path)
@@ -2584,6 +3825,11 @@ class LinkService():
                                  chr_cache.get_import_dir(), export_dir,
                                  False, False, False, False, True,
                                  materials=materials, sync=True, force_bake=True)
+            entries = self.get_material_json_entries(jsonutils.get_character_json(json_data, actor.name),
+                                                     objects, materials)
+            self.store_material_sent(chr_cache, objects, materials)
+            if self.send_material_diff(actor, entries, export_dir):
+                return
             jsonutils.write_json(json_data, export_path)
             export_data = encode_from_json({
                         "path": export_path,
@@ -2592,6 +3838,209 @@ class LinkService():
                         "link_id": actor.get_link_id(),
                     })
             self.send(OpCodes.MATERIALS, export_data)
+            for obj_key, mat_key, mat_json in entries:
+                self.material_snapshots[(actor.get_link_id(), obj_key, mat_key)] = copy.deepcopy(mat_json)
+
+    def get_material_json_entries(self, chr_json, objects, materials=None):
+        """[ (object key, material key, material json) ] of the exported materials of the objects."""
+        entries = []
+        for obj in objects:
+            obj_json = jsonutils.get_object_json(chr_json, obj)
+            obj_key = jsonutils.get_object_json_key(chr_json, obj_json)
+            if not obj_key or obj.type != "MESH":
+                continue
+            for mat in obj.data.materials:
+                if mat and (materials is None or mat in materials):
+                    mat_json = jsonutils.get_material_json(obj_json, mat)
+                    mat_key = jsonutils.get_material_json_key(obj_json, mat_json)
+                    if mat_key:
+                        entries.append((obj_key, mat_key, mat_json))
+        return entries
+
+    def send_material_diff(self, actor: LinkActor, entries, folder=None):
+        """Sends only the material json paths changed since the materials were last sent or received
+           (MATERIALS_DIFF). Returns False if the materials must be sent whole: the remote can't take
+           diffs, the materials haven't been sent yet or their textures have changed."""
+        link_id = actor.get_link_id()
+        if not self.remote_material_diff or not entries:
+            return False
+        for obj_key, mat_key, mat_json in entries:
+            if (link_id, obj_key, mat_key) not in self.material_snapshots:
+                return False
+        materials_data = []
+        snapshots = {}
+        for obj_key, mat_key, mat_json in entries:
+            key = (link_id, obj_key, mat_key)
+            changes = linkutils.diff_json(self.material_snapshots[key], mat_json)
+            if any(linkutils.is_texture_change(change) for change in changes):
+                return False
+            if changes:
+                materials_data.append({
+                    "object": obj_key,
+                    "material": mat_key,
+                    "changes": changes,
+                })
+                snapshots[key] = copy.deepcopy(mat_json)
+        self.material_snapshots.update(snapshots)
+        if materials_data:
+            self.send(OpCodes.MATERIALS_DIFF, encode_from_json({
+                "actor_name": actor.name,
+                "type": actor.get_type(),
+                "link_id": link_id,
+                # texture paths are relative to this
+                "folder": folder or "",
+                "materials": materials_data,
+            }))
+            utils.log_info(f"Sent Material Diff: {actor.name} {len(materials_data)} materials")
+        return True
+
+    def check_material_parameters(self, mat):
+        """Live material sync: queues the material if its parameters or textures have changed."""
+        props = vars.props()
+        mat_cache = props.get_material_cache(mat)
+        values = get_material_parameters(mat_cache)
+        if values is None:
+            return
+        textures = get_material_textures(mat, mat_cache)
+        if self.material_parameters.get(mat.name) != values or self.material_textures.get(mat.name) != textures:
+            self.material_parameters[mat.name] = values
+            self.material_textures[mat.name] = textures
+            self.material_debounce.touch(mat.name)
+
+    def store_material_sent(self, chr_cache, objects, materials=None):
+        """Live material sync: notes the parameters and textures of the materials as sent (or received)."""
+        for obj in objects:
+            if obj.type == "MESH":
+                for mat in obj.data.materials:
+                    if mat and (materials is None or mat in materials):
+                        mat_cache = chr_cache.get_material_cache(mat)
+                        values = get_material_parameters(mat_cache)
+                        if values is not None:
+                            self.material_sent[mat.name] = (values, get_material_textures(mat, mat_cache))
+
+    def send_material_parameters_diff(self, actor: LinkActor, objects, mats):
+        """Live material sync: sends the changed parameters of the materials as a diff of their last
+           sent json, written straight from the material caches, without exporting or baking them.
+           Returns the materials that must be exported whole: their textures have changed,
+           or they haven't been sent yet or can't be sent as a diff."""
+        if not self.remote_material_diff:
+            return mats
+        chr_cache = actor.get_chr_cache()
+        link_id = actor.get_link_id()
+        export_mats = []
+        diff_mats = []
+        entries = []
+        for mat in mats:
+            mat_cache = chr_cache.get_material_cache(mat)
+            values = get_material_parameters(mat_cache)
+            sent = self.material_sent.get(mat.name)
+            if values is None or not sent or get_material_textures(mat, mat_cache) != sent[1]:
+                export_mats.append(mat)
+                continue
+            names = { (jsonutils.safe_name(obj), jsonutils.safe_name(mat))
+                      for obj in objects if mat.name in obj.data.materials }
+            keys = [ key for key in self.material_snapshots
+                     if key[0] == link_id and (jsonutils.safe_name(key[1]), jsonutils.safe_name(key[2])) in names ]
+            if not keys:
+                export_mats.append(mat)
+                continue
+            changed = { name for name, value in values.items() if sent[0].get(name) != value }
+            for key in keys:
+                mat_json = copy.deepcopy(self.material_snapshots[key])
+                write_material_parameters_json(mat_json, mat_cache, changed)
+                entries.append((key[1], key[2], mat_json))
+            diff_mats.append(mat)
+        if entries and not self.send_material_diff(actor, entries):
+            return mats
+        self.store_material_sent(chr_cache, objects, diff_mats)
+        return export_mats
+
+    def update_material_sync(self):
+        """Live material sync: sends the materials changed in the last debounce window."""
+        names = self.material_debounce.due()
+        if not names:
+            return
+        props = vars.props()
+        actor_materials = {}
+        for name in names:
+            mat = bpy.data.materials.get(name)
+            chr_cache = props.get_character_cache(None, mat) if mat else None
+            if chr_cache and chr_cache.link_id:
+                actor_materials.setdefault(chr_cache, []).append(mat)
+        if not actor_materials:
+            return
+        state = utils.store_mode_selection_state()
+        for chr_cache, mats in actor_materials.items():
+            actor = LinkActor(chr_cache)
+            objects = [ obj for obj in actor.get_mesh_objects()
+                        if any(mat.name in obj.data.materials for mat in mats) ]
+            if objects:
+                # only materials with changed textures need exporting (and baking)
+                mats = self.send_material_parameters_diff(actor, objects, mats)
+                if mats:
+                    objects = [ obj for obj in objects if any(mat.name in obj.data.materials for mat in mats) ]
+                    self.export_object_material_data(bpy.context, actor, objects, materials=mats)
+        utils.restore_mode_selection_state(state)
+
+    def receive_material_diff(self, data):
+        json_data = decode_to_json(data)
+        name = json_data["actor_name"]
+        character_type = json_data["type"]
+        link_id = json_data["link_id"]
+        utils.log_info(f"Receive Material Diff: {name} / {link_id}")
+        actor = LinkActor.find_actor(link_id, search_name=name, search_type=character_type)
+        chr_cache = actor.get_chr_cache() if actor else None
+        if not chr_cache:
+            update_link_status(f"Character: {name} not found!")
+            return
+        chr_json = None
+        count = 0
+        for material_data in json_data["materials"]:
+            obj_key = material_data["object"]
+            mat_key = material_data["material"]
+            key = (link_id, obj_key, mat_key)
+            mat_json = self.material_snapshots.get(key)
+            if mat_json is None:
+                # diff from the character's import json
+                if chr_json is None:
+                    chr_json = chr_cache.get_character_json()
+                obj_json = jsonutils.get_object_json(chr_json, obj_key)
+                mat_json = copy.deepcopy(jsonutils.get_material_json(obj_json, mat_key)) or {}
+            mat_json = linkutils.apply_json_changes(mat_json, material_data["changes"])
+            self.material_snapshots[key] = mat_json
+            obj, mat = self.find_actor_material(actor, obj_key, mat_key)
+            if obj and mat and mat_json:
+                self.apply_material_json(chr_cache, obj, mat, mat_json)
+                self.store_material_sent(chr_cache, [obj], [mat])
+                count += 1
+        update_link_status(f"Materials Updated: {name} ({count})")
+
+    def find_actor_material(self, actor: LinkActor, obj_key, mat_key):
+        obj_name = jsonutils.safe_name(obj_key)
+        mat_name = jsonutils.safe_name(mat_key)
+        for obj in actor.get_mesh_objects():
+            if jsonutils.safe_name(obj) == obj_name:
+                for mat in obj.data.materials:
+                    if mat and jsonutils.safe_name(mat) == mat_name:
+                        return obj, mat
+        return None, None
+
+    def apply_material_json(self, chr_cache, obj, mat, mat_json):
+        """Updates the material parameters (not the textures) from the material json."""
+        mat_cache = chr_cache.get_material_cache(mat)
+        if not mat_cache:
+            return
+        shaders.fetch_prop_defaults(obj, mat_cache, mat_json)
+        if chr_cache.setup_mode == "BASIC":
+            basic.update_basic_material(mat, mat_cache, "ALL")
+        else:
+            shader_name = params.get_shader_name(mat_cache)
+            bsdf_node, shader_node, mix_node = nodeutils.get_shader_nodes(mat, shader_name)
+            shaders.apply_prop_matrix(bsdf_node, shader_node, mat_cache, shader_name)
+        # don't send the remote's changes straight back
+        values = get_material_parameters(mat_cache)
+        if values is not None:
+            self.material_parameters[mat.name] = values
 
     def send_material_update(self, context):
         state = utils.store_mode_selection_state()
@@ -2687,6 +4136,10 @@ class LinkService():
 
                 actor.bones = bones
                 actor.meshes = meshes
+                if chr_cache.rigified:
+                    actor.quantise = get_compact_ranges(actor, export_rig, bones, 100)
+                else:
+                    actor.quantise = get_compact_ranges(actor, rig, None, 1)
                 actor_data.append({
                     "name": actor.name,
                     "type": actor.get_type(),
@@ -2697,6 +4150,7 @@ class LinkService():
                     "mesh_ids": mesh_ids,
                     "shapes": shapes,
                     "drivers": driver_mode,
+                    "quantise": actor.quantise,
                 })
 
             else:
@@ -2755,11 +4209,19 @@ class LinkService():
                 })
         return encode_from_json(data)
 
-    def encode_pose_frame_data(self, actors: list):
-        pose_bone: bpy.types.PoseBone
-        data = bytearray()
+    def encode_pose_frame_data(self, actors: list, delta_encoder: linkutils.DeltaEncoder=None, compact=False):
+        frame, actor_blocks = self.get_pose_actor_blocks(actors)
+        if compact:
+            return linkutils.encode_compact_pose_frame(frame, actor_blocks)
+        if delta_encoder:
+            return delta_encoder.encode(frame, actor_blocks)
+        return linkutils.encode_pose_frame(frame, actor_blocks)
+
+    def get_pose_actor_blocks(self, actors: list):
+        """The current frame and the pose actor blocks of the actors (see linkutils.encode_pose_frame)."""
+        actor_blocks = []
         pose_actors = [ a for a in actors if a.is_posable() ]
-        data += struct.pack("!II", len(pose_actors), BFA(bpy.context.scene.frame_current))
+        frame = BFA(bpy.context.scene.frame_current)
         actor: LinkActor
         for actor in pose_actors:
 
@@ -2767,13 +4229,19 @@ class LinkService():
 
             actor_type = actor.get_type()
 
-            data += pack_string(actor.name)
-            data += pack_string(actor.get_type())
-            data += pack_string(actor.get_link_id())
+            header = b"".join([pack_string(actor.name),
+                               pack_string(actor.get_type()),
+                               pack_string(actor.get_link_id())])
+            parts = []
+            transforms = None
+            transform_counts = []
+            weights = None
 
             if actor_type == "PROP" or actor_type == "AVATAR":
 
                 chr_cache = actor.get_chr_cache()
+                rig: bpy.types.Object = chr_cache.get_armature()
+                bone_transforms = get_transform_values([])
 
                 if chr_cache.rigified:
                     # add the import retarget rig
@@ -2783,73 +4251,52 @@ class LinkService():
                         export_rig = rigging.adv_export_pair_rigs(chr_cache, link_target=True)[0]
                     M: Matrix = export_rig.matrix_world
 
-                    # pack object transform
-                    T: Matrix = M
-                    t = T.to_translation() * 100
-                    r = T.to_quaternion()
-                    s = T.to_scale()
-                    data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                    # object transform
+                    root_transform = get_transform_values([M], 100)
 
-                    # pack all the bone data for the exportable deformation bones
-                    data += struct.pack("!I", len(actor.bones))
+                    # all the bone data for the exportable deformation bones
                     if utils.object_mode_to(export_rig):
-                        for bone_name in actor.bones:
-                            pose_bone = export_rig.pose.bones[bone_name]
-                            T: Matrix = M @ pose_bone.matrix
-                            t = T.to_translation() * 100
-                            r = T.to_quaternion()
-                            s = T.to_scale()
-                            data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                        matrices = get_pose_bone_matrices(export_rig, actor.bones)
+                        bone_transforms = linkutils.decompose_world_matrices(M, matrices, 100)
                 else:
-                    rig: bpy.types.Object = chr_cache.get_armature()
                     M: Matrix = rig.matrix_world
 
-                    # pack object transform
-                    T: Matrix = M
-                    t = T.to_translation() * 100
-                    r = T.to_quaternion()
-                    s = T.to_scale()
-                    data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                    # object transform
+                    root_transform = get_transform_values([M], 100)
 
-                    # pack all the bone data
-                    data += struct.pack("!I", len(rig.pose.bones))
+                    # all the bone data
                     if utils.object_mode_to(rig):
-                        pose_bone: bpy.types.PoseBone
-                        for pose_bone in rig.pose.bones:
-                            T: Matrix = M @ pose_bone.matrix
-                            t = T.to_translation()
-                            r = T.to_quaternion()
-                            s = T.to_scale()
-                            data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                        matrices = get_pose_bone_matrices(rig)
+                        bone_transforms = linkutils.decompose_world_matrices(M, matrices)
 
-                # pack mesh transforms (actor.meshes is sanitized by encode_actor_templates)
+                parts.append(root_transform.tobytes())
+                parts.append(linkutils.UINT.pack(len(bone_transforms)))
+                parts.append(bone_transforms.tobytes())
+                transforms = [root_transform, bone_transforms]
+                transform_counts.append(len(bone_transforms))
+
+                # mesh transforms (actor.meshes is sanitized by encode_actor_templates)
                 if INCLUDE_POSE_MESHES:
-                    data += struct.pack("!I", len(actor.meshes))
+                    mesh_transforms = get_transform_values([])
                     if utils.object_mode_to(rig):
-                        mesh_obj: bpy.types.Object
-                        for mesh_name in actor.meshes:
-                            mesh_obj = bpy.data.objects[mesh_name]
-                            T: Matrix = mesh_obj.matrix_world
-                            t = T.to_translation()
-                            r = T.to_quaternion()
-                            s = T.to_scale()
-                            data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
-
-                # pack shape_keys
-                data += struct.pack("!I", len(actor.shape_keys))
-                for shape_key, key in actor.shape_keys.items():
-                    data += struct.pack("!f", key.value)
+                        mesh_transforms = get_transform_values([ bpy.data.objects[mesh_name].matrix_world
+                                                                 for mesh_name in actor.meshes ])
+                    parts.append(linkutils.UINT.pack(len(mesh_transforms)))
+                    parts.append(mesh_transforms.tobytes())
+                    transforms.append(mesh_transforms)
+                    transform_counts.append(len(mesh_transforms))
+
+                # shape_keys
+                weights = np.array([ key.value for key in actor.shape_keys.values() ], dtype=">f4")
+                parts.append(linkutils.UINT.pack(len(weights)))
+                parts.append(weights.tobytes())
+                transforms = np.concatenate(transforms)
 
             elif actor_type == "LIGHT":
-                M: Matrix = actor.object.matrix_world
-                T: Matrix = M
-                t = T.to_translation() * 100
-                r = T.to_quaternion()
-                s = T.to_scale()
-                data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                parts.append(get_transform_values([actor.object.matrix_world], 100).tobytes())
                 light: bpy.types.SpotLight = actor.object.data
                 # pack animateable light data
-                data += struct.pack("!?fffffff",
+                parts.append(struct.pack("!?fffffff",
                                     light.energy > 0.0001,
                                     light.color[0],
                                     light.color[1],
@@ -2857,24 +4304,30 @@ class LinkService():
                                     light.energy,
                                     light.cutoff_distance * 100,
                                     light.spot_size if light.type == "SPOT" else 0.0,
-                                    light.spot_blend if light.type == "SPOT" else 0.0)
+                                    light.spot_blend if light.type == "SPOT" else 0.0))
 
             elif actor_type == "CAMERA":
-                M: Matrix = actor.object.matrix_world
-                T: Matrix = M
-                t = T.to_translation() * 100
-                r = T.to_quaternion()
-                s = T.to_scale()
-                data += struct.pack("!ffffffffff", t.x, t.y, t.z, r.x, r.y, r.z, r.w, s.x, s.y, s.z)
+                parts.append(get_transform_values([actor.object.matrix_world], 100).tobytes())
                 camera: bpy.types.Camera = actor.object.data
                 # pack animateable camera data
-                data += struct.pack("!f?ff",
+                parts.append(struct.pack("!f?ff",
                                      camera.lens,
                                      camera.dof.use_dof,
                                      camera.dof.focus_distance * 100,
-                                     camera.dof.aperture_fstop)
+                                     camera.dof.aperture_fstop))
 
-        return data
+            actor_blocks.append({
+                "header": header,
+                "link_id": actor.get_link_id(),
+                "full": b"".join(parts),
+                "transforms": transforms,
+                "transform_counts": transform_counts,
+                "weights": weights,
+                "weight_counts": [] if weights is None else [len(weights)],
+                "quantise": actor.quantise,
+            })
+
+        return frame, actor_blocks
 
     def encode_sequence_data(self, actors, aborted=False):
         fps = bpy.context.scene.render.fps
@@ -3018,8 +4471,9 @@ class LinkService():
             # force recalculate all transforms
             bpy.context.view_layer.update()
             # send pose data
-            pose_frame_data = self.encode_pose_frame_data(actors)
-            self.send(OpCodes.POSE_FRAME, pose_frame_data)
+            compact = self.use_compact_poses()
+            pose_frame_data = self.encode_pose_frame_data(actors, compact=compact)
+            self.send(OpCodes.POSE_FRAME_COMPACT if compact else OpCodes.POSE_FRAME, pose_frame_data)
             # clear the actors
             self.restore_actor_rigs(LINK_DATA.sequence_actors)
             LINK_DATA.sequence_actors = None
@@ -3042,8 +4496,23 @@ class LinkService():
             return True
         return False
 
+    def use_compact_poses(self):
+        prefs = vars.prefs()
+        return (prefs.datalink_pose_encoding == "COMPACT" and
+                self.remote_pose_encodings is not None and
+                "COMPACT" in self.remote_pose_encodings)
+
+    def get_quantise_ranges(self):
+        ranges = {}
+        actor: LinkActor
+        for actor in LINK_DATA.sequence_actors or []:
+            if actor.quantise:
+                ranges[actor.get_link_id()] = actor.quantise
+        return ranges
+
     def send_sequence(self):
         global LINK_DATA
+        prefs = vars.prefs()
 
         # get actors
         if not LINK_DATA.sequence_actors:
@@ -3065,6 +4534,16 @@ class LinkService():
             # store the actors
             LINK_DATA.sequence_actors = actors
             LINK_DATA.sequence_type = "SEQUENCE"
+            # send compact, batched or delta frames if both ends can
+            # (batches save the per message overhead on local connections, deltas save bytes on remote ones)
+            self.compact_sequence = self.use_compact_poses()
+            self.batch_sequence = not self.compact_sequence and self.remote_frame_batch and not self.is_remote()
+            self.flow.batching = self.batch_sequence
+            self.sequence_batch = []
+            self.delta_encoder = None
+            if (not self.compact_sequence and not self.batch_sequence and
+                    prefs.datalink_delta_frames and self.remote_delta_frames):
+                self.delta_encoder = linkutils.DeltaEncoder()
             # start the sending sequence
             self.start_sequence(self.send_sequence_frame)
 
@@ -3077,8 +4556,22 @@ class LinkService():
         # force recalculate all transforms
         bpy.context.view_layer.update()
         # send current sequence frame pose
-        pose_data = self.encode_pose_frame_data(LINK_DATA.sequence_actors)
-        self.send(OpCodes.SEQUENCE_FRAME, pose_data)
+        if self.batch_sequence:
+            self.sequence_batch.append(self.get_pose_actor_blocks(LINK_DATA.sequence_actors))
+            self.flow.sent(current_frame)
+            # send the batch when full, or when the window won't let any more frames join it
+            if (len(self.sequence_batch) >= self.flow.batch_size() or
+                    current_frame >= bpy.context.scene.frame_end or not self.flow.can_send()):
+                self.send_sequence_batch()
+        else:
+            pose_data = self.encode_pose_frame_data(LINK_DATA.sequence_actors, self.delta_encoder, self.compact_sequence)
+            if self.compact_sequence:
+                self.send(OpCodes.SEQUENCE_COMPACT, pose_data)
+            elif self.delta_encoder:
+                self.send(OpCodes.SEQUENCE_DELTA, pose_data)
+            else:
+                self.send(OpCodes.SEQUENCE_FRAME, pose_data)
+            self.flow.sent(current_frame)
         # check for end
         if current_frame >= bpy.context.scene.frame_end:
             self.stop_sequence()
@@ -3088,7 +4581,21 @@ class LinkService():
         LINK_DATA.sequence_current_frame = next_frame(current_frame)
 
 
+    def send_sequence_batch(self):
+        if self.sequence_batch:
+            if len(self.sequence_batch) == 1:
+                frame, actor_blocks = self.sequence_batch[0]
+                self.send(OpCodes.SEQUENCE_FRAME, linkutils.encode_pose_frame(frame, actor_blocks))
+            else:
+                first_frame = self.sequence_batch[0][0]
+                frames_blocks = [ actor_blocks for frame, actor_blocks in self.sequence_batch ]
+                self.send(OpCodes.SEQUENCE_FRAMES, linkutils.encode_pose_frames(first_frame, frames_blocks))
+            self.sequence_batch = []
+
     def send_sequence_end(self, aborted=False):
+        # any frames still waiting to be batched go first
+        if self.batch_sequence:
+            self.send_sequence_batch()
         sequence_data = self.encode_sequence_data(LINK_DATA.sequence_actors, aborted=aborted)
         self.send(OpCodes.SEQUENCE_END, sequence_data)
         # clear the actors
@@ -3100,34 +4607,34 @@ class LinkService():
     def send_sequence_ack(self, frame):
         global LINK_DATA
         # encode sequence ack
+        prefs = vars.prefs()
+        # frames are only received one per timer loop when previewing every frame
+        one_per_loop = prefs.datalink_frame_sync or not LINK_DATA.set_keyframes
+        credit = self.flow.get_credit(self.loop_rate if one_per_loop else 0.0)
+        # batched frames are no use when every frame is previewed
+        batch = 1 if one_per_loop else self.flow.get_batch()
         data = encode_from_json({
             "frame": BFA(frame),
             "rate": self.loop_rate,
+            # enough credit for a whole batch
+            "credit": max(credit, batch),
+            "batch": batch,
         })
         # send sequence ack
         self.send(OpCodes.SEQUENCE_ACK, data)
 
-    def decode_pose_frame_header(self, pose_data):
-        count, frame = struct.unpack_from("!II", pose_data)
-        frame = RLFA(frame)
-        LINK_DATA.sequence_current_frame = frame
-        return frame
-
-    def decode_pose_frame_data(self, pose_data):
+    def apply_pose_frame_data(self, frame, actor_frames):
         global LINK_DATA
         prefs = vars.prefs()
 
-        offset = 0
-        count, frame = struct.unpack_from("!II", pose_data, offset)
         frame = RLFA(frame)
         least_frame = None
         LINK_DATA.sequence_current_frame = frame
-        offset = 8
         actors = []
-        for i in range(0, count):
-            offset, name = unpack_string(pose_data, offset)
-            offset, character_type = unpack_string(pose_data, offset)
-            offset, link_id = unpack_string(pose_data, offset)
+        for actor_frame in actor_frames:
+            name = actor_frame["name"]
+            character_type = actor_frame["type"]
+            link_id = actor_frame["link_id"]
             actor = LINK_DATA.find_sequence_actor(link_id)
             actor_ready = False
             if actor:
@@ -3154,12 +4661,11 @@ class LinkService():
                 opt_start_frame = LinkActor.get_sequence_frame(None, LINK_DATA.sequence_start_frame, LINK_DATA.sequence_start_frame, LINK_DATA.scene_current_frame)
                 least_frame = opt_frame
 
-            # unpack rig transform
-            tx,ty,tz,rx,ry,rz,rw,sx,sy,sz = struct.unpack_from("!ffffffffff", pose_data, offset)
+            # rig transform
+            tx,ty,tz,rx,ry,rz,rw,sx,sy,sz = actor_frame["transform"]
             loc = Vector((tx, ty, tz)) * 0.01
             rot = Quaternion((rw, rx, ry, rz))
             sca = Vector((sx, sy, sz))
-            offset += 40
             if rig:
                 rig.location = Vector((0, 0, 0))
                 rot_mode = rig.rotation_mode
@@ -3174,17 +4680,19 @@ class LinkService():
 
                 datalink_rig = make_datalink_import_rig(actor, objects) if actor_ready else None
 
-                # unpack bone transforms
-                num_bones = struct.unpack_from("!I", pose_data, offset)[0]
-                offset += 4
-
-                # unpack the binary transform data directly into the datalink rig pose bones
-                for i in range(0, num_bones):
-                    tx,ty,tz,rx,ry,rz,rw,sx,sy,sz = struct.unpack_from("!ffffffffff", pose_data, offset)
-                    offset += 40
-                    if actor and datalink_rig:
+                # apply the bone transforms directly into the datalink rig pose bones
+                # (delta frames only need the changed bones setting)
+                bone_data = actor_frame["bones"]
+                num_bones = len(bone_data) // linkutils.TRANSFORM_SIZE
+                bone_indices = actor_frame.get("changed_bones")
+                if bone_indices is None:
+                    bone_indices = range(0, num_bones)
+                if actor and datalink_rig:
+                    for i in bone_indices:
                         id = actor.ids[i]
                         if id in actor.id_map:
+                            j = i * linkutils.TRANSFORM_SIZE
+                            tx,ty,tz,rx,ry,rz,rw,sx,sy,sz = bone_data[j:j+linkutils.TRANSFORM_SIZE]
                             id_def = actor.id_map[id]
                             if id_def["mesh"]:
                                 obj = actor.skin_meshes[id][0]
@@ -3201,29 +4709,12 @@ class LinkService():
                                 utils.set_transform_rotation(pose_bone, rot)
                                 pose_bone.scale = sca
 
-                # unpack the expression shape keys into the mesh objects
-                num_weights = struct.unpack_from("!I", pose_data, offset)[0]
-                offset += 4
-                expression_weights = [0] * num_weights
-                for i in range(0, num_weights):
-                    weight = struct.unpack_from("!f", pose_data, offset)[0]
-                    offset += 4
-                    if actor and objects and (prefs.datalink_preview_shape_keys or not LINK_DATA.set_keyframes):
-                        expression_name = actor.expressions[i]
-                        set_actor_expression_weight(objects, expression_name, weight)
-                    expression_weights[i] = weight
-
-                # unpack the viseme shape keys into the mesh objects
-                num_weights = struct.unpack_from("!I", pose_data, offset)[0]
-                offset += 4
-                viseme_weights = [0] * num_weights
-                for i in range(0, num_weights):
-                    weight = struct.unpack_from("!f", pose_data, offset)[0]
-                    offset += 4
-                    if actor and objects and (prefs.datalink_preview_shape_keys or not LINK_DATA.set_keyframes):
-                        viseme_name = actor.visemes[i]
-                        set_actor_viseme_weight(objects, viseme_name, weight)
-                    viseme_weights[i] = weight
+                # apply the expression and viseme shape keys into the mesh objects
+                expression_weights = list(actor_frame["expressions"])
+                viseme_weights = list(actor_frame["visemes"])
+                if actor and objects and (prefs.datalink_preview_shape_keys or not LINK_DATA.set_keyframes):
+                    actor.apply_shape_key_weights(expression_weights, viseme_weights,
+                                                  visemes=LINK_DATA.preview_shape_keys)
 
                 # TODO: morph weights
                 morph_weights = []
@@ -3233,17 +4724,15 @@ class LinkService():
                     store_shape_key_cache_keyframes(actor, opt_frame, opt_start_frame, expression_weights, viseme_weights, morph_weights)
 
             elif character_type == "LIGHT":
-                active,r,g,b,m,rng,angle,falloff,attenuation,darkness = struct.unpack_from("!?fffffffff", pose_data, offset)
+                active,r,g,b,m,rng,angle,falloff,attenuation,darkness = actor_frame["light"]
                 color = Color((r,g,b))
                 if actor:
                     rlx.apply_light_pose(actor.object, loc, rot, sca, color, active, m, rng, angle, falloff, attenuation, darkness)
-                offset += 37
 
             elif character_type == "CAMERA":
-                lens,enable,focus,rng,fb,nb,ft,nt,mbd = struct.unpack_from("!f?fffffff", pose_data, offset)
+                lens,enable,focus,rng,fb,nb,ft,nt,mbd = actor_frame["camera"]
                 if actor:
                     rlx.apply_camera_pose(actor.object, loc, rot, sca, lens, enable, focus, rng, fb, nb, ft, nt, mbd)
-                offset += 33
 
             if rig:
                 rig.pose.bones.update()
@@ -3404,24 +4893,70 @@ class LinkService():
         t = r3d.view_location
         return t
 
-    def send_camera_sync(self):
-        update_link_status(f"Synchronizing View Camera")
-        self.send_notify(f"Sync View Camera")
+    def get_camera_sync(self):
+        """The view camera sync values, op_code and message (binary if the remote can decode it),
+           or None if there is no 3D view."""
+        view_space, r3d = utils.get_region_3d()
+        if not r3d:
+            return None
         camera_data = self.get_view_camera_data()
         pivot = self.get_view_camera_pivot()
+        loc = camera_data["loc"]
+        rot = camera_data["rot"]
+        lens = camera_data["focal_length"]
+        # q and -q are the same rotation
+        values = loc + (rot if rot[3] >= 0 else [ -r for r in rot ]) + [pivot.x, pivot.y, pivot.z, lens]
+        if self.remote_compact_sync:
+            return values, OpCodes.CAMERA_SYNC_COMPACT, linkutils.encode_camera_record(loc, rot, pivot, lens)
         data = {
             "view_camera": camera_data,
             "pivot": [pivot.x, pivot.y, pivot.z],
         }
-        self.send(OpCodes.CAMERA_SYNC, encode_from_json(data))
+        return values, OpCodes.CAMERA_SYNC, encode_from_json(data)
+
+    def send_camera_sync(self, force=True):
+        """Queues the view camera for the sync sender. Forced syncs are sent straight away,
+           otherwise only the latest camera is sent, at the sync rate, if it has changed."""
+        sync = self.get_camera_sync()
+        if not sync:
+            return
+        if force:
+            update_link_status(f"Synchronizing View Camera")
+            self.send_notify(f"Sync View Camera")
+        self.sync.queue("CAMERA", *sync, force=force)
+        self.send_sync()
+
+    def send_sync(self):
+        prefs = vars.prefs()
+        self.sync.rate = prefs.datalink_sync_rate
+        self.sync.threshold = prefs.datalink_sync_threshold
+        for op_code, data in self.sync.flush():
+            self.send(op_code, data)
 
-    def decode_camera_sync_data(self, data):
-        data = decode_to_json(data)
-        camera_data = data["view_camera"]
-        pivot = utils.array_to_vector(data["pivot"]) / 100
+    def update_view_sync(self):
+        """Live view sync: samples the view camera at the sync rate and sends the pending sync states."""
+        prefs = vars.prefs()
+        if prefs.datalink_live_sync and not self.is_sequence and self.sync.is_due("CAMERA"):
+            sync = self.get_camera_sync()
+            if sync:
+                self.sync.queue("CAMERA", *sync)
+        if self.sync.pending:
+            self.send_sync()
+
+    def decode_camera_sync_data(self, data, compact=False):
+        if compact:
+            loc, rot, pivot, focal_length = linkutils.decode_camera_record(data)
+        else:
+            data = decode_to_json(data)
+            camera_data = data["view_camera"]
+            loc = camera_data["loc"]
+            rot = camera_data["rot"]
+            pivot = data["pivot"]
+            focal_length = camera_data["focal_length"]
+        pivot = utils.array_to_vector(pivot) / 100
         view_space, r3d = utils.get_region_3d()
-        loc = utils.array_to_vector(camera_data["loc"]) / 100
-        rot = utils.array_to_quaternion(camera_data["rot"])
+        loc = utils.array_to_vector(loc) / 100
+        rot = utils.array_to_quaternion(rot)
         to_pivot = pivot - loc
         dir = Vector((0,0,-1))
         dir.rotate(rot)
@@ -3431,14 +4966,24 @@ class LinkService():
         r3d.view_location = loc + dir * dist
         r3d.view_rotation = rot
         r3d.view_distance = dist
-        view_space.lens = camera_data["focal_length"] * 1.625
+        view_space.lens = focal_length * 1.625
 
-    def receive_camera_sync(self, data):
+    def receive_camera_sync(self, data, compact=False):
         update_link_status(f"Camera Data Receveived")
-        self.decode_camera_sync_data(data)
-
-    def send_frame_sync(self):
-        update_link_status(f"Sending Frame Sync")
+        self.decode_camera_sync_data(data, compact=compact)
+        # don't send the remote's camera straight back
+        sync = self.get_camera_sync()
+        if sync:
+            self.sync.set_last("CAMERA", sync[0])
+
+    def get_frame_sync_values(self):
+        scene = bpy.context.scene
+        return [scene.render.fps, BFA(scene.frame_start), BFA(scene.frame_end), BFA(scene.frame_current)]
+
+    def send_frame_sync(self, force=True):
+        """Queues the scene frame range and current frame for the sync sender (see send_camera_sync)."""
+        if force:
+            update_link_status(f"Sending Frame Sync")
         fps = bpy.context.scene.render.fps
         start_frame = BFA(bpy.context.scene.frame_start)
         end_frame = BFA(bpy.context.scene.frame_end)
@@ -3455,7 +5000,8 @@ class LinkService():
             "end_frame": end_frame,
             "current_frame": current_frame,
         }
-        self.send(OpCodes.FRAME_SYNC, encode_from_json(frame_data))
+        self.sync.queue("FRAME", self.get_frame_sync_values(), OpCodes.FRAME_SYNC, encode_from_json(frame_data), force=force)
+        self.send_sync()
 
     def receive_frame_sync(self, data):
         update_link_status(f"Frame Sync Receveived")
@@ -3467,6 +5013,7 @@ class LinkService():
         bpy.context.scene.frame_start = RLFA(start_frame)
         bpy.context.scene.frame_end = RLFA(end_frame)
         bpy.context.scene.frame_current = RLFA(current_frame)
+        self.sync.set_last("FRAME", self.get_frame_sync_values())
 
     def set_link_fps(self, fps: int=None):
         if self.link_data:
@@ -3672,14 +5219,18 @@ class LinkService():
         bpy.ops.screen.animation_cancel()
         bpy.context.view_layer.update()
 
-    def receive_pose_frame(self, data):
+    def receive_pose_frame(self, data, compact=False):
         global LINK_DATA
 
         state = utils.store_mode_selection_state()
 
         # decode and cache pose
-        frame = self.decode_pose_frame_header(data)
-        actors = self.decode_pose_frame_data(data)
+        if compact:
+            frame, actor_frames = linkutils.decode_compact_pose_frame(data, self.get_quantise_ranges())
+        else:
+            frame, actor_frames = linkutils.decode_pose_frame(data)
+        actors = self.apply_pose_frame_data(frame, actor_frames)
+        frame = RLFA(frame)
         utils.log_info(f"Receive Pose Frame: {frame}")
 
         # force recalculate all transforms (lights and cameras seem to need this)
@@ -3786,7 +5337,8 @@ class LinkService():
 
         # update scene range
         update_link_status(f"Receiving Live Sequence: {num_frames} frames")
-        bpy.ops.screen.animation_cancel()
+        if not bpy.app.background:
+            bpy.ops.screen.animation_cancel()
 
         utils.start_timer("FRAME")
         utils.start_timer("DECODE")
@@ -3796,19 +5348,86 @@ class LinkService():
         utils.start_timer("STORE_CACHE")
         utils.start_timer("WRITE")
 
+        self.delta_decoder = linkutils.DeltaDecoder()
+        LINK_DATA.fast_record_count = 0
+        LINK_DATA.fast_record_buffered = False
+
         # start the sequence
         self.start_sequence()
 
-    def receive_sequence_frame(self, data):
+    def receive_sequence_frame(self, data, delta=False, compact=False):
         global LINK_DATA
 
         utils.mark_timer("FRAME")
+        start_time = time.perf_counter()
 
         # decode and cache pose
         utils.mark_timer("DECODE")
-        frame = self.decode_pose_frame_header(data)
-        utils.log_detail(f"Receive Sequence Frame: {frame}")
-        actors = self.decode_pose_frame_data(data)
+        if delta:
+            if not self.delta_decoder:
+                self.delta_decoder = linkutils.DeltaDecoder()
+            frame, actor_frames = self.delta_decoder.decode(data)
+        elif compact:
+            frame, actor_frames = linkutils.decode_compact_pose_frame(data, self.get_quantise_ranges())
+        else:
+            frame, actor_frames = linkutils.decode_pose_frame(data)
+        utils.log_detail(f"Receive Sequence Frame: {RLFA(frame)}")
+        frame = self.apply_sequence_frame(frame, actor_frames)
+
+        # send sequence frame ack
+        self.flow.received(time.perf_counter() - start_time)
+        self.send_sequence_ack(frame)
+
+        utils.update_timer("FRAME")
+
+    def receive_sequence_frames(self, data):
+        """A batch of consecutive sequence frames, acknowledged with a single ack of the last frame."""
+        global LINK_DATA
+
+        utils.mark_timer("FRAME")
+        start_time = time.perf_counter()
+
+        # decode all the frames, then cache them in turn
+        utils.mark_timer("DECODE")
+        frames = linkutils.decode_pose_frames(data)
+        if not frames:
+            return
+        utils.log_detail(f"Receive Sequence Frames: {RLFA(frames[0][0])} to {RLFA(frames[-1][0])}")
+        for i, (frame, actor_frames) in enumerate(frames):
+            if i > 0:
+                utils.mark_timer("DECODE")
+            frame = self.apply_sequence_frame(frame, actor_frames)
+
+        # send one ack for the whole batch
+        self.flow.received((time.perf_counter() - start_time) / len(frames))
+        self.send_sequence_ack(frame)
+
+        utils.update_timer("FRAME")
+
+    def apply_sequence_frame(self, frame, actor_frames):
+        """Applies a decoded sequence frame and stores it in the keyframe caches. Returns the Blender frame."""
+        global LINK_DATA
+
+        # fast record: only buffer the frame, unless it's a preview frame
+        if self.is_fast_record():
+            preview = 0 if LINK_DATA.sequence_type == "MOTION" else vars.prefs().datalink_fast_record_preview
+            count = LINK_DATA.fast_record_count
+            LINK_DATA.fast_record_count += 1
+            if not (count == 0 or (preview and count % preview == 0)):
+                if self.record_sequence_frame(frame, actor_frames):
+                    LINK_DATA.fast_record_buffered = True
+                    utils.update_timer("DECODE")
+                    update_link_status(f"Sequence Frame: {LINK_DATA.sequence_current_frame}")
+                    return LINK_DATA.sequence_current_frame
+
+        # the buffered frames never posed the import rig, so the changes of a delta frame
+        # (since the previous frame) aren't enough to pose it
+        if LINK_DATA.fast_record_buffered:
+            actor_frames = linkutils.full_actor_frames(actor_frames)
+            LINK_DATA.fast_record_buffered = False
+
+        actors = self.apply_pose_frame_data(frame, actor_frames)
+        frame = RLFA(frame)
         utils.update_timer("DECODE")
 
         utils.mark_timer("REPOSITION")
@@ -3841,10 +5460,44 @@ class LinkService():
                         store_camera_cache_keyframes(actor, opt_frame, opt_start_frame)
         utils.update_timer("STORE_CACHE")
 
-        # send sequence frame ack
-        self.send_sequence_ack(frame)
+        return frame
 
-        utils.update_timer("FRAME")
+    def is_fast_record(self):
+        # motion curves are always fast recorded (where the rig allows)
+        return LINK_DATA.set_keyframes and (vars.prefs().datalink_fast_record or LINK_DATA.sequence_type == "MOTION")
+
+    def record_sequence_frame(self, frame, actor_frames):
+        """Fast record: buffers the incoming bone transforms and stores the shape keys of the frame,
+           without posing the rigs or updating the view layer.
+           Returns False if the frame needs to be fully evaluated."""
+        global LINK_DATA
+
+        records = []
+        for actor_frame in actor_frames:
+            actor = LINK_DATA.find_sequence_actor(actor_frame["link_id"])
+            if not actor:
+                continue
+            if not actor.ready():
+                return False
+            recorded = get_actor_recorder(actor)
+            if not recorded:
+                return False
+            transforms = np.array(actor_frame["bones"], dtype=np.float32).reshape(-1, linkutils.TRANSFORM_SIZE)
+            # negative scales are left to the constraints to resolve
+            if (transforms[:, 7:10] < 0).any():
+                return False
+            records.append((actor, actor_frame, recorded, transforms))
+
+        frame = RLFA(frame)
+        LINK_DATA.sequence_current_frame = frame
+        for actor, actor_frame, recorded, transforms in records:
+            opt_frame = LinkActor.get_sequence_frame(actor, frame, LINK_DATA.sequence_start_frame, LINK_DATA.scene_current_frame)
+            opt_start_frame = LinkActor.get_sequence_frame(actor, LINK_DATA.sequence_start_frame, LINK_DATA.sequence_start_frame, LINK_DATA.scene_current_frame)
+            recorded["rows"].append(opt_frame - opt_start_frame)
+            recorded["transforms"].append(transforms)
+            store_shape_key_cache_keyframes(actor, opt_frame, opt_start_frame,
+                                            list(actor_frame["expressions"]), list(actor_frame["visemes"]), [])
+        return True
 
     def receive_sequence_end(self, data):
         global LINK_DATA
@@ -3857,6 +5510,7 @@ class LinkService():
         LINK_DATA.sequence_end_frame = end_frame
         utils.log_info("Receive Sequence End")
 
+
         # fetch actors
         actors = []
         actor: LinkActor
@@ -3879,6 +5533,8 @@ class LinkService():
         # write actions
         utils.mark_timer("WRITE")
         for actor in actors:
+            if LINK_DATA.set_keyframes:
+                solve_recorded_frames(actor)
             opt_start_frame = LinkActor.get_sequence_frame(actor, LINK_DATA.sequence_start_frame, LINK_DATA.sequence_start_frame, LINK_DATA.scene_current_frame)
             least_start_frame = opt_start_frame if least_start_frame is None or opt_start_frame < least_start_frame else least_start_frame
             if LINK_DATA.set_keyframes:
@@ -3911,41 +5567,20 @@ class LinkService():
         #bpy.context.scene.frame_current = LINK_DATA.sequence_start_frame
 
         # play the recorded sequence
-        if not aborted and LINK_DATA.set_keyframes:
+        if not aborted and LINK_DATA.set_keyframes and not bpy.app.background:
             bpy.ops.screen.animation_play()
 
     def receive_sequence_ack(self, data):
-        prefs = vars.prefs()
-        global LINK_DATA
-
         json_data = decode_to_json(data)
         ack_frame = RLFA(json_data["frame"])
-        server_rate = json_data["rate"]
-        delta_frames = LINK_DATA.sequence_current_frame - ack_frame
-        if prefs.datalink_match_client_rate:
-            if LINK_DATA.ack_time == 0.0:
-                LINK_DATA.ack_time = time.time()
-                LINK_DATA.ack_rate = 120
-                count = 5
-            else:
-                t = time.time()
-                delta_time = max(t - LINK_DATA.ack_time, 1/120)
-                LINK_DATA.ack_time = t
-                ack_rate = (1.0 / delta_time)
-                LINK_DATA.ack_rate = utils.lerp(LINK_DATA.ack_rate, ack_rate, 0.5)
-
-                if delta_frames >= 20:
-                    count = 0
-                elif delta_frames >= 10:
-                    count = 1
-                elif delta_frames >= 5:
-                    count = 2
-                else:
-                    count = 4
-
-            self.update_sequence(count, delta_frames)
-        else:
-            self.update_sequence(5, delta_frames)
+        # older clients don't advertise any credit
+        credit = json_data.get("credit")
+        rtt = self.flow.acknowledge(ack_frame, credit, batch=json_data.get("batch"))
+        if rtt is not None:
+            self.telemetry.rtt.add(rtt)
+        if self.loop_count % 30 == 0:
+            utils.log_detail(f"Sequence flow: window {self.flow.window} in flight {len(self.flow.in_flight)} "
+                             f"rtt {self.flow.srtt * 1000:.1f}ms rate {self.flow.throughput:.1f}fps")
 
     def get_remote_file(self, remote_id: str, source_path: str, file_override=None):
         if os.path.sep != "\\":
@@ -4223,6 +5858,113 @@ class LinkService():
         self.do_motion_import(link_id, fbx_path, character_type, opt_start_frame)
         utils.restore_mode_selection_state(SMSS, include_frames=False)
 
+    def receive_motion_curves(self, data):
+        """Binary motion import (MOTION_CURVES): the whole motion as one message of curves, with the actor
+           templates, solved straight into the actors' keyframe caches and written as actions.
+           Rigs that can't be solved analytically (e.g. rigified) are keyed frame by frame instead."""
+        props = vars.props()
+        global LINK_DATA
+
+        props.validate_and_clean_up()
+
+        header, actor_curves = linkutils.decode_motion_curves(data)
+        num_frames = header["num_frames"]
+        utils.log_info(f"Receive Motion Curves: {num_frames} frames, {len(actor_curves)} actors")
+        if not num_frames:
+            return
+        start_frame = RLFA(header["start_frame"])
+        end_frame = start_frame + num_frames - 1
+        frame = RLFA(header.get("frame", header["start_frame"]))
+        current_frame = bpy.context.scene.frame_current
+        LINK_DATA.sequence_start_frame = start_frame
+        LINK_DATA.sequence_end_frame = end_frame
+        LINK_DATA.sequence_current_frame = start_frame
+        LINK_DATA.scene_current_frame = current_frame
+        LINK_DATA.set_action_settings(header.get("motion_prefix", ""), header.get("use_fake_user", False), True)
+        LINK_DATA.sequence_type = "MOTION"
+
+        state = utils.store_mode_selection_state()
+
+        # fetch the actors and set their templates
+        actors = []
+        for actor_data, curves in zip(header["actors"], actor_curves):
+            name = actor_data["name"]
+            character_type = actor_data["type"]
+            link_id = actor_data["link_id"]
+            actor = LinkActor.find_actor(link_id, search_name=name, search_type=character_type)
+            if not actor or (actor.get_type() != "AVATAR" and actor.get_type() != "PROP"):
+                utils.log_error(f"Unable to find motion actor: {name} ({link_id})")
+                continue
+            actor.set_template(actor_data)
+            if not actor.ids or len(actor.ids) != actor_data["bone_count"]:
+                utils.log_error(f"Motion actor template doesn't match the curves: {name} ({link_id})")
+                continue
+            actors.append((actor, curves))
+
+        LINK_DATA.sequence_actors = [ actor for actor, curves in actors ]
+        if not actors:
+            update_link_status("No valid motion actors!")
+        else:
+            self.get_actors_frame_range(LINK_DATA.sequence_actors, frame, start_frame, end_frame, current_frame,
+                                        expand_range=True, set_preview=True, set_start=True)
+            update_link_status(f"Receiving Motion: {num_frames} frames")
+            if not bpy.app.background:
+                bpy.ops.screen.animation_cancel()
+
+        # solve the curves into the keyframe caches
+        replay = []
+        actor: LinkActor
+        for actor, curves in actors:
+            utils.log_info(f"Preparing Actor: {actor.name} ({actor.get_link_id()})")
+            prep_pose_actor(actor, start_frame, end_frame)
+            if actor.cache and not solve_motion_curves(actor, curves):
+                utils.log_info(f"Motion curves can't be solved directly, keying every frame: {actor.name}")
+                replay.append((actor, curves))
+        if replay:
+            self.replay_motion_curves(header["start_frame"], num_frames, replay)
+
+        # write actions
+        for actor, curves in actors:
+            if actor.cache:
+                solve_recorded_frames(actor)
+                opt_start_frame = LinkActor.get_sequence_frame(actor, start_frame, start_frame, current_frame)
+                write_sequence_actions(actor, num_frames, opt_start_frame)
+            remove_datalink_import_rig(actor)
+            if actor.get_type() == "PROP":
+                rigutils.update_prop_rig(actor.get_armature())
+            elif actor.get_type() == "AVATAR":
+                rigutils.update_avatar_rig(actor.get_armature())
+
+        utils.restore_mode_selection_state(state)
+        LINK_DATA.sequence_actors = None
+        LINK_DATA.sequence_type = None
+        LINK_DATA.sequence_selection = None
+        if actors:
+            update_link_status(f"Motion Imported: {num_frames} frames")
+            if not bpy.app.background:
+                bpy.ops.screen.animation_play()
+
+    def replay_motion_curves(self, first_frame, num_frames, replay):
+        """Keys the motion curves of the actors frame by frame, as a live sequence would."""
+        LINK_DATA.fast_record_count = 0
+        LINK_DATA.fast_record_buffered = False
+        for i in range(0, num_frames):
+            utils.mark_timer("FRAME")
+            utils.mark_timer("DECODE")
+            actor_frames = []
+            for actor, curves in replay:
+                actor_frames.append({
+                    "name": actor.name,
+                    "type": actor.get_type(),
+                    "link_id": actor.get_link_id(),
+                    "transform": curves["transform"][i].tolist(),
+                    "bones": curves["bones"][i].ravel().tolist(),
+                    "expressions": curves["expressions"][i].tolist(),
+                    "visemes": curves["visemes"][i].tolist(),
+                })
+            self.apply_sequence_frame(first_frame + i, actor_frames)
+            utils.update_timer("FRAME")
+
     def do_motion_import(self, link_id, fbx_path, character_type, start_frame):
         actor = LinkActor.find_actor(link_id, search_type=character_type)
         update_link_status(f"Receving Motion Import: {actor.name}")
@@ -4402,6 +6144,7 @@ class LinkService():
                 dest = actor.get_chr_cache().object_cache[0].object
                 geom.copy_vert_positions_by_index(source, dest)
                 utils.delete_mesh_object(source)
+                self.store_mesh_baseline(dest)
 
     def receive_mesh_modify(self, data):
         props = vars.props()
@@ -4440,6 +6183,7 @@ class LinkService():
                 utils.set_prop(source, "rl_name", name)
                 utils.set_prop(source, "rl_type", character_type)
                 source.scale = (0.01, 0.01, 0.01)
+                self.store_mesh_baseline(source)
             utils.restore_mode_selection_state(mss)
 
     def receive_update_replace(self, data):
@@ -4773,6 +6517,27 @@ def link_state_update():
         utils.update_ui()
 
 
+@persistent
+def frame_change_sync(scene, depsgraph=None):
+    """Live view sync: queues the new frame, sent by the service loop at the sync rate."""
+    prefs = vars.prefs()
+    if (prefs.datalink_live_sync and LINK_SERVICE and LINK_SERVICE.is_connected and
+            not LINK_SERVICE.is_sequence and not bpy.app.background):
+        screen = bpy.context.screen
+        if screen and screen.is_animation_playing:
+            return
+        LINK_SERVICE.send_frame_sync(force=False)
+
+
+@persistent
+def material_depsgraph_update(scene, depsgraph):
+    """Live material sync: notes the linked character materials with changed parameters."""
+    if LINK_SERVICE and LINK_SERVICE.is_connected and vars.prefs().datalink_live_materials:
+        for update in depsgraph.updates:
+            if isinstance(update.id, bpy.types.Material):
+                LINK_SERVICE.check_material_parameters(update.id.original)
+
+
 def update_link_status(text):
     link_props = vars.link_props()
     link_props.link_status = text
@@ -4812,6 +6577,33 @@ def reconnect(file_path=None):
     return None
 
 
+@persistent
+def invalidate_actor_index(*args):
+    LINK_DATA.actor_index.invalidate()
+
+
+@persistent
+def reset_actor_index(*args):
+    LINK_DATA.actor_index.reset()
+
+
+@persistent
+def actor_index_depsgraph_update(scene, depsgraph):
+    """Invalidates the actor index when objects are added, removed, renamed or have their properties changed.
+       Transform and geometry (pose) updates don't affect it."""
+    actor_index = LINK_DATA.actor_index
+    if actor_index.valid:
+        if actor_index.object_count != len(bpy.data.objects):
+            actor_index.invalidate()
+            return
+        for update in depsgraph.updates:
+            if (isinstance(update.id, bpy.types.Object) and
+                not update.is_updated_transform and
+                not update.is_updated_geometry):
+                actor_index.invalidate()
+                return
+
+
 @persistent
 def disconnect(file_path=None):
     global LINK_SERVICE
@@ -4837,6 +6629,26 @@ class CCICDataLink(bpy.types.Operator):
             options={"HIDDEN"}
         )
 
+    filepath: bpy.props.StringProperty(
+            name = "Session",
+            default = "",
+            subtype = "FILE_PATH",
+        )
+
+    filter_glob: bpy.props.StringProperty(
+            default = "*.bin",
+            options={"HIDDEN"},
+        )
+
+    def invoke(self, context, event):
+        if self.param == "REPLAY_SESSION":
+            local_path = get_local_data_path()
+            if local_path:
+                self.filepath = os.path.join(local_path, "captures", "")
+            context.window_manager.fileselect_add(self)
+            return {"RUNNING_MODAL"}
+        return self.execute(context)
+
     def execute(self, context):
         global LINK_SERVICE
 
@@ -4954,6 +6766,46 @@ class CCICDataLink(bpy.types.Operator):
                 utils.open_folder(local_path)
             return {'FINISHED'}
 
+        elif self.param == "RECORD_SESSION":
+            self.ensure_link_service()
+            file_path = LINK_SERVICE.start_recording()
+            if file_path:
+                self.report({'INFO'}, f"Recording DataLink session: {file_path}")
+            return {'FINISHED'}
+
+        elif self.param == "STOP_RECORDING":
+            if LINK_SERVICE:
+                LINK_SERVICE.stop_recording()
+            return {'FINISHED'}
+
+        elif self.param == "REPLAY_SESSION":
+            prefs = vars.prefs()
+            self.ensure_link_service()
+            if not self.filepath or not os.path.isfile(self.filepath):
+                self.report({'ERROR'}, f"No session file to replay!")
+            elif not LINK_SERVICE.replay_session(self.filepath, speed=prefs.datalink_replay_speed):
+                self.report({'ERROR'}, f"Unable to replay session: {self.filepath}")
+            return {'FINISHED'}
+
+        elif self.param == "STOP_REPLAY":
+            if LINK_SERVICE:
+                LINK_SERVICE.stop_replay()
+            return {'FINISHED'}
+
+        elif self.param == "EXPORT_TELEMETRY":
+            if LINK_SERVICE:
+                file_path = LINK_SERVICE.export_telemetry()
+                if file_path:
+                    self.report({'INFO'}, f"Telemetry exported: {file_path}")
+                else:
+                    self.report({'ERROR'}, f"Unable to export telemetry!")
+            return {'FINISHED'}
+
+        elif self.param == "RESET_TELEMETRY":
+            if LINK_SERVICE:
+                LINK_SERVICE.telemetry.reset()
+            return {'FINISHED'}
+
         return {'FINISHED'}
 
     def prep_local_files(self):
@@ -4989,6 +6841,13 @@ class CCICDataLink(bpy.types.Operator):
                 return
             LINK_SERVICE.service_start(link_ip, BLENDER_PORT)
 
+    def ensure_link_service(self):
+        global LINK_SERVICE
+
+        if not LINK_SERVICE:
+            LINK_SERVICE = LinkService()
+            LINK_SERVICE.changed.connect(link_state_update)
+
     def link_stop(self):
         global LINK_SERVICE
 
@@ -5065,6 +6924,24 @@ class CCICDataLink(bpy.types.Operator):
         elif properties.param == "SHOW_PROJECT_FILES":
             return "Open the project folder"
 
+        elif properties.param == "RECORD_SESSION":
+            return "Record every DataLink message received and sent to a session file in the captures folder of the project folder"
+
+        elif properties.param == "STOP_RECORDING":
+            return "Stop recording the DataLink session"
+
+        elif properties.param == "REPLAY_SESSION":
+            return "Replay the messages received in a recorded DataLink session, without CC4/iC8 running"
+
+        elif properties.param == "STOP_REPLAY":
+            return "Stop replaying the DataLink session"
+
+        elif properties.param == "EXPORT_TELEMETRY":
+            return "Export the DataLink telemetry as JSON and CSV to the Telemetry folder of the project folder"
+
+        elif properties.param == "RESET_TELEMETRY":
+            return "Reset the DataLink telemetry counters and histograms"
+
         return ""
 
 
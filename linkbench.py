@@ -0,0 +1,164 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+# Headless DataLink benchmark.
+#
+# Replays a session recorded by the DataLink (Record Session) from the linkserver
+# stand-in into this Blender, driving the LinkService loop directly (there is no
+# event loop to run the timers in background mode), and reports the frame rate, the decode/store/write times
+# and the memory used, and how fast the session's full pose frames decode.
+# The blend file should contain the actors of the session:
+#
+#   blender -b scene.blend --addons <addon> --python-expr "import <addon>.linkbench as b; b.main()" -- \
+#           <session.bin> [--rate fps] [--loops n] [--output results.json] [--min-fps fps]
+
+import bpy
+import argparse, json, sys, threading, time
+from . import link, linkserver, linkutils, utils, vars
+
+BENCH_TIMEOUT = 600.0
+BENCH_MAX_SLEEP = 0.005
+BENCH_TIMERS = ["FRAME", "DECODE", "REPOSITION", "LAYER_UPDATE", "SELECT_RIGS", "STORE_CACHE", "WRITE"]
+BENCH_DECODE_REPEAT = 10
+BENCH_DECODE_OP_CODES = [ linkutils.OpCodes.POSE_FRAME, linkutils.OpCodes.SEQUENCE_FRAME ]
+
+
+def get_peak_memory():
+    """Peak resident memory of this process in MB, or None if it can't be measured here."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def get_timer_results():
+    results = {}
+    for name in BENCH_TIMERS:
+        if name in utils.LOG_TIMER:
+            start, total, count = utils.LOG_TIMER[name]
+            results[name] = {
+                "total_ms": total * 1000.0,
+                "count": count,
+                "average_ms": total * 1000.0 / count if count else 0.0,
+            }
+    return results
+
+
+def benchmark_decode(messages, repeat=BENCH_DECODE_REPEAT):
+    """Decodes the full pose frames of the session with linkutils.decode_pose_frame, best of repeat."""
+    frames = [ payload for t, op_code, payload in messages if op_code in BENCH_DECODE_OP_CODES and payload ]
+    if not frames:
+        return None
+    best = None
+    for r in range(0, repeat):
+        start = time.perf_counter()
+        for frame_data in frames:
+            linkutils.decode_pose_frame(frame_data)
+        duration = time.perf_counter() - start
+        best = duration if best is None or duration < best else best
+    return {
+        "frames": len(frames),
+        "repeat": repeat,
+        "average_us": best * 1000000.0 / len(frames),
+    }
+
+
+def run(session_path, rate=0.0, loops=1, timeout=BENCH_TIMEOUT):
+    """Replays the session into the DataLink of this Blender and returns the benchmark results."""
+    log = linkutils.SessionLog(session_path)
+    messages = log.received()
+    server = linkserver.StandInServer(port=0)
+    port = server.listen()
+    replay = {}
+
+    def serve():
+        try:
+            if server.accept():
+                replay.update(server.replay(messages, rate=rate, loops=loops))
+        finally:
+            server.close()
+
+    thread = threading.Thread(target=serve, name="DataLinkStandIn", daemon=True)
+    thread.start()
+
+    if not link.LINK_SERVICE:
+        link.LINK_SERVICE = link.LinkService()
+    service: link.LinkService = link.LINK_SERVICE
+    service.telemetry.reset()
+    memory_start = get_peak_memory()
+    start_time = time.perf_counter()
+    deadline = start_time + timeout
+    service.service_start("127.0.0.1", port)
+
+    # drive the service loop until the stand-in has finished and the client has disconnected
+    while time.perf_counter() < deadline:
+        interval = service.loop()
+        if interval is None or (not thread.is_alive() and not service.is_connected):
+            break
+        if interval:
+            time.sleep(min(interval, BENCH_MAX_SLEEP))
+    duration = time.perf_counter() - start_time
+    if service.is_connected or service.is_connecting:
+        service.service_disconnect()
+    thread.join(1.0)
+    decode = benchmark_decode(messages)
+    messages = None
+    log.close()
+
+    results = {
+        "session": session_path,
+        "version": vars.VERSION_STRING,
+        "blender": bpy.app.version_string,
+        "rate": rate,
+        "loops": loops,
+        "duration": duration,
+        "frames": replay.get("frames", 0),
+        "fps": replay.get("fps", 0.0),
+        "replay": replay,
+        "timers": get_timer_results(),
+        "decode": decode,
+        "peak_memory_mb": get_peak_memory(),
+        "start_memory_mb": memory_start,
+        "telemetry": service.telemetry.to_json(),
+    }
+    return results
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(description="Headless DataLink benchmark")
+    parser.add_argument("session", help="recorded session file (Record Session: captures/session_<time>.bin)")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="sequence frames per second, 0 (default) for as fast as Blender can take them")
+    parser.add_argument("--loops", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=BENCH_TIMEOUT)
+    parser.add_argument("--output", default="", help="write the results to this json file")
+    parser.add_argument("--min-fps", type=float, default=0.0,
+                        help="exit with an error if the replay is slower than this")
+    args = parser.parse_args(argv)
+
+    results = run(args.session, rate=args.rate, loops=args.loops, timeout=args.timeout)
+    text = json.dumps(results, indent=4)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text)
+    if args.min_fps and results["fps"] < args.min_fps:
+        print(f"DataLink benchmark too slow: {results['fps']:.1f} fps < {args.min_fps:.1f} fps")
+        sys.exit(1)
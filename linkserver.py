@@ -0,0 +1,323 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+# Stand-in for the CC4/iClone DataLink server.
+#
+# Speaks enough of the DataLink protocol (HELLO, actor templates, live sequences,
+# lighting, camera and frame sync) to replay recorded sessions into Blender
+# without any Reallusion software running. Like linkutils, nothing in here
+# touches bpy, so it can also be run on its own:
+#
+#   python linkserver.py <session.bin> [--port 9333] [--rate fps] [--loops n]
+#
+# Sessions are recorded by the DataLink (Record Session) as captures/session_<time>.bin
+
+import json, select, socket, sys, time, argparse
+
+try:
+    from . import linkutils
+except ImportError:
+    import linkutils
+
+OpCodes = linkutils.OpCodes
+
+DEFAULT_PORT = 9333
+ACCEPT_TIMEOUT = 60.0
+HELLO_TIMEOUT = 10.0
+END_TIMEOUT = 30.0
+FRAME_OP_CODES = [ OpCodes.SEQUENCE_FRAME, OpCodes.SEQUENCE_DELTA, OpCodes.SEQUENCE_COMPACT,
+                   OpCodes.SEQUENCE_FRAMES ]
+
+
+def get_frame(payload):
+    """Frame number of a (pose or sequence) frame payload."""
+    return linkutils.HEADER.unpack_from(payload, 0)[1]
+
+
+def get_frames(op_code, payload):
+    """Frame numbers in a (pose or sequence) frame or batch of frames payload."""
+    if op_code == OpCodes.SEQUENCE_FRAMES:
+        first_frame, num_frames = linkutils.get_batch_frames(payload)
+        return range(first_frame, first_frame + num_frames)
+    return [ get_frame(payload) ]
+
+
+class NullSink():
+    """Discards FILE messages sent to the stand-in."""
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        pass
+
+
+class StandInServer():
+    """Pretends to be the CC4/iClone DataLink server for one Blender client.
+
+       Replies to the client's HELLO, then replays the messages of a recorded session,
+       pacing the sequence frames at the recorded times, a fixed rate,
+       or as fast as the client's acks (flow control credit) allow.
+    """
+    host: str = "127.0.0.1"
+    port: int = DEFAULT_PORT
+    app: str = "iClone"
+    version: list = None
+    plugin: str = None
+    path: str = ""
+    server_sock: socket.socket = None
+    sock: socket.socket = None
+    reader: linkutils.MessageReader = None
+    flow: linkutils.FlowControl = None
+    client_hello: dict = None
+    # op_code: count of the messages received from the client
+    received: dict = None
+    acks: int = 0
+    is_connected: bool = False
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, app="iClone", version=(8, 5, 0),
+                       plugin=None, path=""):
+        self.host = host
+        self.port = port
+        self.app = app
+        self.version = list(version)
+        self.plugin = plugin
+        self.path = path
+        self.flow = linkutils.FlowControl()
+        self.received = {}
+
+    def listen(self):
+        """Starts listening. With port 0 a free port is chosen, see self.port"""
+        self.server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_sock.bind((self.host, self.port))
+        self.server_sock.listen(1)
+        self.port = self.server_sock.getsockname()[1]
+        return self.port
+
+    def accept(self, timeout=ACCEPT_TIMEOUT):
+        """Waits for the client to connect and exchanges HELLOs. Returns True if connected."""
+        self.server_sock.settimeout(timeout)
+        try:
+            self.sock, address = self.server_sock.accept()
+        except socket.timeout:
+            return False
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = linkutils.MessageReader(self.sock, lambda remote_id: NullSink())
+        self.is_connected = True
+        deadline = time.perf_counter() + HELLO_TIMEOUT
+        while self.is_connected and not self.client_hello and time.perf_counter() < deadline:
+            self.poll(0.1)
+        return self.client_hello is not None
+
+    def close(self):
+        if self.sock:
+            try:
+                self.send(OpCodes.DISCONNECT)
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+        if self.server_sock:
+            self.server_sock.close()
+            self.server_sock = None
+        self.is_connected = False
+
+    def send(self, op_code, data=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.sock.sendall(linkutils.frame_message(op_code, bytes(data) if data else None))
+
+    def send_json(self, op_code, json_data):
+        self.send(op_code, json.dumps(json_data))
+
+    def send_hello(self):
+        # present the client's own add-on version as the plug-in version, so it is always compatible
+        plugin = self.plugin or self.client_hello.get("Addon", "")
+        self.send_json(OpCodes.HELLO, {
+            "Application": self.app,
+            "Version": self.version,
+            "Path": self.path,
+            "Exe": "",
+            "Plugin": plugin,
+        })
+
+    def poll(self, timeout=0.0):
+        """Receives and handles whatever the client has sent, waiting up to timeout for it."""
+        if not self.is_connected:
+            return
+        r, w, x = select.select([self.sock], [], [], timeout)
+        if not r:
+            return
+        try:
+            while self.reader.has_data():
+                message = self.reader.read()
+                if not message:
+                    break
+                self.parse(*message)
+        except (ConnectionResetError, OSError):
+            self.is_connected = False
+
+    def parse(self, op_code, data):
+        self.received[op_code] = self.received.get(op_code, 0) + 1
+        if op_code == OpCodes.HELLO:
+            self.client_hello = json.loads(str(data, "utf-8")) if data else {}
+            self.send_hello()
+        elif op_code == OpCodes.SEQUENCE_ACK:
+            ack = json.loads(str(data, "utf-8"))
+            self.flow.acknowledge(ack["frame"], ack.get("credit"), batch=ack.get("batch"))
+            self.acks += 1
+        elif op_code == OpCodes.DISCONNECT or op_code == OpCodes.STOP:
+            self.is_connected = False
+
+    def send_camera_sync(self, loc, rot, pivot, lens=50.0):
+        """loc & pivot in cm, rot as a (w, x, y, z) quaternion, as CC/iC sends them."""
+        self.send_json(OpCodes.CAMERA_SYNC, {
+            "view_camera": {
+                "link_id": "0",
+                "name": "Viewport Camera",
+                "loc": list(loc),
+                "rot": list(rot),
+                "sca": [1, 1, 1],
+                "fov": 0,
+                "lens": lens,
+            },
+            "pivot": list(pivot),
+        })
+
+    def send_frame_sync(self, start_frame, end_frame, current_frame, fps=60):
+        self.send_json(OpCodes.FRAME_SYNC, {
+            "fps": fps,
+            "start_time": start_frame / fps,
+            "end_time": end_frame / fps,
+            "current_time": current_frame / fps,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+            "current_frame": current_frame,
+        })
+
+    def wait_for_credit(self):
+        while self.is_connected:
+            if self.flow.can_send():
+                return True
+            self.poll(0.001)
+        return False
+
+    def replay(self, messages: list, rate=None, loops=1):
+        """Replays (time, op_code, payload) messages to the client.
+           rate None: at the recorded times, rate > 0: sequence frames at rate fps,
+           rate 0: sequence frames as fast as the client's flow control credit allows.
+           Returns the replay statistics."""
+        frames_sent = 0
+        frame_bytes = 0
+        # time spent sending (not waiting for the client to finish up)
+        duration = 0.0
+        for loop in range(0, loops):
+            self.flow.reset()
+            loop_start = time.perf_counter()
+            frame_index = 0
+            last_frame = None
+            for t, op_code, payload in messages:
+                if not self.is_connected:
+                    break
+                if op_code in FRAME_OP_CODES:
+                    if rate is None:
+                        self.wait_until(loop_start + t)
+                    elif rate > 0:
+                        self.wait_until(loop_start + frame_index / rate)
+                    else:
+                        self.wait_for_credit()
+                    frames = get_frames(op_code, payload)
+                    for last_frame in frames:
+                        self.flow.sent(last_frame)
+                    frame_index += len(frames)
+                    frames_sent += len(frames)
+                    frame_bytes += len(payload)
+                elif op_code == OpCodes.SEQUENCE_END:
+                    # let the client catch up with the last frame first
+                    self.wait_for_ack(last_frame)
+                self.send(op_code, payload)
+                self.poll(0.0)
+            duration += time.perf_counter() - loop_start
+            # the client writes the actions on sequence end, wait for it before the next loop
+            self.wait_for_idle()
+        return {
+            "frames": frames_sent,
+            "bytes": frame_bytes,
+            "duration": duration,
+            "fps": frames_sent / duration if duration > 0 else 0.0,
+            "acks": self.acks,
+            "rtt_ms": self.flow.srtt * 1000.0,
+            "window": self.flow.window,
+            "received": { OpCodes(op_code).name: count for op_code, count in self.received.items()
+                          if op_code in OpCodes._value2member_map_ },
+        }
+
+    def wait_until(self, deadline):
+        while self.is_connected:
+            delay = deadline - time.perf_counter()
+            if delay <= 0:
+                return
+            self.poll(min(delay, 0.01))
+
+    def wait_for_ack(self, frame, timeout=END_TIMEOUT):
+        deadline = time.perf_counter() + timeout
+        while (frame is not None and self.is_connected and
+               self.flow.ack_frame != frame and time.perf_counter() < deadline):
+            self.poll(0.01)
+
+    def wait_for_idle(self, idle=0.5, timeout=END_TIMEOUT):
+        """Waits until the client has been quiet for idle seconds."""
+        deadline = time.perf_counter() + timeout
+        last_count = -1
+        while self.is_connected and time.perf_counter() < deadline:
+            count = sum(self.received.values())
+            if count == last_count:
+                return
+            last_count = count
+            self.poll(idle)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="DataLink stand-in server: replays a recorded session into Blender")
+    parser.add_argument("session", help="recorded session file (Record Session: captures/session_<time>.bin)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="sequence frames per second, 0 for as fast as the client can take them "
+                             "(default: the recorded timing)")
+    parser.add_argument("--loops", type=int, default=1)
+    parser.add_argument("--app", default="iClone", choices=["iClone", "Character Creator"])
+    args = parser.parse_args(argv)
+
+    with linkutils.SessionLog(args.session) as log:
+        server = StandInServer(args.host, args.port, app=args.app)
+        server.listen()
+        print(f"Listening on {args.host}:{server.port}")
+        if not server.accept():
+            print("No DataLink client connected")
+            server.close()
+            return 1
+        print(f"Connected: {server.client_hello.get('Application')} {server.client_hello.get('Version')}")
+        stats = server.replay(log.received(), rate=args.rate, loops=args.loops)
+        server.close()
+    print(json.dumps(stats, indent=4))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
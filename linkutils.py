@@ -0,0 +1,2394 @@
+# Copyright (C) 2021 Victor Soupday
+# This file is part of CC/iC Blender Tools <https://github.com/soupday/cc_blender_tools>
+#
+# CC/iC Blender Tools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# CC/iC Blender Tools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
+
+# DataLink wire format helpers.
+#
+# Nothing in here touches bpy, so this module can also be loaded on its own
+# (outside of Blender) for benchmarking and testing the DataLink protocol.
+
+import struct, time, select, socket, threading, queue, os, zlib, tarfile, shutil, hashlib, math, json, csv, mmap
+from enum import IntEnum
+from functools import lru_cache
+import numpy as np
+
+HEADER = struct.Struct("!II")
+UINT = struct.Struct("!I")
+TRANSFORM = struct.Struct("!10f")
+LIGHT = struct.Struct("!?fffffffff")
+CAMERA = struct.Struct("!f?fffffff")
+# camera sync: loc x, y, z, rot x, y, z, w, pivot x, y, z, focal length
+CAMERA_RECORD = struct.Struct("!11f")
+TRANSFORM_SIZE = 10
+MAX_CHUNK_SIZE = 32768
+# two zero blocks end a tar archive
+TAR_END_SIZE = 1024
+FILE_CACHE_SIZE = 2048 * 1024 * 1024
+# op code flag bit for zlib compressed messages
+COMPRESSED = 0x80000000
+COMPRESS_THRESHOLD = 1024
+DELTA_KEYFRAME_INTERVAL = 30
+DELTA_EPSILON = 1.0e-5
+# compact encoding ranges are this much larger than the actor's extent when the template is sent
+COMPACT_MARGIN = 2.0
+FLOW_MIN_WINDOW = 1
+FLOW_MAX_WINDOW = 30
+FLOW_START_WINDOW = 5
+FLOW_GAIN = 1.25
+FLOW_TARGET_LATENCY = 0.25
+FLOW_MIN_TIMEOUT = 1.0
+FLOW_MIN_RTT_EXPIRY = 10.0
+# batched frames: at most this many, about as many as the receiver processes in FLOW_BATCH_TIME
+FLOW_MAX_BATCH = 8
+FLOW_BATCH_TIME = 1 / 30
+SYNC_RATE = 20
+SYNC_THRESHOLD = 0.001
+# material diffs: send once the materials have been left alone this long (or at least this often)
+MATERIAL_DEBOUNCE = 0.15
+MATERIAL_MAX_WAIT = 0.5
+MATERIAL_TOLERANCE = 1e-6
+# mesh deltas: smallest vertex movement sent in a sparse delta
+MESH_DELTA_TOLERANCE = 1e-6
+TELEMETRY_SAMPLES = 1024
+# histogram bin edges (ms)
+TELEMETRY_BINS = [0, 1, 2, 5, 10, 20, 33, 50, 100, 200, 500, 1000]
+
+
+class OpCodes(IntEnum):
+    NONE = 0
+    HELLO = 1
+    PING = 2
+    STOP = 10
+    DISCONNECT = 11
+    DEBUG = 15
+    NOTIFY = 50
+    INVALID = 55
+    SAVE = 60
+    FILE = 75
+    FILE_MANIFEST = 76
+    FILE_REQUEST = 77
+    FPS = 80
+    MORPH = 90
+    MORPH_UPDATE = 91
+    MESH = 92
+    MESH_DELTA = 93
+    MESH_DELTA_ACK = 94
+    REPLACE_MESH = 95
+    MATERIALS = 96
+    MATERIALS_DIFF = 97
+    CHARACTER = 100
+    CHARACTER_UPDATE = 101
+    PROP = 102
+    STAGING = 104
+    LIGHTS_UPDATE = 105
+    CAMERA = 106
+    CAMERA_UPDATE = 107
+    UPDATE_REPLACE = 108
+    RIGIFY = 110
+    TEMPLATE = 200
+    POSE = 210
+    POSE_FRAME = 211
+    POSE_FRAME_COMPACT = 212
+    SEQUENCE = 220
+    SEQUENCE_FRAME = 221
+    SEQUENCE_END = 222
+    SEQUENCE_ACK = 223
+    SEQUENCE_DELTA = 224
+    SEQUENCE_COMPACT = 225
+    SEQUENCE_FRAMES = 226
+    LIGHTING = 230
+    CAMERA_SYNC = 231
+    FRAME_SYNC = 232
+    CAMERA_SYNC_COMPACT = 233
+    MOTION = 240
+    MOTION_CURVES = 241
+    REQUEST = 250
+    CONFIRM = 251
+
+
+def op_code_name(op_code):
+    """The op code's name, or its number if it isn't one of ours."""
+    if op_code in OpCodes._value2member_map_:
+        return OpCodes(op_code).name
+    return str(op_code)
+
+
+@lru_cache(maxsize=64)
+def float_block(count) -> struct.Struct:
+    """Precompiled big-endian float32 block of count values."""
+    return struct.Struct(f"!{count}f")
+
+
+def unpack_floats(buffer, offset, count):
+    if count <= 0:
+        return (), offset
+    block = float_block(count)
+    return block.unpack_from(buffer, offset), offset + block.size
+
+
+def pack_string(s) -> bytearray:
+    buffer = bytearray()
+    buffer += UINT.pack(len(s))
+    buffer += bytes(s, encoding="utf-8")
+    return buffer
+
+
+def unpack_string(buffer, offset=0):
+    length = UINT.unpack_from(buffer, offset)[0]
+    offset += 4
+    # str() decodes bytes, bytearrays and memoryview slices alike
+    string = str(buffer[offset:offset+length], "utf-8")
+    offset += length
+    return offset, string
+
+
+def decode_pose_frame_header(pose_data):
+    count, frame = HEADER.unpack_from(pose_data, 0)
+    return count, frame
+
+
+def decode_actor_block(view, offset):
+    """Unpacks one actor's block of a pose frame. Returns actor_frame, offset"""
+    offset, name = unpack_string(view, offset)
+    offset, actor_type = unpack_string(view, offset)
+    offset, link_id = unpack_string(view, offset)
+    actor_frame = {
+        "name": name,
+        "type": actor_type,
+        "link_id": link_id,
+        "transform": (),
+        "bones": (),
+        "expressions": (),
+        "visemes": (),
+    }
+    offset = decode_actor_values(view, offset, actor_frame)
+    return actor_frame, offset
+
+
+def decode_actor_values(view, offset, actor_frame):
+    actor_type = actor_frame["type"]
+    actor_frame["transform"] = TRANSFORM.unpack_from(view, offset)
+    offset += TRANSFORM.size
+    if actor_type == "PROP" or actor_type == "AVATAR":
+        num_bones = UINT.unpack_from(view, offset)[0]
+        offset += UINT.size
+        actor_frame["bones"], offset = unpack_floats(view, offset, num_bones * TRANSFORM_SIZE)
+        num_weights = UINT.unpack_from(view, offset)[0]
+        offset += UINT.size
+        actor_frame["expressions"], offset = unpack_floats(view, offset, num_weights)
+        num_weights = UINT.unpack_from(view, offset)[0]
+        offset += UINT.size
+        actor_frame["visemes"], offset = unpack_floats(view, offset, num_weights)
+    elif actor_type == "LIGHT":
+        actor_frame["light"] = LIGHT.unpack_from(view, offset)
+        offset += LIGHT.size
+    elif actor_type == "CAMERA":
+        actor_frame["camera"] = CAMERA.unpack_from(view, offset)
+        offset += CAMERA.size
+    return offset
+
+
+def decode_pose_frame(pose_data):
+    """Unpacks a pose frame into raw per actor value blocks, without applying anything.
+       Each actor's bone and shape key weight blocks are unpacked in one call each.
+
+       Returns: frame, [ { name, type, link_id, transform, bones, expressions, visemes, light, camera } ]
+    """
+    view = memoryview(pose_data)
+    count, frame = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    actor_frames = []
+    for i in range(0, count):
+        actor_frame, offset = decode_actor_block(view, offset)
+        actor_frames.append(actor_frame)
+    view.release()
+    return frame, actor_frames
+
+
+def encode_pose_frame(frame, actor_blocks):
+    """Assembles a full pose frame from actor blocks:
+
+       { "header": packed name, type and link_id,
+         "link_id": link_id,
+         "full": the actor's packed pose values,
+         "transforms": (1 + N, 10) root then bone (and mesh) transforms, or None,
+         "transform_counts": [ number of transforms in each block after the root ],
+         "weights": (M,) shape key weights, or None,
+         "weight_counts": [ number of weights in each block ],
+         "quantise": the actor's compact encoding ranges, or None }
+    """
+    parts = [ HEADER.pack(len(actor_blocks), frame) ]
+    for block in actor_blocks:
+        parts.append(block["header"])
+        parts.append(block["full"])
+    return b"".join(parts)
+
+
+# Batched frames (OpCodes.SEQUENCE_FRAMES):
+#
+#   header: count, first frame, then num frames
+#   per actor: name, type, link_id (once for the whole batch)
+#   per frame, per actor: the actor's pose frame values, exactly as in a SEQUENCE_FRAME
+#
+# The frames are consecutive: first frame, first frame + 1, ...
+# The receiver acknowledges the batch with a single ack of the last frame.
+
+def encode_pose_frames(first_frame, frames_blocks: list):
+    """Assembles a batch of consecutive pose frames from each frame's actor blocks (as for encode_pose_frame).
+       All frames must have the same actors in the same order."""
+    actor_blocks = frames_blocks[0]
+    parts = [ HEADER.pack(len(actor_blocks), first_frame), UINT.pack(len(frames_blocks)) ]
+    for block in actor_blocks:
+        parts.append(block["header"])
+    for actor_blocks in frames_blocks:
+        for block in actor_blocks:
+            parts.append(block["full"])
+    return b"".join(parts)
+
+
+def decode_pose_frames(batch_data):
+    """Unpacks a batch of pose frames. Returns [ (frame, actor_frames) ], as decode_pose_frame for each frame."""
+    view = memoryview(batch_data)
+    count, first_frame = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    num_frames = UINT.unpack_from(view, offset)[0]
+    offset += UINT.size
+    headers = []
+    for i in range(0, count):
+        offset, name = unpack_string(view, offset)
+        offset, actor_type = unpack_string(view, offset)
+        offset, link_id = unpack_string(view, offset)
+        headers.append((name, actor_type, link_id))
+    frames = []
+    for i in range(0, num_frames):
+        actor_frames = []
+        for name, actor_type, link_id in headers:
+            actor_frame = {
+                "name": name,
+                "type": actor_type,
+                "link_id": link_id,
+                "transform": (),
+                "bones": (),
+                "expressions": (),
+                "visemes": (),
+            }
+            offset = decode_actor_values(view, offset, actor_frame)
+            actor_frames.append(actor_frame)
+        frames.append((first_frame + i, actor_frames))
+    view.release()
+    return frames
+
+
+def get_batch_frames(batch_data):
+    """First frame and number of frames of a batch of pose frames."""
+    first_frame = HEADER.unpack_from(batch_data, 0)[1]
+    num_frames = UINT.unpack_from(batch_data, HEADER.size)[0]
+    return first_frame, num_frames
+
+
+# Delta frames (OpCodes.SEQUENCE_DELTA):
+#
+#   header: count, frame
+#   per actor: name, type, link_id, then a mode byte:
+#     DELTA_FULL: the actor's full pose frame values, exactly as in a SEQUENCE_FRAME
+#     DELTA_CHANGES: num transforms, num weights,
+#                    num changed transforms, uint16 indices, 10 floats per changed transform,
+#                    num changed weights, uint16 indices, 1 float per changed weight
+#
+# Transforms are the root transform followed by the bone (and mesh) transforms,
+# weights are all the shape key weights in order (expressions then visemes).
+# Only the actors with transforms and weights (props and avatars) use DELTA_CHANGES.
+
+DELTA_FULL = 0
+DELTA_CHANGES = 1
+DELTA_MODE = struct.Struct("!B")
+DELTA_COUNTS = struct.Struct("!II")
+DELTA_CHANGED_KEYS = ("changed_bones", "changed_expressions", "changed_visemes")
+
+
+class DeltaEncoder():
+    """Encodes pose frames as changes from the last values sent for each actor,
+       with a full keyframe every keyframe_interval frames, or whenever an actor's layout changes."""
+    keyframe_interval: int = DELTA_KEYFRAME_INTERVAL
+    epsilon: float = DELTA_EPSILON
+    frame_count: int = 0
+    sent: dict = None
+
+    def __init__(self, keyframe_interval=DELTA_KEYFRAME_INTERVAL, epsilon=DELTA_EPSILON):
+        self.keyframe_interval = keyframe_interval
+        self.epsilon = epsilon
+        self.reset()
+
+    def reset(self):
+        self.frame_count = 0
+        # link_id: [transforms, weights] as last sent
+        self.sent = {}
+
+    def encode(self, frame, actor_blocks):
+        keyframe = self.keyframe_interval <= 1 or self.frame_count % self.keyframe_interval == 0
+        self.frame_count += 1
+        parts = [ HEADER.pack(len(actor_blocks), frame) ]
+        for block in actor_blocks:
+            link_id = block["link_id"]
+            transforms = block["transforms"]
+            weights = block["weights"]
+            parts.append(block["header"])
+            sent = self.sent.get(link_id)
+            if (keyframe or transforms is None or sent is None or
+                sent[0].shape != transforms.shape or sent[1].shape != weights.shape or
+                len(transforms) > 0xFFFF or len(weights) > 0xFFFF):
+                parts.append(DELTA_MODE.pack(DELTA_FULL))
+                parts.append(block["full"])
+                if transforms is not None:
+                    self.sent[link_id] = [np.array(transforms, dtype=np.float32),
+                                          np.array(weights, dtype=np.float32)]
+            else:
+                parts.append(DELTA_MODE.pack(DELTA_CHANGES))
+                parts.append(DELTA_COUNTS.pack(len(transforms), len(weights)))
+                # compare against what was last sent (not the last frame) so small changes can't drift
+                changed = np.flatnonzero(np.any(np.abs(transforms - sent[0]) > self.epsilon, axis=1))
+                parts.append(UINT.pack(len(changed)))
+                parts.append(changed.astype(">u2").tobytes())
+                parts.append(transforms[changed].astype(">f4").tobytes())
+                sent[0][changed] = transforms[changed]
+                changed = np.flatnonzero(np.abs(weights - sent[1]) > self.epsilon)
+                parts.append(UINT.pack(len(changed)))
+                parts.append(changed.astype(">u2").tobytes())
+                parts.append(weights[changed].astype(">f4").tobytes())
+                sent[1][changed] = weights[changed]
+        return b"".join(parts)
+
+
+class DeltaDecoder():
+    """Rebuilds full (incoming) pose frames from delta frames.
+
+       Decoded actor frames are the same as from decode_pose_frame, plus the
+       indices of the bones, expressions and visemes that changed
+       ("changed_bones", "changed_expressions", "changed_visemes"), which are None for full blocks.
+    """
+    state: dict = None
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # link_id: [transforms, weights, num_expressions]
+        self.state = {}
+
+    def decode(self, delta_data):
+        view = memoryview(delta_data)
+        count, frame = HEADER.unpack_from(view, 0)
+        offset = HEADER.size
+        actor_frames = []
+        for i in range(0, count):
+            offset, name = unpack_string(view, offset)
+            offset, actor_type = unpack_string(view, offset)
+            offset, link_id = unpack_string(view, offset)
+            mode = DELTA_MODE.unpack_from(view, offset)[0]
+            offset += DELTA_MODE.size
+            actor_frame = {
+                "name": name,
+                "type": actor_type,
+                "link_id": link_id,
+                "transform": (),
+                "bones": (),
+                "expressions": (),
+                "visemes": (),
+                "changed_bones": None,
+                "changed_expressions": None,
+                "changed_visemes": None,
+            }
+            if mode == DELTA_FULL:
+                offset = decode_actor_values(view, offset, actor_frame)
+                if actor_type == "PROP" or actor_type == "AVATAR":
+                    transforms = np.array(actor_frame["transform"] + actor_frame["bones"], dtype=np.float32)
+                    weights = np.array(actor_frame["expressions"] + actor_frame["visemes"], dtype=np.float32)
+                    self.state[link_id] = [transforms.reshape(-1, TRANSFORM_SIZE), weights,
+                                           len(actor_frame["expressions"])]
+            else:
+                if link_id not in self.state:
+                    raise ValueError(f"Delta frame for actor without a keyframe: {name} / {link_id}")
+                transforms, weights, num_expressions = self.state[link_id]
+                num_transforms, num_weights = DELTA_COUNTS.unpack_from(view, offset)
+                offset += DELTA_COUNTS.size
+                if num_transforms != len(transforms) or num_weights != len(weights):
+                    raise ValueError(f"Delta frame does not match keyframe layout: {name} / {link_id}")
+                num_changed = UINT.unpack_from(view, offset)[0]
+                offset += UINT.size
+                changed = np.frombuffer(view, dtype=">u2", count=num_changed, offset=offset)
+                offset += num_changed * 2
+                values = np.frombuffer(view, dtype=">f4", count=num_changed * TRANSFORM_SIZE, offset=offset)
+                offset += num_changed * TRANSFORM_SIZE * 4
+                transforms[changed] = values.reshape(-1, TRANSFORM_SIZE)
+                actor_frame["changed_bones"] = [ int(i) - 1 for i in changed if i > 0 ]
+                num_changed = UINT.unpack_from(view, offset)[0]
+                offset += UINT.size
+                changed = np.frombuffer(view, dtype=">u2", count=num_changed, offset=offset)
+                offset += num_changed * 2
+                values = np.frombuffer(view, dtype=">f4", count=num_changed, offset=offset)
+                offset += num_changed * 4
+                weights[changed] = values
+                actor_frame["changed_expressions"] = [ int(i) for i in changed if i < num_expressions ]
+                actor_frame["changed_visemes"] = [ int(i) - num_expressions for i in changed if i >= num_expressions ]
+                actor_frame["transform"] = tuple(transforms[0].tolist())
+                actor_frame["bones"] = transforms[1:].ravel().tolist()
+                weight_values = weights.tolist()
+                actor_frame["expressions"] = weight_values[:num_expressions]
+                actor_frame["visemes"] = weight_values[num_expressions:]
+            actor_frames.append(actor_frame)
+        return frame, actor_frames
+
+
+def full_actor_frames(actor_frames):
+    """Drops the changed indices of delta decoded actor frames, so all their (full) values are applied,
+       e.g. when the frames before them were never applied."""
+    for actor_frame in actor_frames:
+        for key in DELTA_CHANGED_KEYS:
+            if key in actor_frame:
+                actor_frame[key] = None
+    return actor_frames
+
+
+# Compact frames (OpCodes.POSE_FRAME_COMPACT / SEQUENCE_COMPACT):
+#
+#   header: count, frame
+#   per actor: name, type, link_id, then a mode byte:
+#     COMPACT_LOSSLESS: the actor's full pose frame values, exactly as in a POSE_FRAME / SEQUENCE_FRAME
+#     COMPACT_QUANTISED: root transform (10 floats),
+#                        number of transform blocks, then for each block:
+#                            count, centre (3 floats),
+#                            translations as 3 x uint16 within +/- the template translation range of the centre,
+#                            rotations as 48 bit smallest-three quaternions,
+#                            scale bit mask (1 = differs from the root scale), 3 x float16 for each masked scale
+#                        number of weight blocks, then for each block:
+#                            count, weights as uint16 within the template weight range
+#
+# Actors without a template range, or with values outside of it, are sent lossless.
+
+COMPACT_LOSSLESS = 0
+COMPACT_QUANTISED = 1
+COMPACT_MODE = struct.Struct("!B")
+COMPACT_CENTRE = struct.Struct("!3f")
+QUAT_RANGE = 0.7071067811865476
+QUAT_BITS = 15
+QUAT_MAX = (1 << QUAT_BITS) - 1
+SCALE_TOLERANCE = 1.0e-4
+
+
+def get_compact_ranges(translations, weight_min, weight_max):
+    """Quantisation ranges for an actor's template, from its current (N, 3) bone translations."""
+    translations = np.asarray(translations, dtype=np.float64).reshape(-1, 3)
+    extent = 1.0
+    if len(translations):
+        extent = max(extent, float(np.max(np.ptp(translations, axis=0))) * 0.5 * COMPACT_MARGIN)
+    return {
+        "translation": extent,
+        "weights": [min(0.0, float(weight_min)), max(1.0, float(weight_max))],
+    }
+
+
+def pack_quaternions(q):
+    """Smallest-three packs (N, 4) quaternions into (N, 6) bytes."""
+    q = np.asarray(q, dtype=np.float64)
+    largest = np.argmax(np.abs(q), axis=1)
+    rows = np.arange(len(q))
+    # q and -q are the same rotation, so make the dropped component positive
+    q = q * np.where(q[rows, largest] < 0.0, -1.0, 1.0)[:, None]
+    keep = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    small = q[rows[:, None], keep]
+    quantised = np.rint((np.clip(small, -QUAT_RANGE, QUAT_RANGE) + QUAT_RANGE) / (2.0 * QUAT_RANGE) * QUAT_MAX).astype(np.uint64)
+    packed = ((largest.astype(np.uint64) << np.uint64(3 * QUAT_BITS)) |
+              (quantised[:, 0] << np.uint64(2 * QUAT_BITS)) |
+              (quantised[:, 1] << np.uint64(QUAT_BITS)) |
+              quantised[:, 2])
+    return packed.astype(">u8").view(np.uint8).reshape(-1, 8)[:, 2:]
+
+
+def unpack_quaternions(data, count):
+    """Unpacks count smallest-three quaternions from (count * 6) bytes into (N, 4)."""
+    raw = np.zeros((count, 8), dtype=np.uint8)
+    raw[:, 2:] = np.frombuffer(data, dtype=np.uint8, count=count * 6).reshape(count, 6)
+    packed = raw.view(">u8").reshape(count).astype(np.uint64)
+    largest = (packed >> np.uint64(3 * QUAT_BITS)).astype(np.int64) & 3
+    mask = np.uint64(QUAT_MAX)
+    small = np.stack([(packed >> np.uint64(2 * QUAT_BITS)) & mask,
+                      (packed >> np.uint64(QUAT_BITS)) & mask,
+                      packed & mask], axis=1).astype(np.float64)
+    small = small / QUAT_MAX * (2.0 * QUAT_RANGE) - QUAT_RANGE
+    q = np.empty((count, 4), dtype=np.float64)
+    rows = np.arange(count)
+    keep = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])[largest]
+    q[rows[:, None], keep] = small
+    q[rows, largest] = np.sqrt(np.maximum(0.0, 1.0 - np.sum(small * small, axis=1)))
+    return q
+
+
+def encode_compact_transforms(rows, root_scale, extent):
+    """Quantises (N, 10) transforms, or returns None if they don't fit the range."""
+    rows = np.asarray(rows, dtype=np.float64)
+    count = len(rows)
+    parts = [ UINT.pack(count) ]
+    if count == 0:
+        return parts[0]
+    translations = rows[:, 0:3]
+    centre = (translations.max(axis=0) + translations.min(axis=0)) * 0.5
+    offsets = translations - centre
+    if np.any(np.abs(offsets) > extent):
+        return None
+    parts.append(COMPACT_CENTRE.pack(*centre))
+    parts.append(np.rint((offsets + extent) / (2.0 * extent) * 65535).astype(">u2").tobytes())
+    parts.append(pack_quaternions(rows[:, 3:7]).tobytes())
+    scales = rows[:, 7:10]
+    scaled = np.any(np.abs(scales - root_scale) > SCALE_TOLERANCE * np.maximum(1.0, np.abs(root_scale)), axis=1)
+    parts.append(np.packbits(scaled).tobytes())
+    parts.append(scales[scaled].astype(">f2").tobytes())
+    return b"".join(parts)
+
+
+def decode_compact_transforms(view, offset, root_scale, extent):
+    """Returns (N, 10) transforms, offset"""
+    count = UINT.unpack_from(view, offset)[0]
+    offset += UINT.size
+    rows = np.empty((count, TRANSFORM_SIZE), dtype=np.float64)
+    if count == 0:
+        return rows, offset
+    centre = COMPACT_CENTRE.unpack_from(view, offset)
+    offset += COMPACT_CENTRE.size
+    quantised = np.frombuffer(view, dtype=">u2", count=count * 3, offset=offset).reshape(count, 3)
+    offset += count * 6
+    rows[:, 0:3] = quantised / 65535.0 * (2.0 * extent) - extent + np.array(centre)
+    rows[:, 3:7] = unpack_quaternions(view[offset:offset + count * 6], count)
+    offset += count * 6
+    mask_size = (count + 7) // 8
+    scaled = np.unpackbits(np.frombuffer(view, dtype=np.uint8, count=mask_size, offset=offset), count=count).astype(bool)
+    offset += mask_size
+    num_scaled = int(np.count_nonzero(scaled))
+    rows[:, 7:10] = root_scale
+    rows[scaled, 7:10] = np.frombuffer(view, dtype=">f2", count=num_scaled * 3, offset=offset).reshape(num_scaled, 3)
+    offset += num_scaled * 6
+    return rows, offset
+
+
+def encode_compact_weights(weights, weight_range):
+    weights = np.asarray(weights, dtype=np.float64)
+    lo, hi = weight_range
+    if np.any(weights < lo) or np.any(weights > hi):
+        return None
+    return UINT.pack(len(weights)) + np.rint((weights - lo) / (hi - lo) * 65535).astype(">u2").tobytes()
+
+
+def decode_compact_weights(view, offset, weight_range):
+    count = UINT.unpack_from(view, offset)[0]
+    offset += UINT.size
+    lo, hi = weight_range
+    quantised = np.frombuffer(view, dtype=">u2", count=count, offset=offset)
+    offset += count * 2
+    return quantised / 65535.0 * (hi - lo) + lo, offset
+
+
+def encode_compact_actor(block):
+    """Returns the quantised values of an actor block, or None if it must be sent lossless."""
+    quantise = block.get("quantise")
+    transforms = block["transforms"]
+    weights = block["weights"]
+    if not quantise or transforms is None:
+        return None
+    extent = quantise["translation"]
+    root = np.asarray(transforms[0], dtype=np.float64)
+    parts = [ TRANSFORM.pack(*root), struct.pack("!B", len(block["transform_counts"])) ]
+    start = 1
+    for count in block["transform_counts"]:
+        encoded = encode_compact_transforms(transforms[start:start + count], root[7:10], extent)
+        if encoded is None:
+            return None
+        parts.append(encoded)
+        start += count
+    parts.append(struct.pack("!B", len(block["weight_counts"])))
+    start = 0
+    for count in block["weight_counts"]:
+        encoded = encode_compact_weights(weights[start:start + count], quantise["weights"])
+        if encoded is None:
+            return None
+        parts.append(encoded)
+        start += count
+    return b"".join(parts)
+
+
+def encode_compact_pose_frame(frame, actor_blocks):
+    parts = [ HEADER.pack(len(actor_blocks), frame) ]
+    for block in actor_blocks:
+        parts.append(block["header"])
+        encoded = encode_compact_actor(block)
+        if encoded is None:
+            parts.append(COMPACT_MODE.pack(COMPACT_LOSSLESS))
+            parts.append(block["full"])
+        else:
+            parts.append(COMPACT_MODE.pack(COMPACT_QUANTISED))
+            parts.append(encoded)
+    return b"".join(parts)
+
+
+def decode_compact_pose_frame(pose_data, ranges: dict):
+    """Decodes an (incoming) compact pose frame into the same actor frames as decode_pose_frame.
+       ranges: { link_id: quantise ranges from the actor's template }"""
+    view = memoryview(pose_data)
+    count, frame = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    actor_frames = []
+    for i in range(0, count):
+        offset, name = unpack_string(view, offset)
+        offset, actor_type = unpack_string(view, offset)
+        offset, link_id = unpack_string(view, offset)
+        mode = COMPACT_MODE.unpack_from(view, offset)[0]
+        offset += COMPACT_MODE.size
+        actor_frame = {
+            "name": name,
+            "type": actor_type,
+            "link_id": link_id,
+            "transform": (),
+            "bones": (),
+            "expressions": (),
+            "visemes": (),
+        }
+        if mode == COMPACT_LOSSLESS:
+            offset = decode_actor_values(view, offset, actor_frame)
+        else:
+            quantise = ranges.get(link_id)
+            if not quantise:
+                raise ValueError(f"Compact frame for actor without quantisation ranges: {name} / {link_id}")
+            root = TRANSFORM.unpack_from(view, offset)
+            offset += TRANSFORM.size
+            actor_frame["transform"] = root
+            # the blocks map onto the bones, expressions and visemes, as in decode_actor_values
+            num_blocks = view[offset]
+            offset += 1
+            if num_blocks > 1:
+                raise ValueError(f"Compact frame with {num_blocks} transform blocks: {name} / {link_id}")
+            blocks = []
+            for b in range(0, num_blocks):
+                rows, offset = decode_compact_transforms(view, offset, root[7:10], quantise["translation"])
+                blocks.append(rows)
+            num_blocks = view[offset]
+            offset += 1
+            if num_blocks > 2:
+                raise ValueError(f"Compact frame with {num_blocks} weight blocks: {name} / {link_id}")
+            weight_blocks = []
+            for b in range(0, num_blocks):
+                weights, offset = decode_compact_weights(view, offset, quantise["weights"])
+                weight_blocks.append(weights)
+            if blocks:
+                actor_frame["bones"] = blocks[0].ravel().tolist()
+            if len(weight_blocks) > 0:
+                actor_frame["expressions"] = weight_blocks[0].tolist()
+            if len(weight_blocks) > 1:
+                actor_frame["visemes"] = weight_blocks[1].tolist()
+        actor_frames.append(actor_frame)
+    return frame, actor_frames
+
+
+def normalized_matrices_to_quaternions(R):
+    """Vectorised port of Blender's mat3_normalized_to_quat for (N, 3, 3) row major rotation matrices.
+       Returns (N, 4) quaternions as w, x, y, z."""
+    # Blender indexes mat[col][row], so mat[i][j] == R[:, j, i]
+    m00, m11, m22 = R[:, 0, 0], R[:, 1, 1], R[:, 2, 2]
+    m01, m10 = R[:, 1, 0], R[:, 0, 1]
+    m02, m20 = R[:, 2, 0], R[:, 0, 2]
+    m12, m21 = R[:, 2, 1], R[:, 1, 2]
+    q = np.empty((len(R), 4), dtype=np.float64)
+
+    case_x = (m22 < 0.0) & (m00 > m11)
+    case_y = (m22 < 0.0) & ~(m00 > m11)
+    case_z = ~(m22 < 0.0) & (m00 < -m11)
+    case_w = ~(m22 < 0.0) & ~(m00 < -m11)
+
+    def fill(mask, trace, flip, i, a, b, c):
+        if not mask.any():
+            return
+        s = 2.0 * np.sqrt(np.maximum(trace[mask], 0.0))
+        s = np.where(flip[mask], -s, s)
+        q[mask, i] = 0.25 * s
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = 1.0 / s
+        q[mask, a[0]] = a[1][mask] * s
+        q[mask, b[0]] = b[1][mask] * s
+        q[mask, c[0]] = c[1][mask] * s
+
+    no_flip = np.zeros(len(R), dtype=bool)
+    fill(case_x, 1.0 + m00 - m11 - m22, m12 < m21, 1,
+         (0, m12 - m21), (2, m01 + m10), (3, m20 + m02))
+    fill(case_y, 1.0 - m00 + m11 - m22, m20 < m02, 2,
+         (0, m20 - m02), (1, m01 + m10), (3, m12 + m21))
+    fill(case_z, 1.0 - m00 - m11 + m22, m01 < m10, 3,
+         (0, m01 - m10), (1, m20 + m02), (2, m12 + m21))
+    fill(case_w, 1.0 + m00 + m11 + m22, no_flip, 0,
+         (1, m12 - m21), (2, m20 - m02), (3, m01 - m10))
+
+    length = np.linalg.norm(q, axis=1)
+    length[length == 0.0] = 1.0
+    q /= length[:, None]
+    return q
+
+
+def decompose_matrices(matrices, translation_scale=1.0, out=None):
+    """Splits (N, 4, 4) row major matrices into DataLink transforms, matching
+       Matrix.to_translation(), to_quaternion() and to_scale().
+       Returns (N, 10) values: tx, ty, tz, rx, ry, rz, rw, sx, sy, sz"""
+    count = len(matrices)
+    if out is None:
+        out = np.empty((count, TRANSFORM_SIZE), dtype=">f4")
+    out[:, 0:3] = matrices[:, 0:3, 3] * translation_scale
+    out[:, 7:10] = matrices_to_scales(matrices)
+    q = matrices_to_quaternions(matrices)
+    out[:, 3:6] = q[:, 1:4]
+    out[:, 6] = q[:, 0]
+    return out
+
+
+def matrices_to_scales(matrices):
+    """Matrix.to_scale() of (N, 3+, 3+) row major matrices: the lengths of the rotation columns."""
+    return np.linalg.norm(matrices[:, 0:3, 0:3], axis=1)
+
+
+def matrices_to_quaternions(matrices):
+    """Matrix.to_quaternion() of (N, 3+, 3+) row major matrices, as (N, 4) w, x, y, z."""
+    R = matrices[:, 0:3, 0:3]
+    scale = np.linalg.norm(R, axis=1)
+    safe_scale = np.where(scale == 0.0, 1.0, scale)
+    N = R / safe_scale[:, None, :]
+    # negative scaled matrices are negated before conversion (as in mat3_normalized_to_quat_with_checks)
+    negative = np.linalg.det(N) < 0.0
+    N[negative] *= -1.0
+    return normalized_matrices_to_quaternions(N)
+
+
+def quaternions_to_matrices(q):
+    """Port of Blender's quat_to_mat3 for (N, 4) w, x, y, z quaternions. Returns (N, 3, 3) row major."""
+    q = q * np.sqrt(2.0)
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    R = np.empty((len(q), 3, 3), dtype=np.float64)
+    R[:, 0, 0] = 1.0 - y * y - z * z
+    R[:, 1, 0] = w * z + x * y
+    R[:, 2, 0] = -w * y + x * z
+    R[:, 0, 1] = -w * z + x * y
+    R[:, 1, 1] = 1.0 - x * x - z * z
+    R[:, 2, 1] = w * x + y * z
+    R[:, 0, 2] = w * y + x * z
+    R[:, 1, 2] = -w * x + y * z
+    R[:, 2, 2] = 1.0 - x * x - y * y
+    return R
+
+
+# Blender's RotOrderInfo: axis order and parity
+EULER_ORDERS = {
+    "XYZ": ((0, 1, 2), False),
+    "XZY": ((0, 2, 1), True),
+    "YXZ": ((1, 0, 2), True),
+    "YZX": ((1, 2, 0), False),
+    "ZXY": ((2, 0, 1), False),
+    "ZYX": ((2, 1, 0), True),
+}
+
+
+def normalized_matrices_to_eulers(R, order="XYZ"):
+    """Vectorised port of Blender's mat3_normalized_to_eulO for (N, 3, 3) row major rotation matrices.
+       Of the two possible solutions, the one with the smallest rotation sum is returned, as (N, 3)."""
+    (i, j, k), parity = EULER_ORDERS[order]
+    # Blender indexes mat[col][row], so mat[a][b] == R[:, b, a]
+    cy = np.hypot(R[:, i, i], R[:, j, i])
+    e1 = np.empty((len(R), 3), dtype=np.float64)
+    e2 = np.empty((len(R), 3), dtype=np.float64)
+    e1[:, i] = np.arctan2(R[:, k, j], R[:, k, k])
+    e1[:, j] = np.arctan2(-R[:, k, i], cy)
+    e1[:, k] = np.arctan2(R[:, j, i], R[:, i, i])
+    e2[:, i] = np.arctan2(-R[:, k, j], -R[:, k, k])
+    e2[:, j] = np.arctan2(-R[:, k, i], -cy)
+    e2[:, k] = np.arctan2(-R[:, j, i], -R[:, i, i])
+    # gimbal lock
+    locked = cy <= 16.0 * np.finfo(np.float32).eps
+    if locked.any():
+        e1[locked, i] = np.arctan2(-R[locked, j, k], R[locked, j, j])
+        e1[locked, j] = np.arctan2(-R[locked, k, i], cy[locked])
+        e1[locked, k] = 0.0
+        e2[locked] = e1[locked]
+    if parity:
+        e1 = -e1
+        e2 = -e2
+    use_e2 = np.abs(e1).sum(axis=1) > np.abs(e2).sum(axis=1)
+    e1[use_e2] = e2[use_e2]
+    return e1
+
+
+def quaternions_to_eulers(q, order="XYZ"):
+    """Quaternion.to_euler(order) of (N, 4) w, x, y, z quaternions."""
+    length = np.linalg.norm(q, axis=1)
+    length[length == 0.0] = 1.0
+    return normalized_matrices_to_eulers(quaternions_to_matrices(q / length[:, None]), order)
+
+
+def quaternions_to_axis_angles(q):
+    """Quaternion.to_axis_angle() of (N, 4) w, x, y, z quaternions, as (N, 4) x, y, z, angle."""
+    length = np.linalg.norm(q, axis=1)
+    length[length == 0.0] = 1.0
+    q = q / length[:, None]
+    half_angle = np.arccos(np.clip(q[:, 0], -1.0, 1.0))
+    si = np.sin(half_angle)
+    si[np.abs(si) < np.finfo(np.float32).eps] = 1.0
+    result = np.empty((len(q), 4), dtype=np.float64)
+    result[:, 0:3] = q[:, 1:4] / si[:, None]
+    result[:, 3] = half_angle * 2.0
+    # zero axes become the x axis
+    zero = ~np.any(np.abs(result[:, 0:3]) > 1.0e-10, axis=1)
+    result[zero, 0:3] = (1.0, 0.0, 0.0)
+    return result
+
+
+def decompose_world_matrices(world_matrix, matrices, translation_scale=1.0):
+    """DataLink transforms of world_matrix @ matrices, as a big-endian (N, 10) array."""
+    W = np.asarray(world_matrix, dtype=np.float64)
+    return decompose_matrices(np.matmul(W, matrices), translation_scale)
+
+
+class KeyframeBuffer():
+    """Preallocated frames x channels float32 keyframe values for one actor's live recording.
+
+       Channels are reserved (with their default values) before allocate(), then each
+       recorded frame fills (part of) its row. Frame numbers are implied by the row,
+       and only the rows that were actually recorded are written out as keyframes.
+    """
+    count: int = 0
+    start: int = 0
+    defaults: list = None
+    data: np.ndarray = None
+    recorded: np.ndarray = None
+
+    def __init__(self, count, start):
+        self.count = count
+        self.start = start
+        self.defaults = []
+
+    def reserve(self, defaults) -> int:
+        """Reserves a channel for each default value, returns the first channel's column."""
+        column = len(self.defaults)
+        self.defaults.extend(defaults)
+        return column
+
+    def allocate(self):
+        self.data = np.empty((self.count, len(self.defaults)), dtype=np.float32)
+        self.data[:] = np.array(self.defaults, dtype=np.float32)
+        self.recorded = np.zeros(self.count, dtype=bool)
+
+    def set(self, row, column, values):
+        if 0 <= row < self.count:
+            self.data[row, column:column + len(values)] = values
+            self.recorded[row] = True
+
+    def set_rows(self, rows, column, values):
+        """Sets (F, n) values into the channels from column, of each of the F rows."""
+        rows = np.asarray(rows, dtype=np.int64)
+        valid = (rows >= 0) & (rows < self.count)
+        self.data[rows[valid], column:column + values.shape[1]] = values[valid]
+        self.recorded[rows[valid]] = True
+
+    def get_keyframes(self, column, num_frames) -> np.ndarray:
+        """Interleaved [frame, value, frame, value, ...] float32 keyframes of a channel,
+           for the recorded rows of the first num_frames."""
+        rows = np.flatnonzero(self.recorded[:num_frames])
+        co = np.empty((len(rows), 2), dtype=np.float32)
+        co[:, 0] = rows + self.start
+        co[:, 1] = self.data[rows, column]
+        return co.reshape(-1)
+
+
+class Compression():
+    """zlib compression agreed for a DataLink session, with per op code byte counters.
+
+       Messages smaller than the threshold, or that don't get any smaller, are sent raw.
+    """
+    level: int = 1
+    threshold: int = COMPRESS_THRESHOLD
+    sent: dict = None
+    received: dict = None
+
+    def __init__(self, level=1, threshold=COMPRESS_THRESHOLD):
+        self.level = level
+        self.threshold = threshold
+        # op_code: [uncompressed bytes, bytes on the wire]
+        self.sent = {}
+        self.received = {}
+
+    def compress(self, op_code, data):
+        size = len(data) if data else 0
+        if size >= self.threshold:
+            packed = zlib.compress(data, self.level)
+            if len(packed) < size:
+                self.count(self.sent, op_code, size, len(packed))
+                return op_code | COMPRESSED, packed
+        self.count(self.sent, op_code, size, size)
+        return op_code, data
+
+    def count(self, stats: dict, op_code, raw_size, wire_size):
+        op_code = int(op_code)
+        if op_code not in stats:
+            stats[op_code] = [0, 0]
+        stat = stats[op_code]
+        stat[0] += raw_size
+        stat[1] += wire_size
+
+    def bytes_saved(self):
+        """Returns { op_code: bytes saved } for both directions combined."""
+        saved = {}
+        for stats in [self.sent, self.received]:
+            for op_code, (raw_size, wire_size) in list(stats.items()):
+                saved[op_code] = saved.get(op_code, 0) + raw_size - wire_size
+        return saved
+
+
+class FlowControl():
+    """Credit based flow control for live sequence frames.
+
+       The sending end keeps at most `window` frames in flight (sent but not yet acknowledged).
+       The window is the number of frames the link delivers in one minimum round trip (plus some gain
+       to probe for more), capped by the credit the receiving end advertises in its acks.
+       The receiving end advertises as credit the number of frames it can decode and store
+       within FLOW_TARGET_LATENCY.
+    """
+    window: int = FLOW_START_WINDOW
+    credit: int = 0
+    # frame: send time
+    in_flight: dict = None
+    # smoothed round trip time and variation (seconds)
+    srtt: float = 0.0
+    rttvar: float = 0.0
+    min_rtt: float = 0.0
+    min_rtt_time: float = 0.0
+    # smoothed acknowledged frames per second
+    throughput: float = 0.0
+    ack_frame: int = None
+    ack_time: float = 0.0
+    # smoothed cost (seconds) of receiving a frame
+    frame_cost: float = 0.0
+    # frames per batched message the receiving end asked for
+    batch: int = 1
+    # whether this (sending) end sends batched messages
+    batching: bool = False
+
+    def __init__(self):
+        self.in_flight = {}
+
+    def reset(self):
+        """Resets the window for a new sequence, keeps the link estimates."""
+        self.window = FLOW_START_WINDOW
+        self.credit = 0
+        self.in_flight.clear()
+        self.ack_frame = None
+        self.ack_time = 0.0
+
+    def timeout(self):
+        return max(FLOW_MIN_TIMEOUT, self.srtt + 4 * self.rttvar)
+
+    def can_send(self, now=None):
+        if now is None:
+            now = time.perf_counter()
+        if self.in_flight:
+            # frames the remote never acknowledged no longer count as in flight
+            expired = now - self.timeout()
+            lost = [ frame for frame, sent_time in self.in_flight.items() if sent_time < expired ]
+            for frame in lost:
+                del self.in_flight[frame]
+            if lost:
+                self.window = max(FLOW_MIN_WINDOW, self.window // 2)
+        return len(self.in_flight) < self.window
+
+    def sent(self, frame, now=None):
+        self.in_flight[frame] = time.perf_counter() if now is None else now
+
+    def acknowledge(self, frame, credit=None, now=None, batch=None):
+        """Acknowledgements are cumulative: all frames up to and including frame have been received.
+           Returns the round trip time of the frame, if it was still in flight."""
+        if now is None:
+            now = time.perf_counter()
+        rtt = None
+        sent_time = self.in_flight.get(frame)
+        if sent_time is not None:
+            rtt = now - sent_time
+            self.sample_rtt(rtt, now)
+        acked = [ f for f in self.in_flight if f <= frame ]
+        for f in acked:
+            del self.in_flight[f]
+        if self.ack_frame is not None and now > self.ack_time:
+            rate = max(1, len(acked)) / (now - self.ack_time)
+            if self.throughput:
+                self.throughput += (rate - self.throughput) * 0.125
+            else:
+                self.throughput = rate
+        self.ack_frame = frame
+        self.ack_time = now
+        if credit:
+            self.credit = int(credit)
+        if batch:
+            self.batch = int(batch)
+        self.update_window()
+        return rtt
+
+    def sample_rtt(self, rtt, now):
+        if self.srtt:
+            self.rttvar += (abs(self.srtt - rtt) - self.rttvar) * 0.25
+            self.srtt += (rtt - self.srtt) * 0.125
+        else:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        # the minimum expires in case the route (or the receiver's load) changes
+        if not self.min_rtt or rtt <= self.min_rtt or now - self.min_rtt_time > FLOW_MIN_RTT_EXPIRY:
+            self.min_rtt = rtt
+            self.min_rtt_time = now
+
+    def update_window(self):
+        if self.throughput and self.min_rtt:
+            window = math.ceil(self.throughput * self.min_rtt * FLOW_GAIN) + 1
+        else:
+            window = FLOW_START_WINDOW
+        if self.batching and self.batch > 1:
+            # room for a whole batch to be gathered on top of the frames in flight,
+            # otherwise a small window would cut every batch short
+            window += self.batch
+        # never more in flight than the receiving end can take
+        if self.credit:
+            window = min(window, self.credit)
+        self.window = min(max(window, FLOW_MIN_WINDOW), FLOW_MAX_WINDOW)
+
+    def received(self, cost):
+        """Records the cost (seconds) of decoding and storing a received frame."""
+        if self.frame_cost:
+            self.frame_cost += (cost - self.frame_cost) * 0.125
+        else:
+            self.frame_cost = cost
+
+    def get_credit(self, max_rate=0.0):
+        """Frames the receiver can process within the target latency,
+           at most max_rate frames per second if given."""
+        rate = 1.0 / self.frame_cost if self.frame_cost > 0 else FLOW_MAX_WINDOW / FLOW_TARGET_LATENCY
+        if max_rate > 0:
+            rate = min(rate, max_rate)
+        credit = int(rate * FLOW_TARGET_LATENCY)
+        return min(max(credit, FLOW_MIN_WINDOW), FLOW_MAX_WINDOW)
+
+    def get_batch(self):
+        """Frames per batched message the receiver asks for: as many as it processes in FLOW_BATCH_TIME.
+           The batch is independent of the credit (the receiving end advertises at least a batch of credit),
+           a batching sending end widens its window to fit it."""
+        rate = 1.0 / self.frame_cost if self.frame_cost > 0 else 0.0
+        batch = min(int(rate * FLOW_BATCH_TIME), FLOW_MAX_BATCH)
+        return max(batch, 1)
+
+    def batch_size(self):
+        """Frames to send per batched message: the receiver's batch, within its credit."""
+        batch = min(self.batch, FLOW_MAX_BATCH)
+        if self.credit:
+            batch = min(batch, self.credit)
+        return max(1, batch)
+
+
+# Motion curves (OpCodes.MOTION_CURVES):
+#
+#   header: json header length, num frames
+#   json header: { start_frame, end_frame, frame, motion_prefix, use_fake_user,
+#                  actors: [ { name, type, link_id, bone_count, expression_count, viseme_count,
+#                              bones, ids, id_tree, expressions, visemes, morphs } ] }
+#     bone_count, expression_count, viseme_count: number of channels, in the order of the template
+#     bones ... morphs: the actor's template, as in a TEMPLATE message
+#   per actor, frame major float32 curves:
+#     num frames * 10 root transform, num frames * bone_count * 10 bone transforms,
+#     num frames * expression_count weights, num frames * viseme_count weights
+#
+# i.e. a whole motion as the frames of a live sequence, with the templates, in one message.
+
+def encode_motion_curves(header: dict, actor_curves: list) -> bytes:
+    """Packs a motion from each actor's curves:
+       { "transform": (F, 10), "bones": (F, B, 10), "expressions": (F, E), "visemes": (F, V) }
+       The actors in the header (name, type, link_id and template) are in the same order as the curves."""
+    num_frames = len(actor_curves[0]["transform"]) if actor_curves else 0
+    body = []
+    for actor_data, curves in zip(header["actors"], actor_curves):
+        transform = np.asarray(curves["transform"], dtype=">f4").reshape(num_frames, TRANSFORM_SIZE)
+        bones = np.asarray(curves["bones"], dtype=">f4").reshape(num_frames, -1, TRANSFORM_SIZE)
+        expressions = np.asarray(curves["expressions"], dtype=">f4").reshape(num_frames, -1)
+        visemes = np.asarray(curves["visemes"], dtype=">f4").reshape(num_frames, -1)
+        actor_data["bone_count"] = bones.shape[1]
+        actor_data["expression_count"] = expressions.shape[1]
+        actor_data["viseme_count"] = visemes.shape[1]
+        body += [ transform.tobytes(), bones.tobytes(), expressions.tobytes(), visemes.tobytes() ]
+    json_header = json.dumps(header).encode("utf-8")
+    return b"".join([ HEADER.pack(len(json_header), num_frames), json_header ] + body)
+
+
+def decode_motion_curves(data):
+    """Unpacks a motion. Returns the json header (with num_frames) and each actor's curves,
+       as for encode_motion_curves."""
+    view = memoryview(data)
+    header_length, num_frames = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    header = json.loads(str(view[offset:offset+header_length], "utf-8"))
+    offset += header_length
+    header["num_frames"] = num_frames
+
+    def curves(width):
+        nonlocal offset
+        values = np.frombuffer(view, dtype=">f4", count=num_frames * width, offset=offset)
+        offset += num_frames * width * 4
+        return values.astype(np.float32).reshape(num_frames, width)
+
+    actor_curves = []
+    for actor_data in header["actors"]:
+        num_bones = actor_data["bone_count"]
+        actor_curves.append({
+            "transform": curves(TRANSFORM_SIZE),
+            "bones": curves(num_bones * TRANSFORM_SIZE).reshape(num_frames, num_bones, TRANSFORM_SIZE),
+            "expressions": curves(actor_data["expression_count"]),
+            "visemes": curves(actor_data["viseme_count"]),
+        })
+    view.release()
+    return header, actor_curves
+
+
+# Mesh deltas (OpCodes.MESH_DELTA):
+#
+#   header: json header length, vertex count
+#   json header: { name, type, link_id, object_name, mesh_name, shape_key, morph, mesh_modify,
+#                  topology, delta_id, mode, count }
+#   mode "FULL": vertex count * 3 float32 positions
+#   mode "SPARSE": count uint32 vertex indices, then count * 3 float32 position deltas
+#
+# Positions are in the space of the OBJ files the meshes are otherwise sent as:
+# modifiers applied, world space, in cm (x 100) and Y up.
+# The receiver only applies the delta if its mesh has the same topology hash, and replies
+# with a MESH_DELTA_ACK { delta_id }, otherwise with an INVALID { message, delta_id }
+# and the mesh must be sent as a file.
+
+def topology_hash(vertex_count, loop_totals, loop_vertices) -> int:
+    """crc32 of the vertex count, the polygon loop totals and the loop vertex indices."""
+    crc = zlib.crc32(UINT.pack(vertex_count))
+    crc = zlib.crc32(np.asarray(loop_totals, dtype=">u4").tobytes(), crc)
+    crc = zlib.crc32(np.asarray(loop_vertices, dtype=">u4").tobytes(), crc)
+    return crc
+
+
+def encode_mesh_delta(info: dict, positions, base=None, tolerance=MESH_DELTA_TOLERANCE) -> bytes:
+    """Packs the (N, 3) vertex positions, as a sparse delta from base (N, 3) if that is smaller.
+       Sets the mode and count of the info header."""
+    positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+    vertex_count = len(positions)
+    info["mode"] = "FULL"
+    info["count"] = vertex_count
+    body = [ positions.astype(">f4").tobytes() ]
+    if base is not None and np.shape(base) == positions.shape:
+        delta = positions - base
+        indices = np.flatnonzero(np.any(np.abs(delta) > tolerance, axis=1))
+        # index + delta is 16 bytes a vertex, a full position 12
+        if len(indices) * 16 < vertex_count * 12:
+            info["mode"] = "SPARSE"
+            info["count"] = len(indices)
+            body = [ indices.astype(">u4").tobytes(), delta[indices].astype(">f4").tobytes() ]
+    header = json.dumps(info).encode("utf-8")
+    return b"".join([ HEADER.pack(len(header), vertex_count), header ] + body)
+
+
+def decode_mesh_delta(data):
+    """Unpacks a mesh delta. Returns info, indices (or None for all vertices), values (count, 3)"""
+    view = memoryview(data)
+    header_length, vertex_count = HEADER.unpack_from(view, 0)
+    offset = HEADER.size
+    info = json.loads(str(view[offset:offset+header_length], "utf-8"))
+    offset += header_length
+    info["vertex_count"] = vertex_count
+    count = info["count"]
+    indices = None
+    if info["mode"] == "SPARSE":
+        indices = np.frombuffer(view, dtype=">u4", count=count, offset=offset).astype(np.int64)
+        offset += count * 4
+    values = np.frombuffer(view, dtype=">f4", count=count * 3, offset=offset).astype(np.float32).reshape(-1, 3)
+    view.release()
+    return info, indices, values
+
+
+def blender_to_obj_axes(positions):
+    """(N, 3) Z up positions to the Y up axes of OBJ files: (x, y, z) -> (x, z, -y)"""
+    positions = np.asarray(positions, dtype=np.float32)
+    return np.stack((positions[:, 0], positions[:, 2], -positions[:, 1]), axis=1)
+
+
+def obj_to_blender_axes(positions):
+    """(N, 3) Y up OBJ positions to Z up: (x, y, z) -> (x, -z, y)"""
+    positions = np.asarray(positions, dtype=np.float32)
+    return np.stack((positions[:, 0], -positions[:, 2], positions[:, 1]), axis=1)
+
+
+def apply_mesh_delta(positions, indices, values):
+    """Applies decoded mesh delta values to the (N, 3) positions, in place when sparse."""
+    if indices is None:
+        return values
+    positions[indices] += values
+    return positions
+
+
+def encode_camera_record(loc, rot, pivot, focal_length):
+    """Packs a camera sync as a binary record (OpCodes.CAMERA_SYNC_COMPACT),
+       with the same values and units as the view_camera loc and rot (x, y, z, w), pivot and focal_length
+       of a json CAMERA_SYNC."""
+    return CAMERA_RECORD.pack(*loc, *rot, *pivot, focal_length)
+
+
+def decode_camera_record(data):
+    """Returns loc, rot (x, y, z, w), pivot, focal_length of a binary camera sync record."""
+    values = CAMERA_RECORD.unpack_from(data, 0)
+    return values[0:3], values[3:7], values[7:10], values[10]
+
+
+def json_equal(a, b, tolerance=MATERIAL_TOLERANCE):
+    if isinstance(a, float) or isinstance(b, float):
+        return (isinstance(a, (int, float)) and isinstance(b, (int, float)) and
+                not isinstance(a, bool) and not isinstance(b, bool) and
+                math.isclose(a, b, rel_tol=0.0, abs_tol=tolerance))
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(json_equal(x, y, tolerance) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(json_equal(a[k], b[k], tolerance) for k in a)
+    return type(a) == type(b) and a == b
+
+
+def diff_json(old, new, path=None, tolerance=MATERIAL_TOLERANCE) -> list:
+    """The changes that turn the old json into the new: [ [path, value] ] for changed or added keys
+       (lists are replaced whole) and [ path ] for removed keys. Paths are lists of keys."""
+    path = path or []
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [] if json_equal(old, new, tolerance) else [ [path, new] ]
+    changes = []
+    for key, value in new.items():
+        if key not in old:
+            changes.append([path + [key], value])
+        else:
+            changes.extend(diff_json(old[key], value, path + [key], tolerance))
+    for key in old:
+        if key not in new:
+            changes.append([path + [key]])
+    return changes
+
+
+def apply_json_changes(json_data, changes: list):
+    """Applies diff_json changes to the json in place. Returns the json (replaced if a change has an empty path)."""
+    for change in changes:
+        path = change[0]
+        if not path:
+            json_data = change[1] if len(change) > 1 else None
+            continue
+        parent = json_data
+        for key in path[:-1]:
+            parent = parent.setdefault(key, {})
+        if len(change) > 1:
+            parent[path[-1]] = change[1]
+        else:
+            parent.pop(path[-1], None)
+    return json_data
+
+
+def is_texture_change(change) -> bool:
+    """Whether a diff_json material change adds, removes or re-paths a texture. The receivers only
+       apply parameters from a diff, so these materials must be sent whole, with their textures."""
+    path = change[0]
+    if "Texture Path" in path:
+        return True
+    # whole texture infos (or everything containing them)
+    if path[:1] == ["Textures"]:
+        return len(path) <= 2
+    if path[:1] == ["Custom Shader"]:
+        return len(path) == 1 or (path[1] == "Image" and len(path) <= 3)
+    return not path
+
+
+class Debouncer():
+    """Collects keys changed in quick succession (e.g. while a slider is dragged) and releases
+       them together, once none have changed for `delay`, or at least every `max_wait`."""
+    # key: time first changed
+    pending: dict = None
+    last_time: float = 0.0
+    delay: float = MATERIAL_DEBOUNCE
+    max_wait: float = MATERIAL_MAX_WAIT
+
+    def __init__(self, delay=MATERIAL_DEBOUNCE, max_wait=MATERIAL_MAX_WAIT):
+        self.pending = {}
+        self.delay = delay
+        self.max_wait = max_wait
+
+    def touch(self, key, now=None):
+        if now is None:
+            now = time.perf_counter()
+        self.pending.setdefault(key, now)
+        self.last_time = now
+
+    def due(self, now=None) -> list:
+        """The keys to process now, if any."""
+        if not self.pending:
+            return []
+        if now is None:
+            now = time.perf_counter()
+        first_time = min(self.pending.values())
+        if now - self.last_time < self.delay and now - first_time < self.max_wait:
+            return []
+        keys = list(self.pending)
+        self.pending.clear()
+        return keys
+
+
+class SyncSender():
+    """Coalesces the view sync states (camera, frame) sent while dragging the viewport or scrubbing.
+
+       Only the latest pending state of each kind is kept, and it is sent at most `rate` times a second,
+       and only if it differs from the last state sent (or received) by more than `threshold`.
+    """
+    # kind: (values, op_code, data, force)
+    pending: dict = None
+    # kind: values of the last state sent or received
+    last_values: dict = None
+    # kind: time of the last send
+    last_time: dict = None
+    rate: float = SYNC_RATE
+    threshold: float = SYNC_THRESHOLD
+    sent_count: int = 0
+    skipped_count: int = 0
+
+    def __init__(self):
+        self.pending = {}
+        self.last_values = {}
+        self.last_time = {}
+
+    def queue(self, kind, values, op_code, data, force=False):
+        """Replaces any pending state of this kind. Forced states are sent even if unchanged."""
+        previous = self.pending.get(kind)
+        if previous:
+            self.skipped_count += 1
+            force = force or previous[3]
+        self.pending[kind] = (np.asarray(values, dtype=np.float64), op_code, data, force)
+
+    def set_last(self, kind, values):
+        """The remote's state, so it isn't sent straight back."""
+        self.last_values[kind] = np.asarray(values, dtype=np.float64)
+
+    def is_due(self, kind, now=None):
+        if now is None:
+            now = time.perf_counter()
+        return now - self.last_time.get(kind, 0.0) >= 1.0 / max(self.rate, 0.001)
+
+    def changed(self, kind, values):
+        last = self.last_values.get(kind)
+        if last is None or last.shape != values.shape:
+            return True
+        return float(np.max(np.abs(values - last), initial=0.0)) > self.threshold
+
+    def flush(self, now=None):
+        """The (op_code, data) messages that are due to be sent now."""
+        if now is None:
+            now = time.perf_counter()
+        messages = []
+        for kind in list(self.pending):
+            values, op_code, data, force = self.pending[kind]
+            if not force and not self.is_due(kind, now):
+                continue
+            del self.pending[kind]
+            if force or self.changed(kind, values):
+                self.last_values[kind] = values
+                self.last_time[kind] = now
+                messages.append((op_code, data))
+                self.sent_count += 1
+            else:
+                self.skipped_count += 1
+        return messages
+
+
+class RollingHistogram():
+    """The last TELEMETRY_SAMPLES timings (in seconds), summarised in ms."""
+    samples: np.ndarray = None
+    count: int = 0
+
+    def __init__(self, size=TELEMETRY_SAMPLES):
+        self.samples = np.zeros(size, dtype=np.float64)
+        self.count = 0
+
+    def add(self, value):
+        self.samples[self.count % len(self.samples)] = value
+        self.count += 1
+
+    def values(self):
+        return self.samples[:min(self.count, len(self.samples))] * 1000.0
+
+    def summary(self):
+        values = self.values()
+        if not len(values):
+            return { "samples": 0 }
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            "samples": int(len(values)),
+            "mean": float(values.mean()),
+            "jitter": float(values.std()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(values.max()),
+        }
+
+    def histogram(self):
+        """[ (bin start ms, count) ], the last bin counts everything above it."""
+        bins = TELEMETRY_BINS + [np.inf]
+        counts, edges = np.histogram(self.values(), bins=bins)
+        return [ (TELEMETRY_BINS[i], int(c)) for i, c in enumerate(counts) ]
+
+
+class LinkTelemetry():
+    """DataLink message counters and timings per op code,
+       with rolling histograms of frame arrival to applied time, round trip time and timer loop interval.
+
+       Received messages are counted by the reader (on the I/O thread if there is one),
+       the rest on the main thread.
+    """
+    # op_code: { "sent", "sent_bytes", "received", "received_bytes", "parse_time", "apply_time" }
+    stats: dict = None
+    # received frames: arrival (read on the I/O thread) to applied, i.e. queued and apply time
+    # (the remote's frames carry no send time, so this isn't the send to applied latency)
+    arrival: RollingHistogram = None
+    # sent frames: sent to acknowledged
+    rtt: RollingHistogram = None
+    loop: RollingHistogram = None
+    start_time: float = 0.0
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.stats = {}
+        self.arrival = RollingHistogram()
+        self.rtt = RollingHistogram()
+        self.loop = RollingHistogram()
+        self.start_time = time.time()
+
+    def get_stat(self, op_code):
+        op_code = int(op_code)
+        stat = self.stats.get(op_code)
+        if stat is None:
+            stat = { "sent": 0, "sent_bytes": 0, "received": 0, "received_bytes": 0,
+                     "parse_time": 0.0, "apply_time": 0.0 }
+            self.stats[op_code] = stat
+        return stat
+
+    def count_sent(self, op_code, size):
+        stat = self.get_stat(op_code)
+        stat["sent"] += 1
+        stat["sent_bytes"] += size
+
+    def count_received(self, op_code, size, parse_time):
+        stat = self.get_stat(op_code)
+        stat["received"] += 1
+        stat["received_bytes"] += size
+        stat["parse_time"] += parse_time
+
+    def count_applied(self, op_code, apply_time):
+        self.get_stat(op_code)["apply_time"] += apply_time
+
+    def get_rows(self):
+        """One row per op code, with the average parse and apply times in ms."""
+        rows = []
+        for op_code, stat in sorted(list(self.stats.items())):
+            name = op_code_name(op_code)
+            received = max(1, stat["received"])
+            rows.append({
+                "op_code": op_code,
+                "name": name,
+                "sent": stat["sent"],
+                "sent_bytes": stat["sent_bytes"],
+                "received": stat["received"],
+                "received_bytes": stat["received_bytes"],
+                "parse_ms": stat["parse_time"] * 1000.0 / received,
+                "apply_ms": stat["apply_time"] * 1000.0 / received,
+            })
+        return rows
+
+    def to_json(self, info: dict = None):
+        return {
+            "info": info or {},
+            "duration": time.time() - self.start_time,
+            "op_codes": self.get_rows(),
+            "arrival_to_applied": dict(self.arrival.summary(), histogram=self.arrival.histogram()),
+            "rtt": dict(self.rtt.summary(), histogram=self.rtt.histogram()),
+            "loop": dict(self.loop.summary(), histogram=self.loop.histogram()),
+        }
+
+    def export(self, folder, info: dict = None):
+        """Writes the telemetry as telemetry_<time>.json and .csv (op code rows) to the folder.
+           Returns the json file path."""
+        os.makedirs(folder, exist_ok=True)
+        name = time.strftime("telemetry_%Y%m%d_%H%M%S")
+        json_path = os.path.join(folder, name + ".json")
+        csv_path = os.path.join(folder, name + ".csv")
+        with open(json_path, "w") as file:
+            json.dump(self.to_json(info), file, indent=4)
+        with open(csv_path, "w", newline="") as file:
+            fields = ["op_code", "name", "sent", "sent_bytes", "received", "received_bytes", "parse_ms", "apply_ms"]
+            writer = csv.DictWriter(file, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(self.get_rows())
+        return json_path
+
+
+def frame_message(op_code, data=None, compression: Compression=None) -> bytes:
+    """Header and payload of a DataLink message, compressed if agreed and worthwhile."""
+    if compression and data:
+        op_code, data = compression.compress(op_code, data)
+    if data:
+        return b"".join([HEADER.pack(op_code, len(data)), data])
+    return HEADER.pack(op_code, 0)
+
+
+def hash_file(file_path):
+    """Content hash (blake2b, 128 bit) of a file, as hex."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as file:
+        while True:
+            chunk = file.read(MAX_CHUNK_SIZE * 8)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_folder_manifest(folder):
+    """[ { "name", "size", "hash" } ] for every file in the folder, names relative to it."""
+    manifest = []
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            manifest.append({
+                "name": os.path.relpath(path, folder).replace(os.sep, "/"),
+                "size": os.path.getsize(path),
+                "hash": hash_file(path),
+            })
+    return manifest
+
+
+def link_or_copy(source_path, dest_path):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if os.path.exists(dest_path):
+        os.remove(dest_path)
+    try:
+        os.link(source_path, dest_path)
+    except OSError:
+        # different volumes or no hard link support
+        shutil.copyfile(source_path, dest_path)
+
+
+class FileCache():
+    """Content addressed store of received files, evicting the least recently used beyond max_size bytes.
+
+       Entries are stored as <folder>/<hash[:2]>/<hash> and the file modification time is
+       used as the last used time, so the LRU order survives between sessions.
+    """
+    folder: str = None
+    max_size: int = FILE_CACHE_SIZE
+    # hash: [size, last used]
+    entries: dict = None
+    size: int = 0
+
+    def __init__(self, folder, max_size=FILE_CACHE_SIZE):
+        self.folder = folder
+        self.max_size = max_size
+        self.entries = {}
+        self.size = 0
+        os.makedirs(folder, exist_ok=True)
+        for root, dirs, files in os.walk(folder):
+            for name in files:
+                stat = os.stat(os.path.join(root, name))
+                self.entries[name] = [stat.st_size, stat.st_mtime]
+                self.size += stat.st_size
+
+    def get_path(self, hash):
+        return os.path.join(self.folder, hash[:2], hash)
+
+    def has(self, hash):
+        return hash in self.entries
+
+    def missing(self, manifest):
+        """The hashes in the manifest that aren't in the cache."""
+        return sorted(set(entry["hash"] for entry in manifest if entry["hash"] not in self.entries))
+
+    def touch(self, hash):
+        now = time.time()
+        self.entries[hash][1] = now
+        os.utime(self.get_path(hash), (now, now))
+
+    def link_to(self, hash, dest_path):
+        """Hard links (or copies) the cached file to dest_path. Returns False if it isn't cached."""
+        if hash not in self.entries:
+            return False
+        try:
+            link_or_copy(self.get_path(hash), dest_path)
+        except OSError:
+            # removed from under us
+            self.remove(hash)
+            return False
+        self.touch(hash)
+        return True
+
+    def add(self, file_path, hash=None):
+        if not hash:
+            hash = hash_file(file_path)
+        if hash in self.entries:
+            self.touch(hash)
+        else:
+            link_or_copy(file_path, self.get_path(hash))
+            size = os.path.getsize(file_path)
+            self.entries[hash] = [size, time.time()]
+            self.size += size
+            self.evict()
+        return hash
+
+    def remove(self, hash):
+        size, last_used = self.entries.pop(hash)
+        self.size -= size
+        path = self.get_path(hash)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def evict(self):
+        if self.size > self.max_size:
+            for hash in sorted(self.entries, key=lambda h: self.entries[h][1]):
+                self.remove(hash)
+                if self.size <= self.max_size:
+                    break
+
+
+class FileSource():
+    """A file on disk sent as the body of a FILE message."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.size = os.path.getsize(file_path)
+
+    def blocks(self):
+        yield from read_file_blocks(self.file_path, self.size)
+
+    def send(self, sock: socket.socket):
+        send_file_body(sock, self.file_path, self.size)
+
+    def remove(self):
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+
+class TarStream():
+    """An uncompressed tar archive of a folder, generated while it is sent.
+
+       The tar headers are built up front from the folder contents so the total
+       size is known before the first byte is sent, without writing the archive
+       to disk. Entries are named relative to the folder, as shutil.make_archive does.
+    """
+
+    def __init__(self, folder, include=None):
+        """include: the set of file names (relative to the folder) to send, or None for all."""
+        self.folder = folder
+        # [ (tar header bytes, file path or None, file size) ]
+        self.entries = []
+        self.add_entry(folder, ".")
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in dirs + sorted(files):
+                path = os.path.join(root, name)
+                rel_name = os.path.relpath(path, folder).replace(os.sep, "/")
+                if include is None or name in dirs or rel_name in include:
+                    self.add_entry(path, "./" + rel_name)
+        self.size = sum(len(header) + size + tar_padding(size) for header, path, size in self.entries)
+        self.size += TAR_END_SIZE
+
+    def add_entry(self, path, arc_name):
+        stat = os.stat(path)
+        info = tarfile.TarInfo(arc_name)
+        info.mtime = int(stat.st_mtime)
+        info.mode = stat.st_mode & 0o7777
+        if os.path.isdir(path):
+            info.type = tarfile.DIRTYPE
+            self.entries.append((info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"), None, 0))
+        elif os.path.isfile(path):
+            info.size = stat.st_size
+            self.entries.append((info.tobuf(tarfile.GNU_FORMAT, "utf-8", "surrogateescape"), path, stat.st_size))
+
+    def blocks(self):
+        for header, path, size in self.entries:
+            yield header
+            if path:
+                yield from read_file_blocks(path, size)
+                if tar_padding(size):
+                    yield bytes(tar_padding(size))
+        yield bytes(TAR_END_SIZE)
+
+    def send(self, sock: socket.socket):
+        for header, path, size in self.entries:
+            sock.sendall(header)
+            if path:
+                send_file_body(sock, path, size)
+                if tar_padding(size):
+                    sock.sendall(bytes(tar_padding(size)))
+        sock.sendall(bytes(TAR_END_SIZE))
+
+    def remove(self):
+        if os.path.exists(self.folder):
+            shutil.rmtree(self.folder)
+
+
+def tar_padding(size):
+    return -size % tarfile.BLOCKSIZE
+
+
+def read_file_blocks(file_path, size):
+    """Yields exactly size bytes of the file in chunks, zero padded if the file has since shrunk."""
+    remaining = size
+    with open(file_path, "rb") as file:
+        while remaining > 0:
+            chunk = file.read(min(MAX_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    if remaining > 0:
+        yield bytes(remaining)
+
+
+def send_file_body(sock: socket.socket, file_path, size):
+    """Sends exactly size bytes of the file, with os.sendfile where the platform has it."""
+    sent = 0
+    if size > 0:
+        with open(file_path, "rb") as file:
+            # socket.sendfile falls back to plain sends where os.sendfile isn't available
+            sent = sock.sendfile(file, 0, size)
+    if sent < size:
+        sock.sendall(bytes(size - sent))
+
+
+def frame_file(remote_id, source, compression: Compression=None):
+    """Yields the blocks of a FILE message, the body coming from a FileSource or TarStream.
+
+       Uncompressed: op, id, file size, then the file body.
+       Compressed: op | COMPRESSED, id, then length prefixed zlib stream chunks ending with a 0 length.
+    """
+    id_data = pack_string(remote_id)
+    if compression:
+        wire_size = 0
+        yield UINT.pack(OpCodes.FILE | COMPRESSED) + id_data
+        compressor = zlib.compressobj(compression.level)
+        for chunk in source.blocks():
+            packed = compressor.compress(chunk)
+            if packed:
+                wire_size += UINT.size + len(packed)
+                yield UINT.pack(len(packed)) + packed
+        packed = compressor.flush()
+        if packed:
+            wire_size += UINT.size + len(packed)
+            yield UINT.pack(len(packed)) + packed
+        yield UINT.pack(0)
+        compression.count(compression.sent, OpCodes.FILE, source.size, wire_size + UINT.size)
+    else:
+        yield UINT.pack(OpCodes.FILE) + id_data + UINT.pack(source.size)
+        yield from source.blocks()
+
+
+def send_file_message(sock: socket.socket, remote_id, source, compression: Compression=None):
+    """Sends a FILE message on a blocking (or timeout) socket."""
+    if compression:
+        for block in frame_file(remote_id, source, compression):
+            sock.sendall(block)
+    else:
+        # uncompressed file bodies go straight from the file to the socket
+        sock.sendall(UINT.pack(OpCodes.FILE) + pack_string(remote_id) + UINT.pack(source.size))
+        source.send(sock)
+
+
+class TarExtractor():
+    """Extracts an uncompressed tar stream into a folder as it is written, without storing the archive.
+
+       file_func(name, path) is called as each file is completed, with the entry name
+       relative to the folder. Only directories and regular files are extracted, and
+       entries that would land outside of the folder are skipped.
+    """
+    folder: str = None
+    file_func = None
+    files: list = None
+    header: bytearray = None
+    file = None
+    meta: bytearray = None
+    meta_type: bytes = None
+    next_name: str = None
+    name: str = None
+    path: str = None
+    remaining: int = 0
+    padding: int = 0
+    ended: bool = False
+
+    def __init__(self, folder, file_func=None):
+        self.folder = os.path.normpath(folder)
+        self.file_func = file_func
+        self.files = []
+        self.header = bytearray()
+        os.makedirs(self.folder, exist_ok=True)
+
+    def write(self, data):
+        view = memoryview(data)
+        pos = 0
+        length = len(view)
+        while pos < length and not self.ended:
+            if self.remaining > 0:
+                count = min(self.remaining, length - pos)
+                if self.file:
+                    self.file.write(view[pos:pos + count])
+                elif self.meta is not None:
+                    self.meta += view[pos:pos + count]
+                self.remaining -= count
+                pos += count
+                if self.remaining == 0:
+                    self.finish_entry()
+            elif self.padding > 0:
+                count = min(self.padding, length - pos)
+                self.padding -= count
+                pos += count
+            else:
+                count = min(tarfile.BLOCKSIZE - len(self.header), length - pos)
+                self.header += view[pos:pos + count]
+                pos += count
+                if len(self.header) == tarfile.BLOCKSIZE:
+                    self.read_header(bytes(self.header))
+                    self.header.clear()
+        return length
+
+    def read_header(self, block):
+        if block.count(0) == tarfile.BLOCKSIZE:
+            # end of archive
+            self.ended = True
+            return
+        info = tarfile.TarInfo.frombuf(block, "utf-8", "surrogateescape")
+        name = self.next_name or info.name
+        self.next_name = None
+        self.name = None
+        self.path = None
+        self.remaining = info.size
+        self.padding = tar_padding(info.size)
+        if info.type in (tarfile.GNUTYPE_LONGNAME, tarfile.XHDTYPE):
+            self.meta = bytearray()
+            self.meta_type = info.type
+        else:
+            path = get_safe_path(self.folder, name)
+            if path and info.type == tarfile.DIRTYPE:
+                os.makedirs(path, exist_ok=True)
+            elif path and info.type in tarfile.REGULAR_TYPES:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # never write through a hard link into the file cache
+                if os.path.exists(path):
+                    os.remove(path)
+                self.name = os.path.relpath(path, self.folder).replace(os.sep, "/")
+                self.path = path
+                self.file = open(path, "wb")
+        if self.remaining == 0:
+            self.finish_entry()
+
+    def finish_entry(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.files.append(self.name)
+            if self.file_func:
+                self.file_func(self.name, self.path)
+        elif self.meta is not None:
+            if self.meta_type == tarfile.GNUTYPE_LONGNAME:
+                self.next_name = bytes(self.meta).rstrip(b"\0").decode("utf-8", "surrogateescape")
+            else:
+                self.next_name = get_pax_path(bytes(self.meta))
+            self.meta = None
+            self.meta_type = None
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+def get_safe_path(folder, name):
+    """The path of name inside the folder, or None if it would be outside of it."""
+    folder = os.path.normpath(folder)
+    if not name or os.path.isabs(name) or name.startswith(("/", "\\")):
+        return None
+    path = os.path.normpath(os.path.join(folder, name))
+    if path != folder and not path.startswith(folder + os.sep):
+        return None
+    return path
+
+
+def get_pax_path(data: bytes):
+    """The path from a pax extended header's "length key=value\\n" records, if it has one."""
+    pos = 0
+    while pos < len(data):
+        space = data.find(b" ", pos)
+        if space < 0:
+            break
+        length = int(data[pos:space])
+        if length <= 0:
+            break
+        key, _, value = data[space + 1:pos + length - 1].partition(b"=")
+        if key == b"path":
+            return value.decode("utf-8", "surrogateescape")
+        pos += length
+    return None
+
+
+class MessageReader():
+    """Framed, non-blocking DataLink message reader.
+
+       Reads into one reusable (growable) buffer with recv_into and keeps any
+       partially received message between calls, so a large message can arrive
+       over many timer ticks. Completed payloads are returned as memoryview
+       slices of the buffer, which are only valid until the next call to read().
+
+       FILE messages stream their body straight into the sink returned by
+       file_sink_func(remote_id) (a file or TarExtractor) and complete with
+       the remote_id as the payload.
+
+       Messages flagged as COMPRESSED are decompressed before they are returned.
+    """
+    HEADER = 0
+    PAYLOAD = 1
+    FILE_SIZE = 2
+    FILE_BODY = 3
+    FILE_CHUNK = 4
+
+    sock = None
+    buffer: bytearray = None
+    view: memoryview = None
+    state: int = 0
+    op_code: int = 0
+    size: int = 0
+    received: int = 0
+    file = None
+    file_remaining: int = 0
+    compressed: bool = False
+    decompressor = None
+    # set to the session Compression to count the received bytes
+    compression: Compression = None
+    # set to count received messages and parse times
+    telemetry: LinkTelemetry = None
+
+    def __init__(self, sock, file_sink_func, initial_size=65536):
+        self.sock = sock
+        self.file_sink_func = file_sink_func
+        self.buffer = bytearray(initial_size)
+        self.view = memoryview(self.buffer)
+        self.size_buffer = bytearray(UINT.size)
+        self.reset()
+
+    def reset(self):
+        self.state = self.HEADER
+        self.op_code = 0
+        self.size = 0
+        self.received = 0
+        self.file_remaining = 0
+        self.compressed = False
+        self.decompressor = None
+        self.file_size = 0
+        self.file_wire_size = 0
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+        self.reset()
+
+    def is_partial(self):
+        """True if part way through receiving a message."""
+        return self.state != self.HEADER or self.received > 0
+
+    def ensure_size(self, size):
+        if size > len(self.buffer):
+            # allocate a new buffer rather than resizing, as payload views may still reference the old one
+            self.view.release()
+            new_size = max(size, len(self.buffer) * 2)
+            self.buffer = bytearray(new_size)
+            self.view = memoryview(self.buffer)
+
+    def has_data(self):
+        r,w,x = select.select([self.sock], [], [], 0)
+        return bool(r)
+
+    def recv_into(self, target):
+        count = self.sock.recv_into(target, min(len(target), MAX_CHUNK_SIZE))
+        if count == 0:
+            raise ConnectionResetError("Socket closed by remote")
+        return count
+
+    def read(self, deadline=None):
+        """Reads whatever is available on the socket (until the deadline) towards the next message.
+           Returns (op_code, payload) when a message completes, otherwise None.
+           payload is None for empty messages."""
+        while self.has_data():
+
+            if self.state == self.HEADER:
+                self.received += self.recv_into(self.view[self.received:HEADER.size])
+                if self.received == HEADER.size:
+                    self.op_code, self.size = HEADER.unpack_from(self.buffer, 0)
+                    self.compressed = (self.op_code & COMPRESSED) != 0
+                    self.op_code &= ~COMPRESSED
+                    self.received = 0
+                    if self.size > 0:
+                        self.ensure_size(self.size)
+                        self.state = self.PAYLOAD
+                    elif self.op_code == OpCodes.FILE:
+                        self.state = self.FILE_SIZE
+                    else:
+                        return self.complete()
+
+            elif self.state == self.PAYLOAD:
+                self.received += self.recv_into(self.view[self.received:self.size])
+                if self.received == self.size:
+                    if self.op_code == OpCodes.FILE:
+                        self.received = 0
+                        self.state = self.FILE_SIZE
+                    else:
+                        return self.complete()
+
+            elif self.state == self.FILE_SIZE:
+                with memoryview(self.size_buffer) as size_view:
+                    self.received += self.recv_into(size_view[self.received:])
+                if self.received == UINT.size:
+                    self.file_remaining = UINT.unpack_from(self.size_buffer, 0)[0]
+                    self.received = 0
+                    if not self.file:
+                        remote_id = str(self.view[:self.size], "utf-8")
+                        self.file = self.file_sink_func(remote_id)
+                        if self.compressed:
+                            self.decompressor = zlib.decompressobj()
+                        # the body is received in the buffer space after the remote id
+                        self.ensure_size(self.size + MAX_CHUNK_SIZE)
+                    if self.compressed:
+                        # file_remaining is the size of the next compressed chunk
+                        self.file_wire_size += UINT.size + self.file_remaining
+                        if self.file_remaining == 0:
+                            self.write_file(self.decompressor.flush())
+                            return self.complete()
+                        self.ensure_size(self.size + self.file_remaining)
+                        self.state = self.FILE_CHUNK
+                    else:
+                        self.state = self.FILE_BODY
+                        if self.file_remaining == 0:
+                            return self.complete()
+
+            elif self.state == self.FILE_CHUNK:
+                start = self.size + self.received
+                self.received += self.recv_into(self.view[start:self.size + self.file_remaining])
+                if self.received == self.file_remaining:
+                    self.write_file(self.decompressor.decompress(self.view[self.size:self.size + self.received]))
+                    self.received = 0
+                    self.state = self.FILE_SIZE
+
+            elif self.state == self.FILE_BODY:
+                chunk_size = min(self.file_remaining, MAX_CHUNK_SIZE)
+                count = self.recv_into(self.view[self.size:self.size + chunk_size])
+                self.write_file(self.view[self.size:self.size + count])
+                self.file_remaining -= count
+                if self.file_remaining == 0:
+                    return self.complete()
+
+            if deadline and time.perf_counter() > deadline:
+                break
+
+        return None
+
+    def write_file(self, data):
+        self.file.write(data)
+        self.file_size += len(data)
+
+    def complete(self):
+        start_time = time.perf_counter()
+        op_code = self.op_code
+        payload = self.view[:self.size] if self.size > 0 else None
+        wire_size = self.size
+        if self.file:
+            file_wire_size = self.file_wire_size if self.compressed else self.file_size
+            if self.compression:
+                self.compression.count(self.compression.received, op_code, self.file_size, file_wire_size)
+            # the remote id and then the file body
+            wire_size += file_wire_size
+            self.file.close()
+            self.file = None
+        elif self.compressed and payload is not None:
+            data = zlib.decompress(payload)
+            if self.compression:
+                self.compression.count(self.compression.received, op_code, len(data), self.size)
+            payload = data
+        if self.telemetry:
+            self.telemetry.count_received(op_code, HEADER.size + wire_size, time.perf_counter() - start_time)
+        self.reset()
+        return op_code, payload
+
+
+class LinkIOThread(threading.Thread):
+    """Worker thread that owns all reads and writes on the DataLink client socket.
+
+       Complete inbound messages are put on the inbound queue as (op_code, bytes, arrival time),
+       which blocks the reader while the queue is full (back-pressure on the remote).
+       Outbound messages and files are sent in the order they are queued,
+       and block the sender while the outbound queue is full (back-pressure from a slow remote).
+       If the connection fails, LOST is put on the inbound queue and the thread exits.
+    """
+    LOST = (None, None)
+
+    def __init__(self, sock, file_sink_func, max_inbound=64, max_outbound=256):
+        super().__init__(name="DataLinkIO", daemon=True)
+        self.sock = sock
+        self.reader = MessageReader(sock, file_sink_func)
+        self.inbound = queue.Queue(maxsize=max_inbound)
+        self.outbound = queue.Queue(maxsize=max_outbound)
+        self.stopping = threading.Event()
+        self.flush = True
+        self.error = None
+        # wakes the select when there is something to send
+        self.wake_recv, self.wake_send = socket.socketpair()
+
+    def send(self, op_code, data=None, compression: Compression=None):
+        return self.put_outbound(("DATA", op_code, data, compression))
+
+    def send_file(self, remote_id, source, remove=False, compression: Compression=None):
+        return self.put_outbound(("FILE", remote_id, source, remove, compression))
+
+    def put_outbound(self, item):
+        """Queues a message to send, waiting while the queue is full.
+           Returns False if the thread stopped before it could be queued."""
+        while True:
+            try:
+                self.outbound.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                if self.stopping.is_set() or (self.ident is not None and not self.is_alive()):
+                    return False
+                self.wake()
+        self.wake()
+        return True
+
+    def wake(self):
+        try:
+            self.wake_send.send(b"\0")
+        except OSError:
+            pass
+
+    def stop(self, flush=True, timeout=5.0):
+        """Stops the thread, optionally sending everything still queued first."""
+        self.flush = flush
+        self.stopping.set()
+        self.wake()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout)
+        self.reader.close()
+        self.wake_recv.close()
+        self.wake_send.close()
+
+    def run(self):
+        try:
+            while not self.stopping.is_set():
+                r,w,x = select.select([self.sock, self.wake_recv], [], [], 0.1)
+                if self.wake_recv in r:
+                    self.wake_recv.recv(4096)
+                self.write_outbound()
+                if self.sock in r:
+                    self.read_inbound()
+            if self.flush:
+                self.write_outbound()
+        except Exception as e:
+            self.error = e
+            self.put_inbound(self.LOST, force=True)
+
+    def read_inbound(self):
+        # one message at a time, so queued sends are not held up by a busy inbound stream
+        message = self.reader.read()
+        if message:
+            op_code, payload = message
+            # the reader's buffer is reused, so queued payloads must be copies
+            self.put_inbound((op_code, bytes(payload) if payload is not None else None, time.perf_counter()))
+
+    def put_inbound(self, message, force=False):
+        while True:
+            try:
+                self.inbound.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                if self.stopping.is_set() and not force:
+                    return
+                if force:
+                    # make room for the lost connection notice
+                    try:
+                        self.inbound.get_nowait()
+                    except queue.Empty:
+                        pass
+
+    def write_outbound(self):
+        while True:
+            try:
+                item = self.outbound.get_nowait()
+            except queue.Empty:
+                return
+            if item[0] == "DATA":
+                kind, op_code, data, compression = item
+                self.sock.sendall(frame_message(op_code, data, compression))
+            elif item[0] == "FILE":
+                kind, remote_id, source, remove, compression = item
+                try:
+                    send_file_message(self.sock, remote_id, source, compression)
+                finally:
+                    if remove:
+                        source.remove()
+
+
+SESSION_MAGIC = b"DLSESS02"
+# seconds since the start of the session, direction, op code, payload size
+SESSION_RECORD = struct.Struct("!dBII")
+# received by / sent from Blender
+SESSION_IN = 0
+SESSION_OUT = 1
+SESSION_FRAME_OP_CODES = [ OpCodes.POSE_FRAME, OpCodes.POSE_FRAME_COMPACT,
+                           OpCodes.SEQUENCE_FRAME, OpCodes.SEQUENCE_DELTA, OpCodes.SEQUENCE_COMPACT,
+                           OpCodes.SEQUENCE_FRAMES ]
+
+
+class SessionRecorder():
+    """Append-only log of the DataLink messages received and sent, with their times."""
+    file = None
+    file_path: str = None
+    start_time: float = 0.0
+    count: int = 0
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        self.file = open(file_path, "wb")
+        self.file.write(SESSION_MAGIC)
+        self.start_time = time.perf_counter()
+        self.count = 0
+
+    def record(self, direction, op_code, payload=None, t=None):
+        if not self.file:
+            return
+        if t is None:
+            t = time.perf_counter() - self.start_time
+        size = len(payload) if payload else 0
+        self.file.write(SESSION_RECORD.pack(t, direction, int(op_code), size))
+        if size:
+            self.file.write(payload)
+        self.count += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class SessionLog():
+    """Memory mapped session log, indexed by message and by (received) frame number.
+
+       Payloads are memoryviews of the mapped file, only valid until the log is closed.
+    """
+    file = None
+    data: mmap.mmap = None
+    view: memoryview = None
+    # file offset of each record
+    offsets: list = None
+    # frame: record index of the received frame message
+    frames: dict = None
+
+    def __init__(self, file_path):
+        self.file = open(file_path, "rb")
+        size = os.path.getsize(file_path)
+        if size < len(SESSION_MAGIC):
+            self.file.close()
+            raise ValueError(f"Not a DataLink session: {file_path}")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(SESSION_MAGIC)] != SESSION_MAGIC:
+            self.close()
+            raise ValueError(f"Not a DataLink session: {file_path}")
+        self.view = memoryview(self.data)
+        self.build_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, exception_traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def build_index(self):
+        self.offsets = []
+        self.frames = {}
+        offset = len(SESSION_MAGIC)
+        end = len(self.data)
+        while offset + SESSION_RECORD.size <= end:
+            t, direction, op_code, size = SESSION_RECORD.unpack_from(self.view, offset)
+            payload_offset = offset + SESSION_RECORD.size
+            if payload_offset + size > end:
+                # a truncated last record, the recording was cut short
+                break
+            if direction == SESSION_IN and op_code in SESSION_FRAME_OP_CODES and size >= HEADER.size:
+                frame = HEADER.unpack_from(self.view, payload_offset)[1]
+                num_frames = 1
+                if op_code == OpCodes.SEQUENCE_FRAMES:
+                    num_frames = UINT.unpack_from(self.view, payload_offset + HEADER.size)[0]
+                for i in range(0, num_frames):
+                    self.frames.setdefault(frame + i, len(self.offsets))
+            self.offsets.append(offset)
+            offset = payload_offset + size
+
+    def message(self, index):
+        """(time, direction, op_code, payload) of the message at index."""
+        offset = self.offsets[index]
+        t, direction, op_code, size = SESSION_RECORD.unpack_from(self.view, offset)
+        offset += SESSION_RECORD.size
+        return t, direction, op_code, self.view[offset:offset+size] if size else None
+
+    def messages(self, direction=None, start=0):
+        for index in range(start, len(self.offsets)):
+            message = self.message(index)
+            if direction is None or message[1] == direction:
+                yield message
+
+    def received(self):
+        """[ (time, op_code, payload) ] of the messages received by Blender."""
+        return [ (t, op_code, payload) for t, direction, op_code, payload in self.messages(SESSION_IN) ]
+
+    def find_frame(self, frame):
+        """Record index of the received frame message for frame, or None."""
+        return self.frames.get(frame)
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+        if self.data is not None:
+            try:
+                self.data.close()
+            except BufferError:
+                # payloads are still referenced, the map is closed once they are released
+                pass
+            self.data = None
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -21,7 +21,7 @@ import os
 from . import addon_updater_ops, iconutils, rigging, rigutils, rlx
 from . import (link, rigify_mapping_data, bones, characters, sculpting, springbones,
                bake, rigidbody, physics, colorspace, modifiers, channel_mixer, nodeutils,
-               utils, params, vars)
+               utils, params, vars, linkutils)
 from .meshutils import get_head_body_object_quick
 
 PIPELINE_TAB_NAME = "CC/iC Pipeline"
@@ -3872,6 +3872,12 @@ class CCICDataLinkPanel(bpy.types.Panel):
         row = layout.row()
         row.prop(link_props, "link_status", text="")
         row.enabled = False
+        if connected and link_service and link_service.flow.srtt:
+            flow = link_service.flow
+            row = layout.row()
+            row.label(text=f"RTT: {flow.srtt * 1000:.0f} ms")
+            row.label(text=f"Rate: {flow.throughput:.0f} fps")
+            row.label(text=f"Window: {flow.window}")
 
         column = layout.column(align=True)
         row = column.row(align=True)
@@ -3910,8 +3916,22 @@ class CCICDataLinkPanel(bpy.types.Panel):
             col_2.prop(prefs, "datalink_frame_sync", text="")
             col_1.label(text="Preview Shape Keys")
             col_2.prop(prefs, "datalink_preview_shape_keys", text="")
+            col_1.label(text="Fast Record")
+            col_2.prop(prefs, "datalink_fast_record", text="")
+            if prefs.datalink_fast_record:
+                col_1.label(text="Preview Every (frames)")
+                col_2.prop(prefs, "datalink_fast_record_preview", text="")
             col_1.label(text="Match Client Rate")
             col_2.prop(prefs, "datalink_match_client_rate", text="")
+            col_1.label(text="Live View Sync")
+            col_2.prop(prefs, "datalink_live_sync", text="")
+            if prefs.datalink_live_sync:
+                col_1.label(text="Sync Rate (per second)")
+                col_2.prop(prefs, "datalink_sync_rate", text="")
+                col_1.label(text="Sync Threshold")
+                col_2.prop(prefs, "datalink_sync_threshold", text="")
+            col_1.label(text="Live Materials")
+            col_2.prop(prefs, "datalink_live_materials", text="")
             col_1.label(text="Retarget Prop Actions")
             col_2.prop(prefs, "datalink_retarget_prop_actions", text="")
             col_1.label(text="Hide Prop Bones")
@@ -3922,9 +3942,90 @@ class CCICDataLinkPanel(bpy.types.Panel):
             col_2.prop(prefs, "datalink_confirm_mismatch", text="")
             col_1.label(text="Confirm Replace")
             col_2.prop(prefs, "datalink_confirm_replace", text="")
+            col_1.label(text="Delta Frames")
+            col_2.prop(prefs, "datalink_delta_frames", text="")
+            col_1.label(text="Pose Encoding")
+            col_2.prop(prefs, "datalink_pose_encoding", text="")
+            col_1.label(text="File Cache")
+            col_2.prop(prefs, "datalink_file_cache", text="")
+            if prefs.datalink_file_cache:
+                col_1.label(text="Cache Size (MB)")
+                col_2.prop(prefs, "datalink_file_cache_size", text="")
+            split = box.split(factor=0.5)
+            split.label(text="Keyframe Reduction")
+            split.prop(prefs, "datalink_reduce_mode", text="")
+            if prefs.datalink_reduce_mode == "BOUNDED":
+                col = box.column(align=True)
+                col.prop(prefs, "datalink_reduce_location", text="Location")
+                col.prop(prefs, "datalink_reduce_rotation", text="Rotation")
+                col.prop(prefs, "datalink_reduce_scale", text="Scale")
+                col.prop(prefs, "datalink_reduce_shape_keys", text="Shape Keys")
+                col.prop(prefs, "datalink_reduce_other", text="Other")
+            split = box.split(factor=0.5)
+            split.label(text="Remote Compression")
+            split.prop(prefs, "datalink_compression", text="")
+            if link_service and link_service.compression:
+                col = box.column(align=True)
+                col.label(text="Bytes Saved:")
+                for op_code, saved in link_service.compression.bytes_saved().items():
+                    if saved > 0:
+                        split = col.split(factor=0.5)
+                        split.label(text=f"  {linkutils.op_code_name(op_code)}")
+                        split.label(text=f"{saved / 1024:.1f} KB")
+            split = box.split(factor=0.5)
+            split.label(text="Replay Speed")
+            split.prop(prefs, "datalink_replay_speed", text="")
+            row = box.row(align=True)
+            if link_service and link_service.is_recording():
+                row.operator("ccic.datalink", icon="REC", text="Stop Recording", depress=True).param = "STOP_RECORDING"
+            else:
+                row.operator("ccic.datalink", icon="REC", text="Record Session").param = "RECORD_SESSION"
+            if link_service and link_service.is_replaying():
+                row.operator("ccic.datalink", icon="X", text="Stop Replay").param = "STOP_REPLAY"
+            else:
+                row.operator("ccic.datalink", icon="PLAY", text="Replay Session").param = "REPLAY_SESSION"
             box.prop(prefs, "temp_folder")
             box.operator("cc3.setpreferences", icon="FILE_REFRESH", text="Reset").param="RESET_DATALINK"
 
+        # DataLink telemetry
+        if link_service:
+            box = layout.box()
+            if fake_drop_down(box.row(), "DataLink Telemetry", "show_data_link_telemetry", props.show_data_link_telemetry,
+                              icon="GRAPH", icon_closed="GRAPH"):
+                telemetry = link_service.telemetry
+                col = box.column(align=True)
+                split = col.split(factor=0.4)
+                split.label(text="Op Code")
+                row = split.row()
+                row.label(text="In / Out")
+                row.label(text="KB")
+                row.label(text="ms")
+                for stat in telemetry.get_rows():
+                    split = col.split(factor=0.4)
+                    split.label(text=stat["name"])
+                    row = split.row()
+                    row.label(text=f"{stat['received']} / {stat['sent']}")
+                    row.label(text=f"{(stat['received_bytes'] + stat['sent_bytes']) / 1024:.0f}")
+                    row.label(text=f"{stat['apply_ms']:.1f}")
+                col = box.column(align=True)
+                split = col.split(factor=0.4)
+                split.label(text="Timing")
+                split.label(text="p50 / p95 / p99 (jitter)")
+                for label, histogram in [("Arrival to Applied", telemetry.arrival),
+                                         ("Round Trip", telemetry.rtt),
+                                         ("Loop Interval", telemetry.loop)]:
+                    summary = histogram.summary()
+                    split = col.split(factor=0.4)
+                    split.label(text=label)
+                    if summary["samples"]:
+                        split.label(text=f"{summary['p50']:.1f} / {summary['p95']:.1f} / {summary['p99']:.1f} ms "
+                                         f"(±{summary['jitter']:.1f})")
+                    else:
+                        split.label(text="-")
+                row = box.row(align=True)
+                row.operator("ccic.datalink", icon="EXPORT", text="Export").param = "EXPORT_TELEMETRY"
+                row.operator("ccic.datalink", icon="X", text="Reset").param = "RESET_TELEMETRY"
+
         if True:
 
             row = layout.row()
@@ -102,13 +102,31 @@ def reset_datalink():
     prefs.datalink_auto_start = False
     prefs.datalink_frame_sync = False
     prefs.datalink_preview_shape_keys = True
+    prefs.datalink_fast_record = False
+    prefs.datalink_fast_record_preview = 10
     prefs.datalink_match_client_rate = True
+    prefs.datalink_live_sync = False
+    prefs.datalink_sync_rate = 20
+    prefs.datalink_sync_threshold = 0.001
+    prefs.datalink_live_materials = False
     prefs.datalink_retarget_prop_actions = True
     prefs.datalink_disable_tweak_bones = True
     prefs.datalink_hide_prop_bones = True
     prefs.datalink_send_mode = "ACTIVE"
     prefs.datalink_confirm_mismatch = True
     prefs.datalink_confirm_replace = True
+    prefs.datalink_compression = "FAST"
+    prefs.datalink_delta_frames = True
+    prefs.datalink_pose_encoding = "LOSSLESS"
+    prefs.datalink_file_cache = True
+    prefs.datalink_file_cache_size = 2048
+    prefs.datalink_reduce_mode = "FLAT"
+    prefs.datalink_reduce_location = 0.0005
+    prefs.datalink_reduce_rotation = 0.0005
+    prefs.datalink_reduce_scale = 0.0005
+    prefs.datalink_reduce_shape_keys = 0.002
+    prefs.datalink_reduce_other = 0.001
+    prefs.datalink_replay_speed = "ORIGINAL"
 
 
 def reset_preferences():
@@ -544,8 +562,21 @@ class CC3ToolsAddonPreferences(bpy.types.AddonPreferences):
                         description="Force the live sequence transfer to stop and render every frame")
     datalink_preview_shape_keys: bpy.props.BoolProperty(default=True,
                         description="Previewing shape keys during live sequence transfer results in slower frame rates. It can be disabled to speed up the transfer")
+    datalink_fast_record: bpy.props.BoolProperty(default=False,
+                        description="When recording live sequences onto (non-rigified) characters, don't evaluate the scene for every frame. " \
+                                    "The incoming frames are stored and solved for the character rig at the end of the sequence")
+    datalink_fast_record_preview: bpy.props.IntProperty(default=10, min=0, max=120,
+                        description="With fast record, still fully update and preview every this many frames (0 for no preview)")
     datalink_match_client_rate: bpy.props.BoolProperty(default=True,
-                        description="When sending a live sequence, attempt to match the transfer frame rate. Causes less frame jumping in the live preview")
+                        description="When sending a live sequence, only keep as many frames in flight as the client can process (credit based flow control). Causes less frame jumping in the live preview")
+    datalink_live_sync: bpy.props.BoolProperty(default=False,
+                        description="Keep the viewport camera and current frame in sync with the client while navigating and scrubbing")
+    datalink_sync_rate: bpy.props.IntProperty(default=20, min=1, max=60,
+                        description="Maximum number of camera and frame syncs sent per second. Only the latest view is sent")
+    datalink_sync_threshold: bpy.props.FloatProperty(default=0.001, min=0.0, max=1.0, precision=4,
+                        description="Camera and frame syncs are only sent if the view has changed by more than this")
+    datalink_live_materials: bpy.props.BoolProperty(default=False,
+                        description="Send material parameter changes to the client as they are made, only sending what has changed")
     datalink_retarget_prop_actions: bpy.props.BoolProperty(default=True,
                         description="As props do not have a default bind pose, each prop animation has a different rest pose " \
                                     "which means the animation must be retargeted to (if checked) or the rest pose must be adjusted to "\
@@ -576,6 +607,52 @@ class CC3ToolsAddonPreferences(bpy.types.AddonPreferences):
                     ], default="LOCAL", name = "DataLink Target")
     datalink_auto_lighting: bpy.props.BoolProperty(default=False,
                                           description="Use automatic lighting from CC/iC Go-B")
+    datalink_compression: bpy.props.EnumProperty(items=[
+                        ("NONE","None","Don't compress DataLink messages"),
+                        ("FAST","Fast","Fast zlib compression (level 1)"),
+                        ("BALANCED","Balanced","Balanced zlib compression (level 6)"),
+                        ("BEST","Best","Smallest zlib compression (level 9)"),
+                    ], default="FAST", name = "DataLink Compression",
+                       description="Compression of messages and files sent over remote (non-local) DataLink connections. " \
+                                   "Only used if the remote end also supports it")
+    datalink_delta_frames: bpy.props.BoolProperty(default=True,
+                        description="Live sequence frames only send the bones and shape keys that have changed since the last frame, with a full frame every 30 frames. " \
+                                    "Only used if the remote end also supports it")
+    datalink_pose_encoding: bpy.props.EnumProperty(items=[
+                        ("LOSSLESS","Lossless","Send pose and sequence frames as full 32-bit floats"),
+                        ("COMPACT","Compact","Send pose and sequence frames quantised: 16-bit translations and weights, 48-bit rotations. " \
+                                             "Actors that can't be quantised accurately are still sent lossless"),
+                    ], default="LOSSLESS", name = "Pose Encoding",
+                       description="Encoding of pose and sequence frames sent to CC/iC. " \
+                                   "Compact is only used if the remote end also supports it")
+    datalink_file_cache: bpy.props.BoolProperty(default=True,
+                        description="Remote file transfers only send the files the other end doesn't already have in its file cache. " \
+                                    "Only used if the remote end also supports it")
+    datalink_file_cache_size: bpy.props.IntProperty(default=2048, min=0, soft_max=16384, name="File Cache Size",
+                        description="Maximum size (in MB) of the cache of files received over remote DataLink connections. " \
+                                    "The least recently used files are removed first")
+    datalink_reduce_mode: bpy.props.EnumProperty(items=[
+                        ("NONE","None","Keep every keyframe of live sequences and light & camera animations"),
+                        ("FLAT","Flat","Only remove keyframes that don't change from their neighbours"),
+                        ("BOUNDED","Error Bounded","Remove every keyframe that can be linearly interpolated from the remaining keyframes " \
+                                                   "to within the channel tolerance"),
+                    ], default="FLAT", name="Keyframe Reduction",
+                    description="How keyframes are reduced when writing live sequence and light & camera (RLX) actions")
+    datalink_reduce_location: bpy.props.FloatProperty(default=0.0005, min=0.0, soft_max=0.01, precision=4, name="Location Tolerance",
+                        description="Maximum location error (in meters) of error bounded keyframe reduction")
+    datalink_reduce_rotation: bpy.props.FloatProperty(default=0.0005, min=0.0, soft_max=0.01, precision=4, name="Rotation Tolerance",
+                        description="Maximum rotation error (quaternion, axis-angle or euler radians) of error bounded keyframe reduction")
+    datalink_reduce_scale: bpy.props.FloatProperty(default=0.0005, min=0.0, soft_max=0.01, precision=4, name="Scale Tolerance",
+                        description="Maximum scale error of error bounded keyframe reduction")
+    datalink_reduce_shape_keys: bpy.props.FloatProperty(default=0.002, min=0.0, soft_max=0.05, precision=4, name="Shape Key Tolerance",
+                        description="Maximum shape key weight error of error bounded keyframe reduction")
+    datalink_reduce_other: bpy.props.FloatProperty(default=0.001, min=0.0, soft_max=0.05, precision=4, name="Other Tolerance",
+                        description="Maximum error of error bounded keyframe reduction for all other channels (light and camera settings)")
+    datalink_replay_speed: bpy.props.EnumProperty(items=[
+                        ("ORIGINAL","Original","Replay recorded sessions at the speed they were recorded"),
+                        ("MAX","Maximum","Replay recorded sessions as fast as possible"),
+                    ], default="ORIGINAL", name="Replay Speed",
+                    description="Speed at which recorded DataLink sessions are replayed")
 
 
     # convert
@@ -3354,6 +3354,7 @@ class CC3ImportProps(bpy.types.PropertyGroup):
     section_physics_cloth_settings: bpy.props.BoolProperty(default=False)
     section_physics_collision_settings: bpy.props.BoolProperty(default=False)
     show_data_link_prefs: bpy.props.BoolProperty(default=False)
+    show_data_link_telemetry: bpy.props.BoolProperty(default=False)
     section_rigify_export: bpy.props.BoolProperty(default=True)
 
     skin_toggle: bpy.props.BoolProperty(default=True)
@@ -15,6 +15,7 @@
 # along with CC/iC Blender Tools.  If not, see <https://www.gnu.org/licenses/>.
 
 import bpy, struct, json, os
+import numpy as np
 from mathutils import Vector, Matrix, Color, Quaternion
 from enum import IntEnum
 from . import vars, utils, rigutils, nodeutils, imageutils
@@ -27,6 +28,7 @@ RECTANGULAR_AS_AREA = False
 TUBE_AS_AREA = True
 ENERGY_SCALE = 35 * 0.7
 SUN_SCALE = 2 * 0.7
+FLAT_TOLERANCE = 0.0001
 
 class BinaryData():
     data: bytearray = None
@@ -500,38 +502,100 @@ def add_cache_fcurves(action: bpy.types.Action, data_path, cache, num_frames, gr
             fcurve = channel.fcurves.new(data_path, index=i)
             fcurve.auto_smoothing = "NONE"
             fcurve.group = channel.groups[group_name]
-            reduced = reduce_cache(cache[i], interpolation)
+            reduced = reduce_cache(cache[i], interpolation, data_path)
             num_reduced = int(len(reduced) / 2)
             fcurve.keyframe_points.add(num_reduced)
             fcurve.keyframe_points.foreach_set('co', reduced)
             rigutils.reset_fcurve_interpolation(fcurve, interpolation=interpolation)
 
-def reduce_cache(cache, interpolation):
-    if not cache or len(cache) <= 4:
+def get_reduce_tolerance(data_path: str):
+    """Returns the keyframe reduction tolerance for the channel animated by data_path,
+       or None if the channel should not be reduced."""
+    prefs = vars.prefs()
+    mode = prefs.datalink_reduce_mode
+    if mode == "NONE":
+        return None
+    elif mode == "FLAT":
+        return 0.0
+    if data_path.endswith("location"):
+        return prefs.datalink_reduce_location
+    elif "rotation_" in data_path:
+        return prefs.datalink_reduce_rotation
+    elif data_path.endswith("scale"):
+        return prefs.datalink_reduce_scale
+    elif data_path.startswith("key_blocks"):
+        return prefs.datalink_reduce_shape_keys
+    return prefs.datalink_reduce_other
+
+
+def reduce_cache(cache, interpolation, data_path=""):
+    """Reduces an interleaved [frame, value, frame, value, ...] keyframe cache
+       according to the keyframe reduction preferences for the channel."""
+    tolerance = get_reduce_tolerance(data_path)
+    if tolerance is None:
         return cache
-    reduced = []
-    L = len(cache)
-    Lm2 = L - 2
-    # add first frame
-    reduced.append(cache[0])
-    reduced.append(cache[1])
-    use_next = interpolation != "CONSTANT"
-    for i in range(2, L, 2):
-        frame = cache[i]
-        value = cache[i+1]
-        value_last = cache[i-1]
-        value_next = cache[i+3] if i < Lm2 else value
-        last_changed = abs(value - value_last) > 0.0001
-        next_changed = abs(value - value_next) > 0.0001
-        if last_changed or (use_next and next_changed):
-            reduced.append(frame)
-            reduced.append(value)
-    # add last frame
-    #reduced.append(cache[-2])
-    #reduced.append(cache[-1])
+    return reduce_keyframes(cache, interpolation, tolerance)
+
+
+def reduce_keyframes(cache, interpolation="LINEAR", tolerance=0.0):
+    """Reduces an interleaved [frame, value, frame, value, ...] keyframe cache.
+       With a tolerance of zero only keyframes that are flat with their neighbours are removed,
+       otherwise linear curves are simplified (Ramer-Douglas-Peucker) so that the interpolated
+       curve never differs from any of the original keyframes by more than the tolerance."""
+    co = np.asarray(cache, dtype=np.float32)
+    if len(co) <= 4:
+        return co
+    frames = co[0::2]
+    values = co[1::2]
+    if interpolation == "CONSTANT" or tolerance <= 0.0:
+        keep = reduce_flat(values, interpolation != "CONSTANT")
+    else:
+        keep = reduce_linear(frames, values, max(tolerance, FLAT_TOLERANCE))
+    reduced = np.empty(2 * np.count_nonzero(keep), dtype=np.float32)
+    reduced[0::2] = frames[keep]
+    reduced[1::2] = values[keep]
     return reduced
 
 
+def reduce_flat(values, use_next):
+    """Keeps only the keyframes that differ from the previous (or next) keyframe."""
+    changed = np.abs(np.diff(values)) > FLAT_TOLERANCE
+    keep = np.zeros(len(values), dtype=bool)
+    # always keep the first frame
+    keep[0] = True
+    keep[1:] = changed
+    if use_next:
+        keep[1:-1] |= changed[1:]
+    return keep
+
+
+def reduce_linear(frames, values, tolerance):
+    """Ramer-Douglas-Peucker over the value error of the linearly interpolated curve."""
+    count = len(values)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = True
+    keep[-1] = True
+    frames = frames.astype(np.float64)
+    values = values.astype(np.float64)
+    stack = [(0, count - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        f0 = frames[first]
+        v0 = values[first]
+        span = frames[last] - f0
+        slope = (values[last] - v0) / span if span else 0.0
+        error = np.abs(values[first + 1:last] - (v0 + (frames[first + 1:last] - f0) * slope))
+        i = int(np.argmax(error))
+        if error[i] > tolerance:
+            split = first + 1 + i
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
 def add_camera_markers(camera, cache, num_frames, start):
     scene = bpy.context.scene
     frames = len(cache)
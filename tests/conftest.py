@@ -0,0 +1,34 @@
+import importlib, os, sys, types
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = "cc_blender_tools"
+
+
+def load_module(name):
+    """Imports a module of the add-on package without running the package __init__,
+       which registers the add-on with Blender."""
+    if PACKAGE not in sys.modules:
+        package = types.ModuleType(PACKAGE)
+        package.__path__ = [ROOT]
+        sys.modules[PACKAGE] = package
+    return importlib.import_module(f"{PACKAGE}.{name}")
+
+
+def encode_actor_frame(actor_frame) -> bytes:
+    """Packs an (incoming) actor frame into its pose frame block, as the remote would send it."""
+    linkutils = load_module("linkutils")
+    actor_type = actor_frame["type"]
+    parts = [ linkutils.pack_string(actor_frame["name"]), linkutils.pack_string(actor_type),
+              linkutils.pack_string(actor_frame["link_id"]), linkutils.TRANSFORM.pack(*actor_frame["transform"]) ]
+    if actor_type == "PROP" or actor_type == "AVATAR":
+        for key in ["bones", "expressions", "visemes"]:
+            values = np.asarray(actor_frame[key], dtype=">f4")
+            count = len(values) // linkutils.TRANSFORM_SIZE if key == "bones" else len(values)
+            parts.append(linkutils.UINT.pack(count))
+            parts.append(values.tobytes())
+    elif actor_type == "LIGHT":
+        parts.append(linkutils.LIGHT.pack(*actor_frame["light"]))
+    elif actor_type == "CAMERA":
+        parts.append(linkutils.CAMERA.pack(*actor_frame["camera"]))
+    return b"".join(parts)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from conftest import encode_actor_frame, load_module
+
+linkutils = load_module("linkutils")
+
+
+def random_quaternions(rng, count):
+    q = rng.normal(size=(count, 4))
+    return q / np.linalg.norm(q, axis=1)[:, None]
+
+
+def make_block(rng, num_bones=30, expressions=None, visemes=None, transform_counts=None, weight_counts=None):
+    root = np.array([10.0, 20.0, 0.0, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0, 1.0])
+    bones = np.zeros((num_bones, 10))
+    bones[:, 0:3] = rng.uniform(-50.0, 50.0, size=(num_bones, 3))
+    # x, y, z, w
+    bones[:, 3:7] = random_quaternions(rng, num_bones)[:, [1, 2, 3, 0]]
+    bones[:, 7:10] = 1.0
+    bones = bones.astype(np.float32).astype(np.float64)
+    expressions = rng.random(5) if expressions is None else np.asarray(expressions)
+    visemes = rng.random(3) if visemes is None else np.asarray(visemes)
+    actor_frame = { "name": "Actor", "type": "AVATAR", "link_id": "1234",
+                    "transform": root.tolist(), "bones": bones.ravel().tolist(),
+                    "expressions": expressions.tolist(), "visemes": visemes.tolist() }
+    header = b"".join([ linkutils.pack_string("Actor"), linkutils.pack_string("AVATAR"), linkutils.pack_string("1234") ])
+    quantise = linkutils.get_compact_ranges(bones[:, 0:3], 0.0, 1.0)
+    block = {
+        "header": header,
+        "link_id": "1234",
+        "full": encode_actor_frame(actor_frame)[len(header):],
+        "transforms": np.concatenate([root[None, :], bones]),
+        "transform_counts": transform_counts or [num_bones],
+        "weights": np.concatenate([expressions, visemes]),
+        "weight_counts": weight_counts or [len(expressions), len(visemes)],
+        "quantise": quantise,
+    }
+    return block, actor_frame, { "1234": quantise }
+
+
+def test_compact_round_trip_translation_error():
+    rng = np.random.default_rng(7)
+    block, actor_frame, ranges = make_block(rng)
+    data = linkutils.encode_compact_pose_frame(3, [block])
+    assert len(data) < len(linkutils.encode_pose_frame(3, [block]))
+    frame, actor_frames = linkutils.decode_compact_pose_frame(data, ranges)
+    assert frame == 3
+    decoded = np.array(actor_frames[0]["bones"]).reshape(-1, 10)
+    expected = np.array(actor_frame["bones"]).reshape(-1, 10)
+    # half a quantisation step of the translation range (+ float32 centre rounding)
+    bound = ranges["1234"]["translation"] / 65535.0 + 1e-4
+    assert np.max(np.abs(decoded[:, 0:3] - expected[:, 0:3])) <= bound
+    assert np.allclose(decoded[:, 7:10], expected[:, 7:10])
+    assert np.allclose(actor_frames[0]["expressions"], actor_frame["expressions"], atol=1.0 / 65535)
+    assert np.allclose(actor_frames[0]["visemes"], actor_frame["visemes"], atol=1.0 / 65535)
+
+
+def test_smallest_three_quaternion_sign():
+    rng = np.random.default_rng(8)
+    q = random_quaternions(rng, 200)
+    for sign in [1.0, -1.0]:
+        decoded = linkutils.unpack_quaternions(linkutils.pack_quaternions(q * sign).tobytes(), len(q))
+        # the same rotation, with the dropped (largest) component positive
+        assert np.all(np.abs(np.sum(decoded * q, axis=1)) > 1.0 - 1e-6)
+        largest = np.argmax(np.abs(q), axis=1)
+        assert np.all(decoded[np.arange(len(q)), largest] > 0.0)
+
+
+def test_lossless_fallback_outside_ranges():
+    rng = np.random.default_rng(9)
+    # a weight outside the template weight range
+    block, actor_frame, ranges = make_block(rng, expressions=[0.0, 1.5])
+    data = linkutils.encode_compact_pose_frame(4, [block])
+    frame, actor_frames = linkutils.decode_compact_pose_frame(data, ranges)
+    assert actor_frames[0]["bones"] == pytest.approx(actor_frame["bones"], abs=0.0)
+    assert list(actor_frames[0]["expressions"]) == pytest.approx([0.0, 1.5], abs=0.0)
+    # a bone translation outside the template translation range
+    block["transforms"][1, 0] += 10.0 * ranges["1234"]["translation"]
+    block["weights"][1] = 0.5
+    assert linkutils.encode_compact_actor(block) is None
+
+
+def test_unexpected_block_counts_raise():
+    rng = np.random.default_rng(10)
+    block, actor_frame, ranges = make_block(rng, num_bones=30, transform_counts=[20, 10])
+    with pytest.raises(ValueError):
+        linkutils.decode_compact_pose_frame(linkutils.encode_compact_pose_frame(5, [block]), ranges)
+    block, actor_frame, ranges = make_block(rng, expressions=[0.1, 0.2], visemes=[0.3, 0.4], weight_counts=[2, 1, 1])
+    with pytest.raises(ValueError):
+        linkutils.decode_compact_pose_frame(linkutils.encode_compact_pose_frame(5, [block]), ranges)
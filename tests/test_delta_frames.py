@@ -0,0 +1,83 @@
+import numpy as np
+
+from conftest import encode_actor_frame, load_module
+
+linkutils = load_module("linkutils")
+
+
+def make_block(transforms, expressions, visemes):
+    actor_frame = { "name": "Actor", "type": "AVATAR", "link_id": "1234",
+                    "transform": transforms[0].tolist(), "bones": transforms[1:].ravel().tolist(),
+                    "expressions": list(expressions), "visemes": list(visemes) }
+    full = encode_actor_frame(actor_frame)
+    header = b"".join([ linkutils.pack_string("Actor"), linkutils.pack_string("AVATAR"), linkutils.pack_string("1234") ])
+    return {
+        "header": header,
+        "link_id": "1234",
+        "full": full[len(header):],
+        "transforms": np.array(transforms, dtype=np.float32),
+        "weights": np.array(list(expressions) + list(visemes), dtype=np.float32),
+    }
+
+
+def make_frames(count, num_bones=4):
+    rng = np.random.default_rng(5)
+    transforms = rng.normal(size=(num_bones + 1, 10)).astype(np.float32)
+    expressions = [0.0, 0.5]
+    visemes = [0.25]
+    frames = []
+    for i in range(count):
+        transforms = transforms.copy()
+        if i > 0:
+            # one bone moves each frame
+            transforms[1 + (i - 1) % num_bones] += 1.0
+        frames.append((transforms, expressions, visemes))
+    return frames
+
+
+def test_delta_frames_round_trip():
+    encoder = linkutils.DeltaEncoder(keyframe_interval=30)
+    decoder = linkutils.DeltaDecoder()
+    for i, (transforms, expressions, visemes) in enumerate(make_frames(6)):
+        data = encoder.encode(i, [ make_block(transforms, expressions, visemes) ])
+        frame, actor_frames = decoder.decode(data)
+        actor_frame = actor_frames[0]
+        assert frame == i
+        assert np.allclose(actor_frame["bones"], transforms[1:].ravel())
+        assert np.allclose(actor_frame["transform"], transforms[0])
+        assert np.allclose(actor_frame["expressions"], expressions)
+        assert np.allclose(actor_frame["visemes"], visemes)
+        if i == 0:
+            assert actor_frame["changed_bones"] is None
+        else:
+            assert actor_frame["changed_bones"] == [ (i - 1) % 4 ]
+
+
+def pose(posed, actor_frame):
+    """Poses only the changed bones, as apply_pose_frame_data does."""
+    bones = np.array(actor_frame["bones"]).reshape(-1, 10)
+    indices = actor_frame["changed_bones"]
+    if indices is None:
+        indices = range(len(bones))
+    for i in indices:
+        posed[i] = bones[i]
+
+
+def test_full_frames_after_buffered_delta_frames():
+    encoder = linkutils.DeltaEncoder(keyframe_interval=30)
+    decoder = linkutils.DeltaDecoder()
+    frames = make_frames(4)
+    posed = np.zeros((4, 10))
+    stale = np.zeros((4, 10))
+    for i, (transforms, expressions, visemes) in enumerate(frames):
+        frame, actor_frames = decoder.decode(encoder.encode(i, [ make_block(transforms, expressions, visemes) ]))
+        if i == 0:
+            pose(posed, actor_frames[0])
+            pose(stale, actor_frames[0])
+        elif i == 3:
+            # frames 1 and 2 were only buffered (fast record)
+            pose(stale, actor_frames[0])
+            pose(posed, linkutils.full_actor_frames(actor_frames)[0])
+    expected = frames[3][0][1:]
+    assert not np.allclose(stale, expected)
+    assert np.allclose(posed, expected)
@@ -0,0 +1,52 @@
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+def test_small_window_fits_a_whole_batch():
+    flow = linkutils.FlowControl()
+    flow.batching = True
+    # a fast local link: 60 fps over a 20ms round trip, 3 frames in flight
+    flow.throughput = 60.0
+    flow.min_rtt = 0.02
+    flow.acknowledge(0, credit=30, now=1.0, batch=8)
+    assert flow.batch_size() == 8
+    now = 2.0
+    for frame in range(1, flow.batch_size() + 1):
+        assert flow.can_send(now)
+        flow.sent(frame, now)
+
+
+def test_receiver_batch_independent_of_credit():
+    flow = linkutils.FlowControl()
+    # 2ms per frame: 16 frames in FLOW_BATCH_TIME, capped at FLOW_MAX_BATCH
+    flow.received(0.002)
+    assert flow.get_batch() == linkutils.FLOW_MAX_BATCH
+    flow.frame_cost = 0.0
+    assert flow.get_batch() == 1
+
+
+def test_credit_caps_a_batching_window():
+    flow = linkutils.FlowControl()
+    flow.batching = True
+    flow.throughput = 60.0
+    flow.min_rtt = 0.02
+    flow.acknowledge(0, credit=3, now=1.0, batch=8)
+    assert flow.window == 3
+    assert flow.batch_size() == 3
+    now = 2.0
+    for frame in range(1, 4):
+        assert flow.can_send(now)
+        flow.sent(frame, now)
+    assert not flow.can_send(now)
+
+
+def test_window_only_widened_for_batching_sender():
+    flow = linkutils.FlowControl()
+    flow.throughput = 60.0
+    flow.min_rtt = 0.02
+    flow.acknowledge(0, credit=30, now=1.0, batch=8)
+    window = flow.window
+    flow.batching = True
+    flow.update_window()
+    assert flow.window == window + 8
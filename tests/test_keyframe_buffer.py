@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+def sequence_frame(frame_mode, frame, start_frame, current_frame):
+    # as CCICActionOptions.get_sequence_frame
+    if frame_mode == "START":
+        return frame - start_frame + 1
+    elif frame_mode == "CURRENT":
+        return current_frame + frame - start_frame
+    return frame
+
+
+@pytest.mark.parametrize("frame_mode", ["MATCH", "START", "CURRENT"])
+def test_keyframes_land_on_sequence_frames(frame_mode):
+    start_frame, end_frame, current_frame = 100, 104, 20
+    opt_start_frame = sequence_frame(frame_mode, start_frame, start_frame, current_frame)
+    buffer = linkutils.KeyframeBuffer(end_frame - start_frame + 1, opt_start_frame)
+    column = buffer.reserve([0.0])
+    buffer.allocate()
+    opt_frames = []
+    for frame in range(start_frame, end_frame + 1):
+        opt_frame = sequence_frame(frame_mode, frame, start_frame, current_frame)
+        opt_frames.append(opt_frame)
+        buffer.set(opt_frame - opt_start_frame, column, [frame * 0.5])
+    keyframes = buffer.get_keyframes(column, buffer.count).reshape(-1, 2)
+    assert keyframes[:, 0].tolist() == opt_frames
+    assert np.allclose(keyframes[:, 1], np.arange(start_frame, end_frame + 1) * 0.5)
+
+
+def test_keyframes_only_recorded_rows():
+    buffer = linkutils.KeyframeBuffer(10, 1)
+    column = buffer.reserve([1.0, 2.0])
+    buffer.allocate()
+    buffer.set_rows([2, 5, 12], column, np.array([[3, 4], [5, 6], [7, 8]], dtype=np.float32))
+    keyframes = buffer.get_keyframes(column + 1, 10).reshape(-1, 2)
+    assert keyframes.tolist() == [[3, 4], [6, 6]]
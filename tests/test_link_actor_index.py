@@ -0,0 +1,81 @@
+import types
+import pytest
+
+pytest.importorskip("bpy")
+
+from conftest import load_module
+
+link = load_module("link")
+
+
+class ChrCache():
+    """Just enough of a character cache for the actor index lookups."""
+
+    def __init__(self, name, link_id=""):
+        self.name = name
+        self.link_id = link_id
+        self.disabled = False
+
+    def get_name(self):
+        return self.name
+
+    def get_link_id(self):
+        return self.link_id
+
+    def set_link_id(self, link_id):
+        self.link_id = link_id
+
+    def cache_type(self):
+        return "AVATAR"
+
+    def get_primary_object(self):
+        return None
+
+
+@pytest.fixture
+def import_cache(monkeypatch):
+    import_cache = []
+    props = types.SimpleNamespace(import_cache=import_cache)
+    prefs = types.SimpleNamespace(log_level="ERRORS")
+    monkeypatch.setattr(link.vars, "props", lambda: props)
+    monkeypatch.setattr(link.vars, "prefs", lambda: prefs)
+    link.get_actor_index().reset()
+    yield import_cache
+    link.get_actor_index().reset()
+
+
+def test_get_actor_index():
+    assert link.get_actor_index() is link.get_link_data().actor_index
+
+
+def test_find_actor_by_link_id(import_cache):
+    import_cache.append(ChrCache("Bob", "1001"))
+    actor = link.LinkActor.find_actor("1001", search_type="AVATAR")
+    assert actor and actor.name == "Bob"
+    assert link.LinkActor.find_actor("1002", search_type="AVATAR") is None
+
+
+def test_find_actor_by_name_adds_alias(import_cache):
+    import_cache.append(ChrCache("Bob", "1001"))
+    actor = link.LinkActor.find_actor("2001", search_name="Bob", search_type="AVATAR")
+    assert actor and actor.name == "Bob"
+    # the new link_id is now an alias of the character
+    actor = link.LinkActor.find_actor("2001", search_type="AVATAR")
+    assert actor and actor.name == "Bob"
+
+
+def test_add_alias_assigns_missing_link_id(import_cache):
+    chr_cache = ChrCache("Bob")
+    import_cache.append(chr_cache)
+    link.LinkActor(chr_cache).add_alias("3001")
+    assert chr_cache.link_id == "3001"
+    actor = link.LinkActor.find_actor("3001", search_type="AVATAR")
+    assert actor and actor.name == "Bob"
+
+
+def test_update_link_id(import_cache):
+    import_cache.append(ChrCache("Bob", "1001"))
+    link.LinkActor.find_actor("1001", search_type="AVATAR").update_link_id("4001")
+    actor = link.LinkActor.find_actor("4001", search_type="AVATAR")
+    assert actor and actor.name == "Bob"
+    assert link.LinkActor.find_actor("1001", search_type="AVATAR") is None
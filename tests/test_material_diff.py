@@ -0,0 +1,22 @@
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+def test_parameter_changes_are_not_texture_changes():
+    old = { "Diffuse Color": [255, 255, 255], "Textures": { "Base Color": { "Strength": 100, "Texture Path": "a.png" } } }
+    new = { "Diffuse Color": [200, 255, 255], "Textures": { "Base Color": { "Strength": 50, "Texture Path": "a.png" } } }
+    changes = linkutils.diff_json(old, new)
+    assert len(changes) == 2
+    assert not any(linkutils.is_texture_change(change) for change in changes)
+
+
+def test_texture_changes():
+    old = { "Textures": { "Base Color": { "Texture Path": "a.png" } },
+            "Custom Shader": { "Image": {}, "Variable": { "Depth": 1.0 } } }
+    new = { "Textures": { "Base Color": { "Texture Path": "b.png" }, "Normal": { "Texture Path": "n.png" } },
+            "Custom Shader": { "Image": { "Flow Map": { "Texture Path": "f.png" } }, "Variable": { "Depth": 2.0 } } }
+    changes = linkutils.diff_json(old, new)
+    assert sorted(linkutils.is_texture_change(change) for change in changes) == [False, True, True, True]
+    # removed texture infos
+    assert linkutils.is_texture_change([["Textures", "Normal"]])
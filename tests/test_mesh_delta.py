@@ -0,0 +1,31 @@
+import numpy as np
+
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+def test_obj_axes_round_trip():
+    positions = np.random.default_rng(1).normal(size=(20, 3)).astype(np.float32)
+    obj_positions = linkutils.blender_to_obj_axes(positions)
+    # Z up in Blender is Y up in OBJ files
+    assert np.array_equal(obj_positions[:, 1], positions[:, 2])
+    assert np.array_equal(linkutils.obj_to_blender_axes(obj_positions), positions)
+
+
+def test_sparse_delta_applies_to_base():
+    base = np.random.default_rng(2).normal(size=(100, 3)).astype(np.float32)
+    positions = base.copy()
+    positions[[3, 50]] += 1.0
+    info = { "name": "Mesh", "delta_id": 1 }
+    info, indices, values = linkutils.decode_mesh_delta(linkutils.encode_mesh_delta(info, positions, base))
+    assert info["mode"] == "SPARSE" and info["delta_id"] == 1
+    assert indices.tolist() == [3, 50]
+    assert np.allclose(linkutils.apply_mesh_delta(base.copy(), indices, values), positions)
+
+
+def test_full_delta_without_base():
+    positions = np.random.default_rng(3).normal(size=(10, 3)).astype(np.float32)
+    info, indices, values = linkutils.decode_mesh_delta(linkutils.encode_mesh_delta({}, positions))
+    assert info["mode"] == "FULL" and indices is None
+    assert np.array_equal(linkutils.apply_mesh_delta(None, indices, values), positions)
@@ -0,0 +1,52 @@
+import io, os, socket, threading, time
+import pytest
+
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+class MemoryFile(io.BytesIO):
+
+    def close(self):
+        self.data = self.getvalue()
+        super().close()
+
+
+def receive_file(tmp_path, compression):
+    file_path = os.path.join(tmp_path, "body.bin")
+    with open(file_path, "wb") as file:
+        file.write(os.urandom(50000) + bytes(200000))
+    source = linkutils.FileSource(file_path)
+    sent = b"".join(linkutils.frame_file("1234", source, compression))
+    files = []
+
+    def file_sink(remote_id):
+        files.append(MemoryFile())
+        return files[-1]
+
+    a, b = socket.socketpair()
+    sender = threading.Thread(target=a.sendall, args=(sent,))
+    try:
+        sender.start()
+        reader = linkutils.MessageReader(b, file_sink)
+        reader.compression = linkutils.Compression() if compression else None
+        reader.telemetry = linkutils.LinkTelemetry()
+        message = None
+        deadline = time.perf_counter() + 5
+        while not message and time.perf_counter() < deadline:
+            message = reader.read(deadline)
+    finally:
+        sender.join()
+        a.close()
+        b.close()
+    assert message and message[0] == linkutils.OpCodes.FILE
+    assert files[0].data == open(file_path, "rb").read()
+    return sent, reader
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_file_received_bytes_counted_once(tmp_path, compressed):
+    sent, reader = receive_file(tmp_path, linkutils.Compression() if compressed else None)
+    stat = reader.telemetry.get_stat(linkutils.OpCodes.FILE)
+    assert stat["received_bytes"] == len(sent) - (0 if compressed else linkutils.UINT.size)
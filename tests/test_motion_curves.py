@@ -0,0 +1,31 @@
+import numpy as np
+
+from conftest import load_module
+
+linkutils = load_module("linkutils")
+
+
+def test_motion_curves_round_trip_with_template():
+    rng = np.random.default_rng(4)
+    frames, num_bones = 5, 3
+    curves = {
+        "transform": rng.normal(size=(frames, 10)),
+        "bones": rng.normal(size=(frames, num_bones, 10)),
+        "expressions": rng.normal(size=(frames, 2)),
+        "visemes": np.zeros((frames, 0)),
+    }
+    actor = { "name": "Actor", "type": "AVATAR", "link_id": "1234",
+              "bones": ["A", "B", "C"], "ids": [1, 2, 3], "id_tree": [], "expressions": ["E1", "E2"],
+              "visemes": [], "morphs": [] }
+    data = linkutils.encode_motion_curves({ "start_frame": 0, "end_frame": frames - 1, "actors": [actor] }, [curves])
+    header, actor_curves = linkutils.decode_motion_curves(data)
+    assert header["num_frames"] == frames
+    actor_data = header["actors"][0]
+    # the template passes through with the channel counts
+    assert actor_data["ids"] == [1, 2, 3] and actor_data["expressions"] == ["E1", "E2"]
+    assert (actor_data["bone_count"], actor_data["expression_count"], actor_data["viseme_count"]) == (3, 2, 0)
+    decoded = actor_curves[0]
+    assert decoded["bones"].shape == (frames, num_bones, 10)
+    assert decoded["visemes"].shape == (frames, 0)
+    for key in curves:
+        assert np.allclose(decoded[key], np.asarray(curves[key], dtype=np.float32))
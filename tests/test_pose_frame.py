@@ -0,0 +1,67 @@
+import struct
+
+import numpy as np
+
+from conftest import encode_actor_frame, load_module
+
+linkutils = load_module("linkutils")
+
+
+def decode_pose_frame_per_value(pose_data):
+    """The original per bone / per weight decoder, as the reference."""
+    offset = 0
+    count, frame = struct.unpack_from("!II", pose_data, offset)
+    offset = 8
+    values = []
+    for i in range(0, count):
+        offset, name = linkutils.unpack_string(pose_data, offset)
+        offset, actor_type = linkutils.unpack_string(pose_data, offset)
+        offset, link_id = linkutils.unpack_string(pose_data, offset)
+        values.append(struct.unpack_from("!ffffffffff", pose_data, offset))
+        offset += 40
+        if actor_type == "PROP" or actor_type == "AVATAR":
+            num_bones = struct.unpack_from("!I", pose_data, offset)[0]
+            offset += 4
+            for b in range(0, num_bones):
+                values.append(struct.unpack_from("!ffffffffff", pose_data, offset))
+                offset += 40
+            for block in range(0, 2):
+                num_weights = struct.unpack_from("!I", pose_data, offset)[0]
+                offset += 4
+                for w in range(0, num_weights):
+                    values.append(struct.unpack_from("!f", pose_data, offset)[0])
+                    offset += 4
+        elif actor_type == "LIGHT":
+            values.append(struct.unpack_from("!?fffffffff", pose_data, offset))
+            offset += 37
+        elif actor_type == "CAMERA":
+            values.append(struct.unpack_from("!f?fffffff", pose_data, offset))
+            offset += 33
+    return frame, values
+
+
+def test_block_decoder_matches_per_value_decoder():
+    rng = np.random.default_rng(6)
+    avatar = { "name": "Avatar", "type": "AVATAR", "link_id": "1",
+               "transform": rng.normal(size=10).tolist(), "bones": rng.normal(size=150 * 10).tolist(),
+               "expressions": rng.random(20).tolist(), "visemes": rng.random(5).tolist() }
+    light = { "name": "Light", "type": "LIGHT", "link_id": "2",
+              "transform": rng.normal(size=10).tolist(), "light": (True, 1.0, 0.5, 0.25, 100.0, 500.0, 45.0, 0.125, 0.5, 2.0) }
+    camera = { "name": "Camera", "type": "CAMERA", "link_id": "3",
+               "transform": rng.normal(size=10).tolist(), "camera": (50.0, False, 200.0, 2.5, 0.0, 1.0, 0.5, 0.25, 0.125) }
+    data = b"".join([ linkutils.HEADER.pack(3, 12) ] + [ encode_actor_frame(a) for a in [avatar, light, camera] ])
+    frame, actor_frames = linkutils.decode_pose_frame(data)
+    reference_frame, reference = decode_pose_frame_per_value(data)
+    assert frame == reference_frame == 12
+    values = []
+    for actor_frame in actor_frames:
+        values.append(tuple(actor_frame["transform"]))
+        if actor_frame["type"] == "AVATAR":
+            bones = actor_frame["bones"]
+            values += [ tuple(bones[i:i+10]) for i in range(0, len(bones), 10) ]
+            values += list(actor_frame["expressions"]) + list(actor_frame["visemes"])
+        elif actor_frame["type"] == "LIGHT":
+            values.append(tuple(actor_frame["light"]))
+        elif actor_frame["type"] == "CAMERA":
+            values.append(tuple(actor_frame["camera"]))
+    assert values == reference